@@ -62,6 +62,30 @@ def assign_extent(modeladmin, request, queryset):
     )
 
 
+@admin.action(description='Assign srid')
+def assign_srid(modeladmin, request, queryset):
+    """Assign srid for selected layers."""
+    for layer in queryset:
+        layer.assign_srid()
+    modeladmin.message_user(
+        request,
+        f'SRID assigned for {queryset.count()} layer(s).',
+        level='success'
+    )
+
+
+@admin.action(description='Optimize table')
+def optimize_table(modeladmin, request, queryset):
+    """Build indexes and refresh statistics for selected layers."""
+    for layer in queryset:
+        layer.optimize_table()
+    modeladmin.message_user(
+        request,
+        f'Table optimized for {queryset.count()} layer(s).',
+        level='success'
+    )
+
+
 @admin.action(description='Generate pmtiles')
 def generate_pmtiles(modeladmin, request, queryset):
     """Generate pmtiles for layer."""
@@ -119,6 +143,14 @@ download_geopackage = create_download_action(
 download_kml = create_download_action(
     FileType.KML, 'Download as KML', '.kml', 'download_kml'
 )
+download_flatgeobuf = create_download_action(
+    FileType.FLATGEOBUF, 'Download as FlatGeobuf', '.fgb',
+    'download_flatgeobuf'
+)
+download_geoparquet = create_download_action(
+    FileType.GEOPARQUET, 'Download as GeoParquet', '.parquet',
+    'download_geoparquet'
+)
 
 
 def create_layer_download_action(
@@ -187,6 +219,14 @@ download_kml_tracked = create_layer_download_action(
     FileType.KML, 'Download as KML (Tracked)', '.kml',
     'download_kml_tracked'
 )
+download_flatgeobuf_tracked = create_layer_download_action(
+    FileType.FLATGEOBUF, 'Download as FlatGeobuf (Tracked)', '.fgb',
+    'download_flatgeobuf_tracked'
+)
+download_geoparquet_tracked = create_layer_download_action(
+    FileType.GEOPARQUET, 'Download as GeoParquet (Tracked)', '.parquet',
+    'download_geoparquet_tracked'
+)
 
 
 def create_layer_download_async_action(file_type, description, action_name):
@@ -250,6 +290,14 @@ download_geopackage_async = create_layer_download_async_action(
 download_kml_async = create_layer_download_async_action(
     FileType.KML, 'Download as KML (Async)', 'download_kml_async'
 )
+download_flatgeobuf_async = create_layer_download_async_action(
+    FileType.FLATGEOBUF, 'Download as FlatGeobuf (Async)',
+    'download_flatgeobuf_async'
+)
+download_geoparquet_async = create_layer_download_async_action(
+    FileType.GEOPARQUET, 'Download as GeoParquet (Async)',
+    'download_geoparquet_async'
+)
 
 
 @admin.register(Layer)
@@ -267,21 +315,29 @@ class LayerAdmin(admin.ModelAdmin):
     actions = [
         add_id,
         assign_extent,
+        assign_srid,
+        optimize_table,
         generate_pmtiles,
         download_geojson,
         download_shapefile,
         download_geopackage,
         download_kml,
+        download_flatgeobuf,
+        download_geoparquet,
         download_original_tracked,
         download_geojson_tracked,
         download_shapefile_tracked,
         download_geopackage_tracked,
         download_kml_tracked,
+        download_flatgeobuf_tracked,
+        download_geoparquet_tracked,
         download_original_async,
         download_geojson_async,
         download_shapefile_async,
         download_geopackage_async,
-        download_kml_async
+        download_kml_async,
+        download_flatgeobuf_async,
+        download_geoparquet_async
     ]
 
     readonly_fields = ('features_link',)
@@ -329,6 +385,12 @@ class LayerAdmin(admin.ModelAdmin):
 
     features_link.short_description = 'Features'
 
+    def save_related(self, request, form, formsets, change):
+        """Save attributes, the layer version is increased once."""
+        super().save_related(request, form, formsets, change)
+        if change and any(formset.has_changed() for formset in formsets):
+            form.instance.increase_version()
+
     def get_form(self, request, *args, **kwargs):
         """Return form."""
         form = super(LayerAdmin, self).get_form(request, *args, **kwargs)
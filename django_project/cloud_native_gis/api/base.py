@@ -3,19 +3,33 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 import os
+import uuid
 from datetime import datetime
 
 from django.core.exceptions import (
     FieldError, ValidationError, SuspiciousOperation
 )
 from django.forms.models import model_to_dict
-from django.http import HttpResponseForbidden, Http404, HttpResponse
+from django.http import (
+    FileResponse, HttpResponseForbidden, Http404, HttpResponse,
+    StreamingHttpResponse
+)
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.viewsets import mixins, GenericViewSet
 
 from cloud_native_gis.pagination import Pagination
-from cloud_native_gis.utils.range_request import RangeRequestReader
+from cloud_native_gis.utils.range_request import (
+    get_reader, parse_range_header
+)
+
+# Ranges up to this size are sliced at once, bigger ones are streamed.
+RANGE_RESPONSE_MAX_SIZE = 1024 * 1024
+
+# Chunk size of the streamed ranges.
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class BaseReadApi(
@@ -160,47 +174,184 @@ class BaseApi(
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-def serve_bytes_range(request, full_path, content_type):
-    """Serve file using bytes range request."""
+def _full_file_response(full_path, content_type):
+    """Return response that streams the whole file."""
+    response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _multipart_byteranges(
+        reader, ranges, content_type, file_size, boundary
+):
+    """Return (content length, stream) of multipart/byteranges body.
+
+    The reader is not closed by the stream, close it with the response.
+    """
+    parts = []
+    for start, end in ranges:
+        parts.append((
+            (
+                f'\r\n--{boundary}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n'
+            ).encode('ascii'),
+            start, end
+        ))
+    closing = f'\r\n--{boundary}--\r\n'.encode('ascii')
+    content_length = len(closing) + sum(
+        [len(header) + end - start + 1 for header, start, end in parts]
+    )
+
+    def _stream():
+        for header, start, end in parts:
+            yield header
+            yield from reader.chunks(
+                start, end - start + 1, STREAM_CHUNK_SIZE
+            )
+        yield closing
+
+    return content_length, _stream()
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Return strong ETag of file from its inode, mtime and size."""
+    return '"{:x}-{:x}-{:x}"'.format(
+        stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size
+    )
+
+
+def patch_cache_headers(
+        response, etag: str, last_modified: float = None,
+        max_age: int = None
+):
+    """Add the validators and Cache-Control to response."""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    if max_age is not None:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def _if_range_matches(request, etag: str, last_modified: float) -> bool:
+    """Return whether the Range should be served following If-Range.
+
+    If-Range matches a strong ETag or the exact Last-Modified date.
+    """
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        return if_range == etag
+    if if_range.startswith('W/'):
+        return False
+    date = parse_http_date_safe(if_range)
+    return date is not None and date == int(last_modified)
+
+
+def serve_bytes_range(request, full_path, content_type, max_age=None):
+    """Serve file using bytes range request.
+
+    The file has ETag and Last-Modified from its inode, mtime and size,
+    so If-None-Match/If-Modified-Since are answered with 304 and If-Range
+    serves the whole file when it changed.
+
+    :param max_age: Seconds of Cache-Control max-age, when not None.
+    """
     if not os.path.exists(full_path):
         raise Http404("PMTile file does not exist.")
 
-    reader = RangeRequestReader(full_path)
-    try:
+    stat_result = os.stat(full_path)
+    etag = file_etag(stat_result)
+    last_modified = stat_result.st_mtime
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified)
+    )
+    if response is None:
         range_header = request.headers.get('Range')
+        if range_header and not _if_range_matches(
+                request, etag, last_modified
+        ):
+            range_header = None
+        response = _bytes_range_response(
+            full_path, content_type, range_header
+        )
+    return patch_cache_headers(
+        response, etag, last_modified=last_modified, max_age=max_age
+    )
 
-        if not range_header:
-            # Return entire file if no range is specified
-            data = reader.read_all()
-            response = HttpResponse(data)
-            response['Content-Type'] = content_type
-            response['Content-Length'] = len(data)
-            response['Accept-Ranges'] = 'bytes'
-            return response
 
-        # Parse range header
-        try:
-            range_match = range_header.replace('bytes=', '').split('-')
-            start = int(range_match[0])
-            end = int(range_match[1]) if range_match[1] else None
-        except (ValueError, IndexError):
-            return HttpResponse(status=400)
-
-        # Read the requested range
-        length = (
-            (end - start + 1) if end is not None else
-            (os.path.getsize(full_path) - start)
-        )
-        data = reader.read_range(start, length)
-
-        response = HttpResponse(data, status=206)
-        response['Content-Type'] = content_type
-        response['Content-Length'] = len(data)
-        response['Content-Range'] = (
-            f'bytes {start}-{start + len(data) - 1}/'
-            f'{os.path.getsize(full_path)}'
-        )
+def _bytes_range_response(full_path, content_type, range_header):
+    """Return response of the Range header of file.
+
+    The Range header is handled as RFC 7233: first-last, first- and
+    -suffix ranges, multiple ranges as multipart/byteranges (the close
+    ones coalesced) and 416 when no range is satisfiable.
+
+    The whole file is streamed with FileResponse (sendfile when the
+    server supports it). A range up to RANGE_RESPONSE_MAX_SIZE is sliced
+    from the memory mapped file, a bigger one is streamed in memoryview
+    chunks of the map, so the memory does not grow with the file size.
+    The maps are shared by the requests through the reader pool.
+    """
+    if not range_header:
+        # Return entire file if no range is specified
+        return _full_file_response(full_path, content_type)
+
+    file_size = os.path.getsize(full_path)
+    try:
+        ranges = parse_range_header(range_header, file_size)
+    except ValueError:
+        return HttpResponse(status=400)
+
+    if ranges is None:
+        return _full_file_response(full_path, content_type)
+    if not ranges:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{file_size}'
         response['Accept-Ranges'] = 'bytes'
         return response
-    finally:
+
+    reader = get_reader(full_path)
+    try:
+        if len(ranges) > 1:
+            boundary = uuid.uuid4().hex
+            content_length, stream = _multipart_byteranges(
+                reader, ranges, content_type, file_size, boundary
+            )
+            response = StreamingHttpResponse(stream, status=206)
+            # Closed with the response, even when the stream never started
+            response._resource_closers.append(reader.close)
+            response['Content-Type'] = (
+                f'multipart/byteranges; boundary={boundary}'
+            )
+            response['Content-Length'] = content_length
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+        start, end = ranges[0]
+        length = end - start + 1
+        if length <= RANGE_RESPONSE_MAX_SIZE:
+            response = HttpResponse(
+                reader.read_range(start, length), status=206
+            )
+            reader.close()
+        else:
+            response = StreamingHttpResponse(
+                reader.chunks(start, length, STREAM_CHUNK_SIZE),
+                status=206
+            )
+            # Closed with the response, even when the stream never started
+            response._resource_closers.append(reader.close)
+    except Exception:
         reader.close()
+        raise
+
+    response['Content-Type'] = content_type
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 
+from django.conf import settings
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -14,6 +15,10 @@ from cloud_native_gis.utils.geometry import (
 from cloud_native_gis.models.layer import Layer
 
 
+# Default maximum number of points of a context query.
+CONTEXT_MAX_POINTS = 10000
+
+
 class ContextAPIView(APIView):
     """
     Context API endpoint for collection queries.
@@ -24,74 +29,171 @@ class ContextAPIView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @staticmethod
+    def _coordinates(x_list: list, y_list: list) -> list:
+        """Return coordinates from x and y list."""
+        if len(x_list) != len(y_list):
+            raise ValueError(
+                'The number of x and y coordinates must be the same')
+
+        try:
+            coordinates = [
+                (float(x), float(y)) for x, y in zip(x_list, y_list)]
+        except (TypeError, ValueError):
+            raise ValueError(
+                'All x and y values must be valid floats.')
+
+        max_points = getattr(
+            settings, 'CLOUD_NATIVE_GIS_CONTEXT_MAX_POINTS',
+            CONTEXT_MAX_POINTS
+        )
+        if len(coordinates) > max_points:
+            raise ValueError(
+                f'The number of coordinates should not exceed {max_points}.'
+            )
+        return coordinates
+
+    @staticmethod
+    def _geometry_coordinates(geometry) -> tuple:
+        """Return x and y list of GeoJSON Point or MultiPoint geometry.
+
+        The geometry can also be given as a GeoJSON Feature.
+
+        :raises ValueError: When the geometry is not a Point or MultiPoint
+            with number coordinates.
+        """
+        if isinstance(geometry, dict) and geometry.get('type') == 'Feature':
+            geometry = geometry.get('geometry', None) or {}
+        if not isinstance(geometry, dict):
+            raise ValueError('Geometry should be a GeoJSON object.')
+
+        points = geometry.get('coordinates', [])
+        if geometry.get('type') == 'Point':
+            points = [points]
+        elif geometry.get('type') != 'MultiPoint':
+            raise ValueError('Geometry should be a Point or MultiPoint.')
+
+        def _is_number(value):
+            return (
+                isinstance(value, (int, float)) and
+                not isinstance(value, bool)
+            )
+
+        if not isinstance(points, list) or not all(
+                isinstance(point, list) and len(point) >= 2 and
+                _is_number(point[0]) and _is_number(point[1])
+                for point in points
+        ):
+            raise ValueError(
+                'Geometry coordinates should be pairs of numbers.'
+            )
+        return (
+            [point[0] for point in points], [point[1] for point in points]
+        )
+
+    def _query(self, params, coordinates: list):
+        """Return context of coordinates by params."""
+        key = params.get('key', None)
+        attributes = params.get('attr', '')
+        srid = params.get('srid', 4326)
+
+        try:
+            tolerance = float(params.get('tolerance', 10.0))
+        except ValueError:
+            raise ValueError('Tolerance should be a float')
+
+        registry = params.get('registry', '')
+        if registry.lower() not in [
+            'collection', 'service', 'group', 'native']:
+            raise ValueError('Registry should be "collection", '
+                             '"service" or "group".')
+
+        outformat = params.get('outformat', 'geojson').lower()
+        if outformat not in ['geojson', 'json']:
+            raise ValueError('Output format should be either '
+                             'json or geojson')
+
+        data = []
+
+        if registry == 'native':
+            try:
+                layer = Layer.objects.get(unique_id=key)
+                if isinstance(attributes, str):
+                    attributes = attributes.split(',') if attributes else []
+                if not attributes:
+                    attributes = layer.attribute_names
+                data = query_features(
+                    layer.query_table_name,
+                    field_names=attributes,
+                    coordinates=coordinates,
+                    tolerance=tolerance,
+                    srid=srid,
+                    storage_srid=layer.srid
+                )
+            except Layer.DoesNotExist as e:
+                return Response(str(e), status=status.HTTP_404_NOT_FOUND)
+
+        # Todo : for non native layer
+        # point = parse_coord(x, y, srid)
+        # data = Worker(
+        #     registry, key, point, tolerance, outformat).retrieve_all()
+
+        return Response(data, status=status.HTTP_200_OK)
+
     def get(self, request):
         """Handle GET requests."""
         try:
             key = request.GET.get('key', None)
-            attributes = request.GET.get('attr', '')
             x = request.GET.get('x', None)
             y = request.GET.get('y', None)
             if None in [key, x, y]:
                 raise KeyError('Required request argument ('
                                'registry, key, x, y) missing.')
 
-            srid = request.GET.get('srid', 4326)
-
-            x_list = x.split(',')
-            y_list = y.split(',')
-
-            if len(x_list) != len(y_list):
-                raise ValueError(
-                    'The number of x and y coordinates must be the same')
-
-            try:
-                coordinates = [
-                    (float(x), float(y)) for x, y in zip(x_list, y_list)]
-            except ValueError:
-                raise ValueError(
-                    'All x and y values must be valid floats.')
-
-            try:
-                tolerance = float(request.GET.get('tolerance', 10.0))
-            except ValueError:
-                raise ValueError('Tolerance should be a float')
-
-            registry = request.GET.get('registry', '')
-            if registry.lower() not in [
-                'collection', 'service', 'group', 'native']:
-                raise ValueError('Registry should be "collection", '
-                                 '"service" or "group".')
+            coordinates = self._coordinates(x.split(','), y.split(','))
+            return self._query(request.GET, coordinates)
+        except KeyError as e:
+            return Response(str(e), status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                str(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            outformat = request.GET.get('outformat', 'geojson').lower()
-            if outformat not in ['geojson', 'json']:
-                raise ValueError('Output format should be either '
-                                 'json or geojson')
+    def post(self, request):
+        """Handle POST requests.
 
-            data = []
+        The body is a JSON object with the same arguments as GET, where the
+        points are either x and y lists or a GeoJSON Point/MultiPoint
+        ``geometry``, for point sets that are too big for the query string.
+        """
+        try:
+            data = request.data
+            if not isinstance(data, dict):
+                raise KeyError('Request body should be a JSON object.')
+            geometry = data.get('geometry', None)
+            if data.get('key', None) is None or (
+                    geometry is None and
+                    None in [data.get('x', None), data.get('y', None)]
+            ):
+                raise KeyError('Required request argument ('
+                               'registry, key, x, y or geometry) missing.')
 
-            if registry == 'native':
+            if geometry is not None:
                 try:
-                    layer = Layer.objects.get(unique_id=key)
-                    if attributes:
-                        attributes = attributes.split(',')
-                    else:
-                        attributes = layer.attribute_names
-                    data = query_features(
-                        layer.query_table_name,
-                        field_names=attributes,
-                        coordinates=coordinates,
-                        tolerance=tolerance,
-                        srid=srid
+                    x_list, y_list = self._geometry_coordinates(geometry)
+                except ValueError as e:
+                    return Response(
+                        str(e), status=status.HTTP_400_BAD_REQUEST
                     )
-                except Layer.DoesNotExist as e:
-                    return Response(str(e), status=status.HTTP_404_NOT_FOUND)
-
-            # Todo : for non native layer
-            # point = parse_coord(x, y, srid)
-            # data = Worker(
-            #     registry, key, point, tolerance, outformat).retrieve_all()
-
-            return Response(data, status=status.HTTP_200_OK)
+            else:
+                x_list = data['x']
+                y_list = data['y']
+                if isinstance(x_list, str):
+                    x_list = x_list.split(',')
+                if isinstance(y_list, str):
+                    y_list = y_list.split(',')
+
+            coordinates = self._coordinates(x_list, y_list)
+            return self._query(data, coordinates)
         except KeyError as e:
             return Response(str(e), status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -3,9 +3,14 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 
+import base64
+import binascii
 import copy
+import json
+import re
 
 from psycopg2 import sql
+from django.conf import settings
 from django.db import connection
 from django.core.exceptions import PermissionDenied
 from django.core.files.storage import FileSystemStorage
@@ -14,6 +19,7 @@ from rest_framework.views import APIView
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from cloud_native_gis.api.base import BaseApi, BaseReadApi
 from cloud_native_gis.forms.layer import LayerForm
@@ -28,6 +34,10 @@ from cloud_native_gis.serializer.layer_upload import LayerUploadSerializer
 from cloud_native_gis.serializer.style import LayerStyleSerializer
 from cloud_native_gis.utils.layer import layer_style_url, maputnik_url
 
+# Default maximum number of rows that a data preview page number skips,
+# deeper pages are reached by the cursor links.
+DATA_PREVIEW_MAX_OFFSET = 10000
+
 
 class LayerViewSet(BaseApi):
     """API for layer."""
@@ -225,61 +235,230 @@ class DataPreviewAPI(APIView):
             cursor.execute(query, params)
             return cursor.fetchone()[0]
 
+    @staticmethod
+    def _encode_cursor(page: int, key, direction: str) -> str:
+        """Return opaque cursor of the page next to or before the id key."""
+        data = json.dumps([page, key, direction], default=str)
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        """Return page, id key and direction of the cursor.
+
+        :raises ValueError: When the cursor is not valid.
+        """
+        try:
+            page, key, direction = json.loads(
+                base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            )
+        except (TypeError, ValueError, binascii.Error):
+            raise ValueError('Invalid cursor.')
+        if direction not in ('next', 'previous') or not isinstance(page, int):
+            raise ValueError('Invalid cursor.')
+        return page, key, direction
+
+    @staticmethod
+    def _where(conditions: list):
+        """Return WHERE clause of the conditions."""
+        if not conditions:
+            return sql.SQL('')
+        return sql.SQL('WHERE {}').format(
+            sql.SQL(' AND ').join(conditions)
+        )
+
+    @staticmethod
+    def _key_column(id_col: str):
+        """Return column that the rows are paged by.
+
+        The rows are paged by the id column, or by ctid (physical order)
+        when the table has no id column.
+        """
+        if id_col is None:
+            return sql.SQL('ctid')
+        return sql.Identifier(id_col)
+
+    @staticmethod
+    def _valid_key(id_col: str, key) -> bool:
+        """Return whether the key of cursor fits the paged column."""
+        if not isinstance(key, list) or len(key) != 1:
+            return False
+        if id_col is None:
+            return (
+                isinstance(key[0], str) and
+                re.fullmatch(r'\(\d+,\d+\)', key[0]) is not None
+            )
+        return isinstance(key[0], (int, float, str))
+
+    def _key_condition(self, id_col: str, operator: str):
+        """Return condition of the rows after (or before) the key."""
+        return sql.SQL('{} ' + operator + (
+            ' %s::tid' if id_col is None else ' %s'
+        )).format(self._key_column(id_col))
+
+    def _page_start_key(
+            self, layer: Layer, id_col: str, conditions: list, params: list,
+            offset: int
+    ):
+        """Return key of the first row of the page at offset.
+
+        Only the paged column is read, so the rows before the page are
+        skipped on the id index instead of being fetched. They are still
+        counted one by one, so the offset is limited by
+        CLOUD_NATIVE_GIS_DATA_PREVIEW_MAX_OFFSET.
+        """
+        column = self._key_column(id_col)
+        query = sql.SQL("""
+            SELECT {} FROM {}.{}
+            {}
+            ORDER BY {}
+            OFFSET %s LIMIT 1
+        """).format(
+            sql.SQL('ctid::text') if id_col is None else column,
+            sql.Identifier(layer.schema_name),
+            sql.Identifier(layer.table_name),
+            self._where(conditions),
+            column
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(query, params + [offset])
+            row = cursor.fetchone()
+        return list(row) if row else None
+
     def get(self, request, *args, **kwargs):
-        """Get data from layer table."""
+        """Get data from layer table.
+
+        The rows are paged by the id column (keyset pagination), so every
+        page is read from the id index at the same cost. The next and
+        previous links carry an opaque cursor of the page. A page number
+        (page) jumps to the page by skipping the rows before it, up to
+        CLOUD_NATIVE_GIS_DATA_PREVIEW_MAX_OFFSET rows.
+        """
         layer = get_object_or_404(
             Layer,
             id=kwargs.get('layer_id')
         )
 
         page_size = int(request.GET.get('page_size', 10))
-        page = int(request.GET.get('page', 1))
         search = request.GET.get('search', None)
-        total_count = self._get_count(layer, search)
         columns = layer.layerattributes_set.all().values_list(
             'attribute_name', flat=True
         ).order_by('attribute_order')
-        id_col = 'id'
-        if id_col not in columns:
-            id_col = columns[0]
-        search_cond = sql.SQL('')
+        id_col = 'id' if 'id' in columns else None
+        conditions = []
         params = []
         if search is not None and search != '':
             search_cond, params, attrs = self._get_search_query(layer, search)
             if search_cond != '':
-                search_cond = sql.SQL('WHERE {}').format(
-                    sql.SQL(search_cond).format(*attrs)
+                conditions.append(
+                    sql.SQL('({})').format(
+                        sql.SQL(search_cond).format(*attrs)
+                    )
                 )
-        query = sql.SQL("""
-            SELECT {} FROM {}.{}
-            {}
-            ORDER BY {} ASC
-            OFFSET %s LIMIT %s
-        """).format(
-            sql.SQL(',').join(map(sql.Identifier, columns)),
-            sql.Identifier(layer.schema_name),
-            sql.Identifier(layer.table_name),
-            search_cond,
-            sql.Identifier(id_col)
-        )
+
+        key = None
+        cursor_token = request.GET.get('cursor')
+        if cursor_token:
+            try:
+                page, key, direction = self._decode_cursor(cursor_token)
+            except ValueError as e:
+                return Response({'detail': str(e)}, status=400)
+            if not self._valid_key(id_col, key):
+                return Response({'detail': 'Invalid cursor.'}, status=400)
+        else:
+            page = int(request.GET.get('page', 1))
+            direction = 'next'
+            max_offset = getattr(
+                settings, 'CLOUD_NATIVE_GIS_DATA_PREVIEW_MAX_OFFSET',
+                DATA_PREVIEW_MAX_OFFSET
+            )
+            if (page - 1) * page_size > max_offset:
+                return Response(
+                    {
+                        'detail': (
+                            f'The page should not skip more than '
+                            f'{max_offset} rows, follow the next links.'
+                        )
+                    },
+                    status=400
+                )
+            if page > 1:
+                key = self._page_start_key(
+                    layer, id_col, conditions, params,
+                    (page - 1) * page_size
+                )
+
+        total_count = self._get_count(layer, search)
         rows = []
-        with connection.cursor() as cursor:
-            cursor.execute(
-                query,
-                params + [(int(page) - 1) * int(page_size), int(page_size)]
+        keys = []
+        has_more = False
+        if cursor_token or page <= 1 or key is not None:
+            if key is not None:
+                if direction == 'previous':
+                    operator = '<'
+                elif cursor_token:
+                    operator = '>'
+                else:
+                    # First row of the page that is jumped to
+                    operator = '>='
+                conditions.append(self._key_condition(id_col, operator))
+                params = params + key
+            order = 'DESC' if direction == 'previous' else 'ASC'
+            query = sql.SQL("""
+                SELECT {} FROM {}.{}
+                {}
+                ORDER BY {} {}
+                LIMIT %s
+            """).format(
+                sql.SQL(',').join(
+                    list(map(sql.Identifier, columns)) +
+                    ([sql.SQL('ctid::text')] if id_col is None else [])
+                ),
+                sql.Identifier(layer.schema_name),
+                sql.Identifier(layer.table_name),
+                self._where(conditions),
+                self._key_column(id_col),
+                sql.SQL(order)
             )
-            _rows = cursor.fetchall()
+            with connection.cursor() as cursor:
+                # One more row tells whether there is a page after this one
+                cursor.execute(query, params + [page_size + 1])
+                _rows = cursor.fetchall()
+            has_more = len(_rows) > page_size
+            _rows = _rows[:page_size]
+            if direction == 'previous':
+                _rows.reverse()
             for _row in _rows:
                 _data = {}
                 for i, col in enumerate(columns):
                     _data[col] = _row[i]
                 rows.append(_data)
+                keys.append([_row[-1] if id_col is None else _data[id_col]])
+
+        if direction == 'previous':
+            has_next, has_previous = bool(rows), has_more
+        else:
+            has_next, has_previous = has_more, page > 1 and bool(rows)
+
+        url = remove_query_param(request.build_absolute_uri(), 'page')
+        next_url = previous_url = None
+        if has_next:
+            next_url = replace_query_param(
+                url, 'cursor',
+                self._encode_cursor(page + 1, keys[-1], 'next')
+            )
+        if has_previous:
+            previous_url = replace_query_param(
+                url, 'cursor',
+                self._encode_cursor(page - 1, keys[0], 'previous')
+            )
 
         return Response(data={
             'layer_id': layer.id,
             'page': page,
             'page_size': page_size,
             'count': total_count,
+            'next': next_url,
+            'previous': previous_url,
             'data': rows,
             'columns': columns
         })
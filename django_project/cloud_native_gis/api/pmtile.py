@@ -4,11 +4,18 @@
 """Cloud Native GIS."""
 import os
 
-from django.http import Http404
+from django.http import Http404, HttpResponse, HttpResponseNotFound
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
 
-from cloud_native_gis.api.base import serve_bytes_range
+from cloud_native_gis.api.base import (
+    file_etag, patch_cache_headers, serve_bytes_range
+)
 from cloud_native_gis.models import Layer
+from cloud_native_gis.utils.pmtiles import (
+    CONTENT_ENCODINGS, TILE_CONTENT_TYPES
+)
+from cloud_native_gis.utils.range_request import get_reader
 
 
 def serve_pmtiles(request, layer_uuid):
@@ -23,4 +30,66 @@ def serve_pmtiles(request, layer_uuid):
     if not os.path.exists(full_path):
         raise Http404("PMTile file does not exist.")
 
-    return serve_bytes_range(request, full_path, 'application/octet-stream')
+    return serve_bytes_range(
+        request, full_path, 'application/octet-stream',
+        max_age=layer.get_cache_max_age()
+    )
+
+
+def serve_pmtiles_tile(request, layer_uuid, z, x, y):
+    """Serve z/x/y tile of pmtiles, read from the archive.
+
+    The tile bytes are returned as stored, with Content-Encoding of the
+    archive tile compression. A tile that is not in the archive, or is
+    outside the archive zoom levels or the tile grid, returns 404.
+    """
+    layer = get_object_or_404(Layer, unique_id=layer_uuid)
+
+    if not layer.pmtile:
+        raise Http404("PMTile file not found for this layer.")
+
+    full_path = layer.pmtile.path
+
+    if not os.path.exists(full_path):
+        raise Http404("PMTile file does not exist.")
+
+    stat_result = os.stat(full_path)
+    etag = file_etag(stat_result)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat_result.st_mtime)
+    )
+    if response is None:
+        reader = get_reader(full_path)
+        try:
+            archive = reader.pmtiles()
+            header = archive.header
+            if (
+                    header['min_zoom'] <= z <= header['max_zoom'] and
+                    0 <= x < 2 ** z and 0 <= y < 2 ** z
+            ):
+                tile = archive.get_tile(z, x, y)
+            else:
+                tile = None
+        except ValueError:
+            raise Http404("PMTile file is not a PMTiles v3 archive.")
+        finally:
+            reader.close()
+
+        if tile is None:
+            response = HttpResponseNotFound()
+        else:
+            response = HttpResponse(
+                tile,
+                content_type=TILE_CONTENT_TYPES.get(
+                    archive.header['tile_type'], 'application/octet-stream'
+                )
+            )
+            encoding = CONTENT_ENCODINGS.get(
+                archive.header['tile_compression']
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+    return patch_cache_headers(
+        response, etag, last_modified=stat_result.st_mtime,
+        max_age=layer.get_cache_max_age()
+    )
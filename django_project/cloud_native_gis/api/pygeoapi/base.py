@@ -5,16 +5,29 @@
 
 import base64
 import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 from functools import wraps
-from typing import Union
+from typing import Optional, Union
 
 from django.conf import settings
 from django.contrib.auth import authenticate
+from django.core.exceptions import ValidationError
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from pygeoapi.api import API, APIRequest
 from pygeoapi.django_.views import apply_gzip
 
-from cloud_native_gis.utils.pygeoapi_config import _layer_to_resource
+from cloud_native_gis.utils.pygeoapi_config import (
+    PygeoapiConfig, resource_registry
+)
+
+# Default number of pygeoapi API instances kept per process.
+PYGEOAPI_API_CACHE_SIZE = 64
+
+_api_instances = OrderedDict()
+_api_instances_lock = threading.Lock()
 
 
 def ogc_authenticate(view_func):
@@ -74,36 +87,94 @@ def get_queryset(request: HttpRequest):
     return Layer.objects.all()
 
 
-def get_resources(request: HttpRequest) -> dict:
+def get_resources(
+        request: HttpRequest, collection_id: Optional[str] = None
+) -> dict:
     """Build a pygeoapi config dict whose ``resources`` section is populated.
 
-    The returned dict is a deep copy of ``settings.PYGEOAPI_CONFIG`` with the
+    The returned dict is a copy of ``settings.PYGEOAPI_CONFIG`` with the
     ``resources`` key replaced by a mapping from collection ID to provider
     definition for every layer returned by :func:`get_queryset`.
+    The resources are read from the
+    :class:`~cloud_native_gis.utils.pygeoapi_config.ResourceRegistry`,
+    so the layer tables are only inspected when a layer changed.
 
     Override :func:`get_queryset` to control which layers are exposed without
     having to touch this function.
 
     :param request: the current Django HTTP request
     :type request: HttpRequest
+    :param collection_id: when given, only the resource of this collection
+        is resolved
+    :type collection_id: str or None
     :returns:
         pygeoapi config dict with ``resources`` populated from the queryset
     :rtype: dict
     """
     from django.db import connection
     qs = get_queryset(request)
+    if collection_id is not None:
+        try:
+            qs = qs.filter(unique_id=collection_id)
+        except (ValueError, ValidationError):
+            qs = qs.none()
+
+    config = PygeoapiConfig({
+        key: copy.deepcopy(value)
+        for key, value in settings.PYGEOAPI_CONFIG.items()
+        if key != 'resources'
+    })
+    # The API is kept by the content of the config, so a changed config
+    # builds a new one.
+    config_hash = hashlib.sha256(
+        json.dumps(config, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    config['resources'], versions = resource_registry.get_resources(
+        qs.only('id', 'unique_id', 'name', 'abstract'),
+        connection.settings_dict
+    )
+    config.version = (config_hash, tuple(versions.items()))
+    return config
 
-    db_settings = connection.settings_dict
-    resources = {
-        str(layer.unique_id): _layer_to_resource(
-            layer, db_settings
-        )
-        for layer in qs
-    }
 
-    config = copy.deepcopy(settings.PYGEOAPI_CONFIG)
-    config['resources'] = resources
-    return config
+def get_api(config: dict) -> Union[API, object]:
+    """
+    Return the pygeoapi API of the config.
+
+    Instances are kept per process by the version of
+    :class:`~cloud_native_gis.utils.pygeoapi_config.PygeoapiConfig`
+    (up to ``CLOUD_NATIVE_GIS_PYGEOAPI_API_CACHE_SIZE``), so requests with
+    the same resources do not build the API again.
+
+    :param config: pygeoapi config dict (e.g. from :func:`get_resources`)
+    :type config: dict
+    :returns: pygeoapi ``API`` (or ``Admin``) instance
+    """
+    version = getattr(config, 'version', None)
+    if version is not None:
+        with _api_instances_lock:
+            api_ = _api_instances.get(version)
+            if api_ is not None:
+                _api_instances.move_to_end(version)
+                return api_
+
+    if config['server'].get('admin'):
+        from pygeoapi.admin import Admin
+        api_ = Admin(config, settings.OPENAPI_DOCUMENT)
+    else:
+        api_ = API(config, settings.OPENAPI_DOCUMENT)
+
+    cache_size = getattr(
+        settings, 'CLOUD_NATIVE_GIS_PYGEOAPI_API_CACHE_SIZE',
+        PYGEOAPI_API_CACHE_SIZE
+    )
+    if version is not None and cache_size:
+        with _api_instances_lock:
+            _api_instances[version] = api_
+            _api_instances.move_to_end(version)
+            while len(_api_instances) > cache_size:
+                _api_instances.popitem(last=False)
+    return api_
 
 
 def execute_with_config(
@@ -136,12 +207,7 @@ def execute_with_config(
         the pygeoapi function
     :rtype: HttpResponse
     """
-    api_: Union[API, object]
-    if config['server'].get('admin'):
-        from pygeoapi.admin import Admin
-        api_ = Admin(config, settings.OPENAPI_DOCUMENT)
-    else:
-        api_ = API(config, settings.OPENAPI_DOCUMENT)
+    api_ = get_api(config)
 
     if 'lang' in request.GET:
         request.GET = request.GET.copy()
@@ -31,7 +31,7 @@ def collections(
     :returns: collection list or single collection metadata as JSON
     :rtype: HttpResponse
     """
-    config = get_resources(request)
+    config = get_resources(request, collection_id)
     return execute_with_config(
         core_api.describe_collections, config, request, collection_id
     )
@@ -51,7 +51,7 @@ def collection_schema(
     :returns: JSON Schema document for the collection
     :rtype: HttpResponse
     """
-    config = get_resources(request)
+    config = get_resources(request, collection_id)
     return execute_with_config(
         core_api.get_collection_schema, config, request, collection_id
     )
@@ -75,7 +75,7 @@ def collection_queryables(
     :returns: queryables document as JSON
     :rtype: HttpResponse
     """
-    config = get_resources(request)
+    config = get_resources(request, collection_id)
     return execute_with_config(
         itemtypes_api.get_collection_queryables, config, request, collection_id
     )
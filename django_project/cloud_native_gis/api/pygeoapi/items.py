@@ -3,15 +3,360 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """OGC API item-level views: collection_items and collection_item."""
 
+import os
+import urllib.parse
+import uuid
+from datetime import datetime
+from http import HTTPStatus
+from typing import Optional
+
 import pygeoapi.api.itemtypes as itemtypes_api
-from django.http import HttpRequest, HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.http import (
+    FileResponse, HttpRequest, HttpResponse, StreamingHttpResponse
+)
+from django.utils.cache import patch_vary_headers
 from django.views.decorators.csrf import csrf_exempt
+from pygeoapi import l10n
+from pygeoapi.api import (
+    APIRequest, CHARSET, F_GZIP, F_HTML, F_JSON, F_JSONLD, FORMAT_TYPES,
+    SYSTEM_LOCALE, evaluate_limit, validate_bbox
+)
 
-from .base import get_resources, execute_with_config, ogc_authenticate
+from cloud_native_gis.api.layer_download import FileWrapper
+from cloud_native_gis.models.layer import Layer
+from cloud_native_gis.tasks import update_pmtiles
+from cloud_native_gis.utils.connection import (
+    count_features, iterate_geojson_page
+)
+from cloud_native_gis.utils.geojson_stream import (
+    gzip_chunks, iterate_feature_collection
+)
+from cloud_native_gis.utils.type import FileType
+from cloud_native_gis.utils.vector_tile import bbox_filter, find_srid
+from .base import (
+    get_api, get_resources, execute_with_config, ogc_authenticate
+)
 
 _CQL_JSON_TYPES = frozenset({'application/cql2+json', 'application/cql+json'})
 _CQL_TEXT_TYPES = frozenset({'application/cql-text', 'text/plain'})
 
+# Query parameters of the items pages that are streamed or exported,
+# a request with any other parameter (filter, sortby, properties, ...)
+# is run by pygeoapi.
+_PAGE_PARAMS = frozenset({'f', 'lang', 'limit', 'offset', 'bbox'})
+
+# Default smallest page (limit) of items that is streamed,
+# None does not stream the items.
+STREAM_ITEMS_MIN_LIMIT = 1000
+
+# Binary formats of the items by the f parameter, which are exported by
+# Layer.export_layer instead of pygeoapi (FlatGeobuf with ogr2ogr,
+# GeoParquet with pyarrow).
+_EXPORT_FORMATS = {
+    'fgb': FileType.FLATGEOBUF,
+    'parquet': FileType.GEOPARQUET
+}
+
+
+def _items_links(
+        api_, api_request: APIRequest, collection_id: str, resource: dict,
+        limit: int, offset: int, matched: Optional[int], returned: int
+) -> list:
+    """Return links of the items page, as pygeoapi builds them."""
+    serialized_query_params = ''.join(
+        f'&{urllib.parse.quote(key, safe="")}='
+        f'{urllib.parse.quote(str(value), safe=",")}'
+        for key, value in api_request.params.items()
+        if key not in ('f', 'offset')
+    )
+    uri = f'{api_.get_collections_url()}/{collection_id}/items'
+    links = [{
+        'type': 'application/geo+json',
+        'rel': api_request.get_linkrel(F_JSON),
+        'title': 'This document as GeoJSON',
+        'href': f'{uri}?f={F_JSON}{serialized_query_params}'
+    }, {
+        'rel': api_request.get_linkrel(F_JSONLD),
+        'type': FORMAT_TYPES[F_JSONLD],
+        'title': 'This document as RDF (JSON-LD)',
+        'href': f'{uri}?f={F_JSONLD}{serialized_query_params}'
+    }, {
+        'type': FORMAT_TYPES[F_HTML],
+        'rel': api_request.get_linkrel(F_HTML),
+        'title': 'This document as HTML',
+        'href': f'{uri}?f={F_HTML}{serialized_query_params}'
+    }]
+    if offset > 0:
+        links.append({
+            'type': 'application/geo+json',
+            'rel': 'prev',
+            'title': 'Items (prev)',
+            'href': (
+                f'{uri}?offset={max(0, offset - limit)}'
+                f'{serialized_query_params}'
+            )
+        })
+    if (matched or 0) > limit + offset or returned == limit:
+        links.append({
+            'type': 'application/geo+json',
+            'rel': 'next',
+            'title': 'Items (next)',
+            'href': f'{uri}?offset={offset + limit}{serialized_query_params}'
+        })
+    links.append({
+        'type': FORMAT_TYPES[F_JSON],
+        'title': l10n.translate(resource['title'], api_request.locale),
+        'rel': 'collection',
+        'href': '/'.join(uri.split('/')[:-1])
+    })
+    return links
+
+
+def _items_page(
+        config: dict, api_request: APIRequest, collection_id: str
+) -> dict:
+    """Return the table and page of the items request.
+
+    Only the ``_PAGE_PARAMS`` query parameters of a PostgreSQL
+    collection are supported.
+
+    :raises ValueError: When a parameter is invalid or not supported.
+    :return: Dict of schema_name, table_name, id_field, limit, offset and
+        where, the SQL clause of the bbox.
+    """
+    unsupported = set(api_request.params) - _PAGE_PARAMS
+    if unsupported:
+        raise ValueError(
+            f'Unsupported parameters: {", ".join(sorted(unsupported))}'
+        )
+
+    resource = config['resources'].get(collection_id)
+    if not resource:
+        raise ValueError('Collection not found')
+    provider = resource['providers'][0]
+    if provider.get('name') != 'PostgreSQL':
+        raise ValueError('Collection is not a PostgreSQL table')
+
+    limit = evaluate_limit(
+        api_request.params.get('limit'),
+        config['server'].get('limits', {}),
+        resource.get('limits', {})
+    )
+    try:
+        offset = int(api_request.params.get('offset') or 0)
+    except ValueError:
+        raise ValueError('offset value should be an integer')
+    if offset < 0:
+        raise ValueError('offset value should be positive or zero')
+    bbox = validate_bbox(api_request.params.get('bbox'))
+    if len(bbox) not in (0, 4):
+        raise ValueError('bbox should be 4 values (minx,miny,maxx,maxy)')
+
+    schema_name = provider['data']['search_path'][0]
+    table_name = provider['table']
+    where = ''
+    if bbox:
+        srid = find_srid(f'{schema_name}.{table_name}')
+        where = f'WHERE {bbox_filter(bbox, srid)}'
+    return {
+        'schema_name': schema_name,
+        'table_name': table_name,
+        'id_field': provider['id_field'],
+        'limit': limit,
+        'offset': offset,
+        'where': where
+    }
+
+
+def _stream_collection_items(
+        config: dict, request: HttpRequest, collection_id: str
+) -> Optional[StreamingHttpResponse]:
+    """Return the items page as a streamed GeoJSON FeatureCollection.
+
+    A page of at least ``CLOUD_NATIVE_GIS_OGC_STREAM_MIN_LIMIT`` items is
+    built by PostGIS and sent while it is read from a server side cursor,
+    gzipped on the fly when the client accepts it (unless
+    ``CLOUD_NATIVE_GIS_OGC_STREAM_GZIP`` is disabled), so neither the time
+    to the first byte nor the memory grows with the page size.
+
+    Smaller pages, other formats and the query parameters that are not in
+    ``_PAGE_PARAMS`` return None, so the request is run by pygeoapi,
+    which also reports the invalid parameters.
+    """
+    min_limit = getattr(
+        settings, 'CLOUD_NATIVE_GIS_OGC_STREAM_MIN_LIMIT',
+        STREAM_ITEMS_MIN_LIMIT
+    )
+    if min_limit is None or not set(request.GET) <= _PAGE_PARAMS:
+        return None
+
+    api_ = get_api(config)
+    api_request = APIRequest.from_django(request, api_.locales)
+    if api_request.format not in (None, F_JSON):
+        return None
+    try:
+        page = _items_page(config, api_request, collection_id)
+    except ValueError:
+        return None
+    if page['limit'] < min_limit:
+        return None
+
+    def tail(returned: int) -> dict:
+        matched = count_features(
+            page['schema_name'], page['table_name'], page['where']
+        )
+        return {
+            'numberMatched': matched,
+            'numberReturned': returned,
+            'links': _items_links(
+                api_, api_request, collection_id,
+                config['resources'][collection_id],
+                page['limit'], page['offset'], matched, returned
+            ),
+            'timeStamp': datetime.utcnow().strftime(
+                '%Y-%m-%dT%H:%M:%S.%fZ'
+            )
+        }
+
+    headers = api_request.get_response_headers(
+        SYSTEM_LOCALE, **api_.api_headers
+    )
+    chunks = iterate_feature_collection(
+        iterate_geojson_page(
+            page['schema_name'], page['table_name'], page['id_field'],
+            page['where'], page['offset'], page['limit']
+        ),
+        tail
+    )
+    headers.pop('Content-Encoding', None)
+    gzip = getattr(settings, 'CLOUD_NATIVE_GIS_OGC_STREAM_GZIP', True)
+    if gzip and F_GZIP in request.headers.get('Accept-Encoding', ''):
+        headers['Content-Encoding'] = F_GZIP
+        headers['Content-Type'] = (
+            f"{headers['Content-Type']}; charset={CHARSET[0]}"
+        )
+        chunks = gzip_chunks(chunks)
+
+    response = StreamingHttpResponse(chunks)
+    for key, value in headers.items():
+        response[key] = value
+    if gzip:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _export_collection_items(
+        config: dict, request: HttpRequest, collection_id: str,
+        file_type: str
+) -> HttpResponse:
+    """Return the items page as a FlatGeobuf or GeoParquet file.
+
+    The page (``limit``, ``offset`` and ``bbox``) is exported by
+    :meth:`~cloud_native_gis.models.layer.Layer.export_layer` into a
+    temporary file, which is deleted once it is sent.
+    """
+    api_ = get_api(config)
+    api_request = APIRequest.from_django(request, api_.locales)
+    headers = api_request.get_response_headers(
+        SYSTEM_LOCALE, force_type=FORMAT_TYPES[F_JSON], **api_.api_headers
+    )
+    headers.pop('Content-Encoding', None)
+    layer = Layer.objects.filter(unique_id=collection_id).first()
+    try:
+        if layer is None:
+            raise ValueError('Collection not found')
+        page = _items_page(config, api_request, collection_id)
+    except ValueError as e:
+        headers, status, content = api_.get_exception(
+            HTTPStatus.BAD_REQUEST, headers, F_JSON,
+            'InvalidParameterValue', str(e)
+        )
+        return HttpResponse(content, status=status, headers=headers)
+
+    query = (
+        f'SELECT * FROM {page["schema_name"]}.{page["table_name"]} '
+        f'{page["where"]} ORDER BY "{page["id_field"]}" '
+        f'OFFSET {page["offset"]} LIMIT {page["limit"]}'
+    )
+    export_filepath, message = layer.export_layer(
+        file_type, os.path.join(settings.MEDIA_ROOT, 'tmp'),
+        filename=str(uuid.uuid4()), query=query
+    )
+    if not export_filepath:
+        headers, status, content = api_.get_exception(
+            HTTPStatus.INTERNAL_SERVER_ERROR, headers, F_JSON,
+            'NoApplicableCode', message
+        )
+        return HttpResponse(content, status=status, headers=headers)
+
+    response = FileResponse(
+        FileWrapper(export_filepath),
+        as_attachment=True,
+        filename=f'{collection_id}{FileType.to_extension(file_type)}',
+        content_type=FileType.to_content_type(file_type)
+    )
+    response['Content-Language'] = headers['Content-Language']
+    return response
+
+
+def _manage_collection_item(
+        config: dict, request: HttpRequest, action: str,
+        collection_id: str, item_id: str = None
+) -> HttpResponse:
+    """Run a create/update/delete of a feature.
+
+    When it succeeds, the layer version is increased so the cached
+    vector tiles of the layer are not served anymore, and the PMTiles
+    that are touched by the feature (before and after the change)
+    are regenerated in background.
+    """
+    layer = Layer.objects.filter(unique_id=collection_id).first()
+    try:
+        id_field = config['resources'][collection_id]['providers'][0][
+            'id_field'
+        ]
+    except (KeyError, IndexError):
+        id_field = 'id'
+
+    bboxes = []
+    if layer and item_id is not None:
+        bboxes.append(layer.feature_bbox(item_id, id_field))
+
+    args = [collection_id] if item_id is None else [collection_id, item_id]
+    response = execute_with_config(
+        itemtypes_api.manage_collection_item,
+        config, request, action, *args,
+        skip_valid_check=True,
+    )
+    if response.status_code < 300 and layer:
+        layer.increase_version()
+
+        if action == 'create':
+            # The id of new feature is the last part of the location
+            item_id = response.headers.get(
+                'Location', ''
+            ).rstrip('/').split('/')[-1] or None
+        new_bbox = None
+        if action != 'delete' and item_id is not None:
+            new_bbox = layer.feature_bbox(item_id, id_field)
+            bboxes.append(new_bbox)
+
+        bboxes = [bbox for bbox in bboxes if bbox]
+
+        # The coverage can only be extended when the new geometry is known
+        if action == 'delete' or new_bbox:
+            layer.extend_tile_coverage(bboxes)
+        if bboxes and layer.pmtile and getattr(
+                settings, 'CLOUD_NATIVE_GIS_PMTILES_INCREMENTAL', True
+        ):
+            version = layer.version
+            transaction.on_commit(
+                lambda: update_pmtiles.delay(layer.id, bboxes, version)
+            )
+    return response
+
 
 @csrf_exempt
 @ogc_authenticate
@@ -31,6 +376,11 @@ def collection_items(
     - ``properties`` — comma-separated list of property names to include
     - ``filter`` — CQL text filter expression (e.g. ``name='kenya'``)
 
+    Large pages that only use ``limit``, ``offset`` and ``bbox`` are
+    streamed (see :func:`_stream_collection_items`). ``f=fgb`` and
+    ``f=parquet`` return the page as FlatGeobuf (with its spatial index) or
+    GeoParquet, they support the same parameters.
+
     **POST** — behaviour depends on ``Content-Type``:
 
     - ``application/geo+json`` — create a new feature; returns ``201 Created``
@@ -49,9 +399,19 @@ def collection_items(
         or empty 201 (create POST)
     :rtype: HttpResponse
     """
-    config = get_resources(request)
+    config = get_resources(request, collection_id)
 
     if request.method == 'GET':
+        file_type = _EXPORT_FORMATS.get(request.GET.get('f'))
+        if file_type:
+            return _export_collection_items(
+                config, request, collection_id, file_type
+            )
+
+        response = _stream_collection_items(config, request, collection_id)
+        if response is not None:
+            return response
+
         # CQL text filter is passed via ?filter=<expr>
         return execute_with_config(
             itemtypes_api.get_collection_items,
@@ -63,10 +423,8 @@ def collection_items(
         content_type = (request.content_type or '').split(';')[0].strip()
 
         if content_type == 'application/geo+json':
-            return execute_with_config(
-                itemtypes_api.manage_collection_item,
-                config, request, 'create', collection_id,
-                skip_valid_check=True,
+            return _manage_collection_item(
+                config, request, 'create', collection_id
             )
 
         if content_type in _CQL_TEXT_TYPES:
@@ -118,7 +476,7 @@ def collection_item(
     :returns: GeoJSON Feature (GET), empty 204 (PUT), or empty 200 (DELETE)
     :rtype: HttpResponse
     """
-    config = get_resources(request)
+    config = get_resources(request, collection_id)
 
     if request.method == 'GET':
         return execute_with_config(
@@ -126,10 +484,8 @@ def collection_item(
             config, request, collection_id, item_id,
         )
     if request.method == 'PUT':
-        return execute_with_config(
-            itemtypes_api.manage_collection_item,
-            config, request, 'update', collection_id, item_id,
-            skip_valid_check=True,
+        return _manage_collection_item(
+            config, request, 'update', collection_id, item_id
         )
     if request.method == 'DELETE':
         exists = execute_with_config(
@@ -138,10 +494,8 @@ def collection_item(
         )
         if exists.status_code == 404:
             return exists
-        return execute_with_config(
-            itemtypes_api.manage_collection_item,
-            config, request, 'delete', collection_id, item_id,
-            skip_valid_check=True,
+        return _manage_collection_item(
+            config, request, 'delete', collection_id, item_id
         )
     if request.method == 'OPTIONS':
         return execute_with_config(
@@ -37,4 +37,7 @@ def serve_cog(request, layer_uuid):
     if not os.path.exists(full_path):
         raise Http404("COG file does not exist.")
 
-    return serve_bytes_range(request, full_path, 'image/tiff')
+    return serve_bytes_range(
+        request, full_path, 'image/tiff',
+        max_age=layer.get_cache_max_age()
+    )
@@ -3,27 +3,60 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 
-from django.http import Http404, HttpResponse
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import (
+    get_conditional_response, patch_vary_headers
+)
 from rest_framework.views import APIView
 
+from cloud_native_gis.api.base import patch_cache_headers
 from cloud_native_gis.models.layer import Layer
-from cloud_native_gis.utils.vector_tile import querying_vector_tile
+from cloud_native_gis.utils.tile_source import (
+    TileSource, archive_encoding, read_tile, tile_source
+)
 
 
 class VectorTileLayer(APIView):
     """Return Layer in vector tile protobuf."""
 
     def get(self, request, identifier, z, x, y):
-        """Return BasemapLayer list."""
+        """Return BasemapLayer list.
+
+        The tile is read from the PMTiles archive when it is current and
+        covers the zoom, answered empty when the tile coverage of the layer
+        has no features there, otherwise rendered from the layer table.
+        The source is returned in the X-Tile-Source header.
+
+        The ETag is the layer content version and source, so a client that
+        has the tile of current version gets 304 without reading it.
+        Archive tiles also have their content encoding in the ETag, as the
+        compressed and the decompressed tiles are different representations.
+        """
         layer = get_object_or_404(Layer, unique_id=identifier)
-        tiles = querying_vector_tile(
-            layer.query_table_name,
-            field_names=layer.attribute_names,
-            z=z, x=x, y=y
+        source = tile_source(layer, z, x, y)
+        accept_encoding = request.headers.get('Accept-Encoding', '')
+        etag = f'"{layer.unique_id}-{layer.version}"'
+        if source == TileSource.PMTILES:
+            encoding = archive_encoding(layer, accept_encoding)
+            etag = '"{}-{}-{}{}"'.format(
+                layer.unique_id, layer.version, source,
+                f'-{encoding}' if encoding else ''
+            )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            tile, encoding = read_tile(
+                layer, z=z, x=x, y=y, source=source,
+                accept_encoding=accept_encoding
+            )
+            response = HttpResponse(
+                tile, content_type="application/x-protobuf"
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['X-Tile-Source'] = source
+        if source == TileSource.PMTILES:
+            patch_vary_headers(response, ['Accept-Encoding'])
+        return patch_cache_headers(
+            response, etag, max_age=layer.get_cache_max_age()
         )
-
-        # If no tile 404
-        if not len(tiles):
-            raise Http404()
-        return HttpResponse(tiles, content_type="application/x-protobuf")
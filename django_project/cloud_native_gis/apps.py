@@ -21,6 +21,7 @@ class ContextLayerConfig(AppConfig):
     def ready(self):
         """Run startup logic after app registry is populated."""
         _patch_pygeoapi_sql_provider()
+        _patch_pygeoapi_table_model()
 
 
 def _patch_pygeoapi_sql_provider():
@@ -56,3 +57,31 @@ def _patch_pygeoapi_sql_provider():
             raise ProviderInvalidDataError(str(e))
 
     GenericSQLProvider._feature_to_sqlalchemy = _feature_to_sqlalchemy
+
+
+def _patch_pygeoapi_table_model():
+    """Patch pygeoapi get_table_model to be invalidated by layer changes.
+
+    Upstream caches the reflected table model forever, so a re-imported
+    layer keeps the columns of its previous table. The model is cached by
+    :func:`~cloud_native_gis.utils.pygeoapi_config.cached_table_model`
+    instead, which reflects it again after the layer changed.
+    The pooled SQLAlchemy engine of upstream get_engine is kept.
+    """
+    try:
+        from pygeoapi.provider import sql
+    except ImportError:
+        return
+
+    from cloud_native_gis.utils.pygeoapi_config import cached_table_model
+
+    reflect = getattr(
+        sql.get_table_model, '__wrapped__', sql.get_table_model
+    )
+
+    def get_table_model(table_name, id_field, db_search_path, engine):
+        return cached_table_model(
+            reflect, table_name, id_field, db_search_path, engine
+        )
+
+    sql.get_table_model = get_table_model
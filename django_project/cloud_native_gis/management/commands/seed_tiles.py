@@ -0,0 +1,87 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Management command to seed the vector tile cache of layers."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cloud_native_gis.models import Layer
+from cloud_native_gis.tasks import seed_tiles
+
+
+class Command(BaseCommand):
+    """Management command to seed the vector tile cache of layers."""
+
+    help = (
+        'Render the vector tiles of the layer extent to the tile cache, '
+        'so the first requests after an import are not rendered on demand.'
+    )
+
+    def add_arguments(self, parser):
+        """Add arguments."""
+        parser.add_argument(
+            'layers', nargs='*',
+            help='Unique ids of the layers, empty seeds all ready layers.'
+        )
+        parser.add_argument(
+            '--min-zoom', type=int, default=None,
+            help='Minimum zoom, default CLOUD_NATIVE_GIS_SEED_MIN_ZOOM.'
+        )
+        parser.add_argument(
+            '--max-zoom', type=int, default=None,
+            help='Maximum zoom, default CLOUD_NATIVE_GIS_SEED_MAX_ZOOM.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help=(
+                'Number of threads that render the tiles, '
+                'default CLOUD_NATIVE_GIS_SEED_WORKERS.'
+            )
+        )
+        parser.add_argument(
+            '--celery', action='store_true',
+            help='Queue a Celery task per layer instead of seeding here.'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        layers = Layer.objects.filter(is_ready=True)
+        if options['layers']:
+            layers = Layer.objects.filter(unique_id__in=options['layers'])
+            if layers.count() != len(set(options['layers'])):
+                raise CommandError('Some layers do not exist.')
+
+        for layer in layers.order_by('pk'):
+            if options['celery']:
+                seed_tiles.delay(
+                    layer.id, options['min_zoom'], options['max_zoom'],
+                    options['workers']
+                )
+                self.stdout.write(f'Queued seeding of {layer}')
+                continue
+
+            def progress(stats):
+                self.stdout.write(
+                    f"{layer}: zoom {stats['zoom']}, "
+                    f"{stats['rendered']} rendered, "
+                    f"{stats['empty']} empty, "
+                    f"{stats['pmtiles']} from PMTiles, "
+                    f"{stats['tiles_per_second']:.1f} tiles/s"
+                )
+
+            stats = layer.seed_tiles(
+                options['min_zoom'], options['max_zoom'],
+                workers=options['workers'], progress=progress
+            )
+            if not stats:
+                self.stdout.write(
+                    self.style.WARNING(f'{layer} has no features.')
+                )
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{layer}: {stats['rendered']} tiles rendered in "
+                    f"{stats['seconds']:.1f}s "
+                    f"({stats['tiles_per_second']:.1f} tiles/s)"
+                )
+            )
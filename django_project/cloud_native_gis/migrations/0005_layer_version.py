@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cloud_native_gis', '0004_layer_extent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='layer',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Content version of the layer, increased every time the data or attributes change.'),
+        ),
+    ]
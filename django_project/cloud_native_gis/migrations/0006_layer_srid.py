@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cloud_native_gis', '0005_layer_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='layer',
+            name='srid',
+            field=models.IntegerField(blank=True, help_text='SRID of the geometry column of the layer table.', null=True),
+        ),
+    ]
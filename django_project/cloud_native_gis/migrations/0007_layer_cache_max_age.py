@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cloud_native_gis', '0006_layer_srid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='layer',
+            name='cache_max_age',
+            field=models.PositiveIntegerField(blank=True, help_text='Seconds the tiles, PMTiles and COG files of the layer can be cached by clients and CDNs. Empty uses CLOUD_NATIVE_GIS_CACHE_MAX_AGE setting.', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cloud_native_gis', '0007_layer_cache_max_age'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='layer',
+            name='pmtile_version',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Content version of the layer that the PMTiles are generated from.', null=True),
+        ),
+    ]
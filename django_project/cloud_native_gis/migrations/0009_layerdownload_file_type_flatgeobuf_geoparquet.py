@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cloud_native_gis', '0008_layer_pmtile_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='layerdownload',
+            name='file_type',
+            field=models.CharField(choices=[('original', 'original'), ('geojson', 'geojson'), ('kml', 'kml'), ('shapefile', 'shapefile'), ('geopackage', 'geopackage'), ('flatgeobuf', 'flatgeobuf'), ('geoparquet', 'geoparquet')], max_length=256),
+        ),
+    ]
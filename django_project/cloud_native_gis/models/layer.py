@@ -3,8 +3,10 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 
+import mmap
 import os
 import subprocess
+import tempfile
 import uuid
 import zipfile
 from pathlib import Path
@@ -12,8 +14,9 @@ from pathlib import Path
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files import File
-from django.db import connection, models
-from django.db.models.signals import post_delete
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.urls import reverse
 
@@ -21,10 +24,32 @@ from cloud_native_gis.models.general import (
     AbstractTerm, AbstractResource, License
 )
 from cloud_native_gis.models.style import Style
-from cloud_native_gis.utils.connection import delete_table, fields
-from cloud_native_gis.utils.fiona import list_layers
+from cloud_native_gis.utils.connection import (
+    delete_table, fields, iterate_feature_bboxes, iterate_geojson_features,
+    optimize_table
+)
 from cloud_native_gis.utils.geopandas import create_id_field
+from cloud_native_gis.utils.main import command_installed
+from cloud_native_gis.utils.pmtiles import (
+    PMTilesReader, compress, tileid_to_zxy, update_archive, zxy_to_tileid
+)
+from cloud_native_gis.utils.pmtiles_builder import (
+    PMTILES_MAX_ZOOM, PMTILES_MIN_ZOOM, PMTILES_WORKERS, PMTilesEngine,
+    build_pmtiles
+)
+from cloud_native_gis.utils.pygeoapi_config import (
+    RESOURCE_FIELDS, invalidate_resource, resource_values
+)
+from cloud_native_gis.utils.tile_coverage import (
+    build_tile_coverage, extend_tile_coverage
+)
+from cloud_native_gis.utils.tile_seed import (
+    SEED_MAX_ZOOM, SEED_MIN_ZOOM, SEED_WORKERS, seed_tiles
+)
 from cloud_native_gis.utils.type import FileType
+from cloud_native_gis.utils.vector_tile import (
+    TILE_BUFFER, TILE_EXTENT, find_srid, querying_vector_tile, tile_range
+)
 
 FOLDER_FILES = 'cloud_native_gis_files'
 PMTILES_FOLDER = 'pmtile_files'
@@ -35,6 +60,18 @@ FOLDER_URL = os.path.join(
     settings.MEDIA_URL, FOLDER_FILES
 )
 
+# Default seconds that the tiles and files of layer can be cached
+# by clients and CDNs.
+CACHE_MAX_AGE = 60 * 60
+
+# Default maximum number of tiles that are regenerated incrementally,
+# more than this needs a full regeneration.
+PMTILES_INCREMENTAL_MAX_TILES = 5000
+
+# First key of the advisory lock that serialises the PMTiles updates,
+# the second key is the layer id.
+PMTILES_LOCK_KEY = 1347243084
+
 User = get_user_model()
 
 
@@ -106,11 +143,63 @@ class Layer(AbstractTerm, AbstractResource):
             'Bounding box [xmin, ymin, xmax, ymax] in EPSG:4326.'
         )
     )
+    srid = models.IntegerField(
+        null=True, blank=True,
+        help_text='SRID of the geometry column of the layer table.'
+    )
+    cache_max_age = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text=(
+            'Seconds the tiles, PMTiles and COG files of the layer can be '
+            'cached by clients and CDNs. '
+            'Empty uses CLOUD_NATIVE_GIS_CACHE_MAX_AGE setting.'
+        )
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=(
+            'Content version of the layer, '
+            'increased every time the data or attributes change.'
+        )
+    )
+    pmtile_version = models.PositiveIntegerField(
+        null=True, blank=True,
+        editable=False,
+        help_text=(
+            'Content version of the layer that the PMTiles are '
+            'generated from.'
+        )
+    )
 
     def __str__(self):
         """Return str."""
         return f'{self.name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Keep the loaded values that the pygeoapi resource is built from.
+
+        Saving the layer only invalidates the resource when they changed,
+        see invalidate_resource.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._resource_values = resource_values(instance)
+        return instance
+
+    def increase_version(self):
+        """Increase the content version of the layer."""
+        Layer.objects.filter(pk=self.pk).update(version=F('version') + 1)
+        self.refresh_from_db(fields=['version'])
+
+    def get_cache_max_age(self) -> int:
+        """Return seconds the tiles and files of layer can be cached."""
+        if self.cache_max_age is not None:
+            return self.cache_max_age
+        return getattr(
+            settings, 'CLOUD_NATIVE_GIS_CACHE_MAX_AGE', CACHE_MAX_AGE
+        )
+
     @property
     def table_name(self):
         """Return table name of this layer."""
@@ -152,6 +241,28 @@ class Layer(AbstractTerm, AbstractResource):
             '/2/', '/{z}/'
         )
 
+    @property
+    def pmtiles_tile_url(self):
+        """Return z/x/y tile url that is read from the PMTiles of layer."""
+        if not self.is_ready or not self.pmtile:
+            return None
+
+        return reverse(
+            'serve-pmtiles-tile',
+            kwargs={
+                'layer_uuid': self.unique_id,
+                'x': 0,
+                'y': 1,
+                'z': 2,
+            }
+        ).replace(
+            '/0/', '/{x}/'
+        ).replace(
+            '/1/', '/{y}/'
+        ).replace(
+            '/2/', '/{z}/'
+        )
+
     @property
     def attribute_names(self):
         """Return list of field names in this layer."""
@@ -180,6 +291,15 @@ class Layer(AbstractTerm, AbstractResource):
         else:
             return None
 
+    def absolute_pmtiles_tile_url(self, request):
+        """Return absolute z/x/y tile url of pmtiles."""
+        if self.pmtiles_tile_url and request:
+            return (
+                request.build_absolute_uri('/')[:-1] + self.pmtiles_tile_url
+            )
+        else:
+            return None
+
     def maputnik_url(self, request):
         """Return absolute url for maputnik."""
         from cloud_native_gis.utils.layer import layer_api_url, maputnik_url
@@ -194,157 +314,381 @@ class Layer(AbstractTerm, AbstractResource):
         self.styles.add(style)
         self.save()
 
-    def _convert_to_geojson(self, layer_upload, layer_files: list):
-        """
-        Convert resource to geojson if needed.
+    def _tippecanoe_pmtiles(self, pmtiles_filepath: str) -> bool:
+        """Generate PMTiles to the path with tippecanoe.
 
-        Returns:
-            tuple:
-                - str: FileType
-                - str: json_filepath
+        The features of the layer table are streamed as newline delimited
+        GeoJSON (EPSG:4326) from a server side cursor to the stdin of
+        'tippecanoe', so no intermediate file is written.
+
+        Return whether tippecanoe succeeded.
         """
-        file_type = None
-        layer_filename = None
-        for layer_file in layer_files:
-            file_type = FileType.guess_type(layer_file)
-            if file_type:
-                layer_filename = layer_file
-                break
-
-        if file_type is None:
-            return None, None
-
-        if file_type == FileType.GEOJSON:
-            return file_type, layer_upload.filepath(layer_filename)
-
-        layer_file_path = layer_upload.filepath(layer_filename)
-        base_name = os.path.splitext(layer_filename)[0]
-        json_filename = f"{base_name}.json"
-        json_filepath = (
-            os.path.join(
-                settings.MEDIA_ROOT,
-                PMTILES_FOLDER, json_filename)
+        process = subprocess.Popen(
+            [
+                'tippecanoe',
+                '-zg',
+                '--projection=EPSG:4326',
+                '--force',
+                '-o',
+                pmtiles_filepath,
+                '-l',
+                'default'
+            ],
+            stdin=subprocess.PIPE
         )
+        try:
+            for feature in iterate_geojson_features(
+                    self.schema_name, self.table_name,
+                    self.attribute_names
+            ):
+                process.stdin.write(feature.encode('utf-8') + b'\n')
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+        return process.wait() == 0
 
-        cmd = [
-            'ogr2ogr',
-            '-t_srs',
-            'EPSG:4326',
-            json_filepath,
-            layer_file_path
-        ]
-        if file_type == FileType.GEOPACKAGE or file_type == FileType.KML:
-            layers = list_layers(layer_file_path, file_type)
-            layer_name = layers[0] if layers else 'default'
-            cmd.append(layer_name)
+    def _native_pmtiles(self, pmtiles_filepath: str):
+        """Generate PMTiles to the path with ST_AsMVT tiles.
 
-        subprocess.run(cmd, check=True)
-        return file_type, json_filepath
+        The zoom range and the number of rendering threads are
+        configured by CLOUD_NATIVE_GIS_PMTILES_MIN_ZOOM,
+        CLOUD_NATIVE_GIS_PMTILES_MAX_ZOOM and
+        CLOUD_NATIVE_GIS_PMTILES_WORKERS.
+        """
+        build_pmtiles(
+            pmtiles_filepath,
+            self.query_table_name,
+            attributes=dict(
+                self.layerattributes_set.order_by(
+                    'attribute_name'
+                ).values_list('attribute_name', 'attribute_type')
+            ),
+            srid=self.srid or find_srid(self.query_table_name),
+            bbox=self.extent,
+            min_zoom=getattr(
+                settings, 'CLOUD_NATIVE_GIS_PMTILES_MIN_ZOOM',
+                PMTILES_MIN_ZOOM
+            ),
+            max_zoom=getattr(
+                settings, 'CLOUD_NATIVE_GIS_PMTILES_MAX_ZOOM',
+                PMTILES_MAX_ZOOM
+            ),
+            workers=getattr(
+                settings, 'CLOUD_NATIVE_GIS_PMTILES_WORKERS',
+                PMTILES_WORKERS
+            )
+        )
 
     def generate_pmtiles(self):
         """
         Generate PMTiles for the current layer.
 
-        This method converts a shapefile/geojson/GPKG/KML associated
-        with the latest uploaded layer into PMTiles format
-        using the 'ogr2ogr' and 'tippecanoe' tools.
+        The tiles are generated from the layer table, so the layer does
+        not need an uploaded file. CLOUD_NATIVE_GIS_PMTILES_ENGINE selects
+        whether the tiles are rendered in process with ST_AsMVT ('native')
+        or by the 'tippecanoe' command.
 
         Returns:
             tuple:
                 - bool: Success status of the operation.
                 - str: Message indicating the outcome
         """
-        layer_upload = self.layerupload_set.last()
-        layer_files = layer_upload.files
-        if not layer_files:
+        engine = getattr(
+            settings, 'CLOUD_NATIVE_GIS_PMTILES_ENGINE', PMTilesEngine.NATIVE
+        )
+        if (
+                engine == PMTilesEngine.TIPPECANOE and
+                not command_installed('tippecanoe')
+        ):
             return (
-                False, f"No resource found for layer '{self.name}'.",
+                False,
+                "tippecanoe is not installed on the server."
             )
-        if layer_files:
-            ogr2ogr_installed = (
-                    subprocess.call(
-                        ['which', 'ogr2ogr'],
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE) == 0)
-            tippecanoe_installed = (
-                    subprocess.call(
-                        ['which', 'tippecanoe'],
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE) == 0
+        if not self.extent:
+            self.assign_extent()
+        if not self.extent:
+            return (
+                False, f"No features found for layer '{self.name}'.",
             )
 
-            if not ogr2ogr_installed or not tippecanoe_installed:
-                return (
-                    False,
-                    "ogr2ogr or tippecanoe is not installed on the server."
-                )
+        # The version is read before the tiles are rendered, so changes
+        # made during the generation mark the PMTiles as outdated.
+        self.refresh_from_db(fields=['version'])
+        version = self.version
 
-            pmtiles_folder = (
-                os.path.join(
-                    settings.MEDIA_ROOT,
-                    PMTILES_FOLDER
-                )
-            )
-            if not os.path.exists(pmtiles_folder):
-                os.mkdir(pmtiles_folder)
+        pmtiles_folder = os.path.join(settings.MEDIA_ROOT, PMTILES_FOLDER)
+        os.makedirs(pmtiles_folder, exist_ok=True)
+        descriptor, pmtiles_filepath = tempfile.mkstemp(
+            suffix='.pmtiles', dir=pmtiles_folder
+        )
+        os.close(descriptor)
 
-            try:
-                file_type, json_filepath = self._convert_to_geojson(
-                    layer_upload,
-                    layer_files
-                )
-                if file_type is None:
+        try:
+            if engine == PMTilesEngine.TIPPECANOE:
+                if not self._tippecanoe_pmtiles(pmtiles_filepath):
                     return (
                         False,
-                        "No resource found (.shp/.geojson/.gpkg/.kml) "
-                        f"for layer '{self.name}'.",
+                        f"Failed to generate PMTiles for layer "
+                        f"'{self.name}'."
                     )
+            else:
+                self._native_pmtiles(pmtiles_filepath)
+
+            old_pmtile = self.pmtile.name
+            with open(pmtiles_filepath, 'rb') as pmtiles_file:
+                self.pmtile.save(
+                    f'{self.unique_id}.pmtiles',
+                    File(pmtiles_file),
+                    save=False)
+            self.pmtile_version = version
+            self.save(update_fields=['pmtile', 'pmtile_version'])
+            if old_pmtile and old_pmtile != self.pmtile.name:
+                self.pmtile.storage.delete(old_pmtile)
+
+            return (
+                True,
+                f"PMTiles generated successfully for layer '{self.name}'."
+            )
+        finally:
+            if os.path.exists(pmtiles_filepath):
+                os.remove(pmtiles_filepath)
 
-                base_name = os.path.splitext(
-                    os.path.basename(json_filepath)
-                )[0]
-                pmtiles_filename = f"{base_name}.pmtiles"
-                pmtiles_filepath = (
-                    os.path.join(
-                        str(pmtiles_folder),
-                        pmtiles_filename)
+    def build_tile_coverage(self):
+        """Build the coverage of the layer features on the tile grid.
+
+        Tiles that are not covered are answered as empty without querying
+        the layer table, see utils.tile_coverage.
+        """
+        return build_tile_coverage(
+            self, iterate_feature_bboxes(self.schema_name, self.table_name)
+        )
+
+    def extend_tile_coverage(self, bboxes: list):
+        """Mark the bboxes changed by the current version on the coverage."""
+        extend_tile_coverage(self, bboxes)
+
+    def seed_tiles(
+            self, min_zoom: int = None, max_zoom: int = None,
+            workers: int = None, progress=None
+    ) -> dict:
+        """Render the vector tiles of the layer extent to the tile cache.
+
+        The zoom range and the number of rendering threads default to
+        CLOUD_NATIVE_GIS_SEED_MIN_ZOOM, CLOUD_NATIVE_GIS_SEED_MAX_ZOOM and
+        CLOUD_NATIVE_GIS_SEED_WORKERS.
+
+        :param progress: Called with the statistics after every batch.
+
+        Return statistics of seed_tiles.
+        """
+        if not self.extent:
+            self.assign_extent()
+        if not self.extent:
+            return {}
+        return seed_tiles(
+            self,
+            field_names=self.attribute_names,
+            srid=self.srid or find_srid(self.query_table_name),
+            min_zoom=getattr(
+                settings, 'CLOUD_NATIVE_GIS_SEED_MIN_ZOOM', SEED_MIN_ZOOM
+            ) if min_zoom is None else min_zoom,
+            max_zoom=getattr(
+                settings, 'CLOUD_NATIVE_GIS_SEED_MAX_ZOOM', SEED_MAX_ZOOM
+            ) if max_zoom is None else max_zoom,
+            workers=getattr(
+                settings, 'CLOUD_NATIVE_GIS_SEED_WORKERS', SEED_WORKERS
+            ) if workers is None else workers,
+            progress=progress
+        )
+
+    def feature_bbox(self, feature_id, id_field: str = 'id'):
+        """Return EPSG:4326 bbox of feature, None when it does not exist.
+
+        :return: [xmin, ymin, xmax, ymax]
+        """
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e) "
+                    f"FROM (SELECT Box2D(ST_Transform(geometry, 4326)) AS e "
+                    f"FROM {self.query_table_name} "
+                    f"WHERE \"{id_field}\" = %s) sub",
+                    [feature_id]
                 )
+                row = cursor.fetchone()
+        except DatabaseError:
+            return None
+        if not row or row[0] is None:
+            return None
+        return [row[0], row[1], row[2], row[3]]
 
-                if os.path.exists(pmtiles_filepath):
-                    os.remove(pmtiles_filepath)
-
-                subprocess.run(
-                    [
-                        'tippecanoe',
-                        '-zg',
-                        '--projection=EPSG:4326',
-                        '-o',
-                        pmtiles_filepath,
-                        '-l',
-                        'default',
-                        json_filepath],
-                    check=True
+    def _changed_tile_ids(self, header: dict, bboxes: list):
+        """Return ids of tiles that touch the bboxes, in the archive zooms.
+
+        Return None when there are more than
+        CLOUD_NATIVE_GIS_PMTILES_INCREMENTAL_MAX_TILES tiles.
+        """
+        max_tiles = getattr(
+            settings, 'CLOUD_NATIVE_GIS_PMTILES_INCREMENTAL_MAX_TILES',
+            PMTILES_INCREMENTAL_MAX_TILES
+        )
+        tile_ids = set()
+        for z in range(header['min_zoom'], header['max_zoom'] + 1):
+            for bbox in bboxes:
+                xmin, ymin, xmax, ymax = tile_range(
+                    z, bbox, margin=TILE_BUFFER / TILE_EXTENT
+                )
+                if (
+                        len(tile_ids) +
+                        (xmax - xmin + 1) * (ymax - ymin + 1) > max_tiles
+                ):
+                    return None
+                for x in range(xmin, xmax + 1):
+                    for y in range(ymin, ymax + 1):
+                        tile_ids.add(zxy_to_tileid(z, x, y))
+        return tile_ids
+
+    def _write_changed_tiles(
+            self, reader: PMTilesReader, tile_ids: set, bboxes: list,
+            folder: str
+    ) -> str:
+        """Write archive of reader with re-rendered tile ids to folder.
+
+        Return path of the new archive.
+        """
+        tiles = {}
+        for tile_id in tile_ids:
+            z, x, y = tileid_to_zxy(tile_id)
+            tile = b''.join(
+                querying_vector_tile(
+                    self.query_table_name,
+                    field_names=self.attribute_names,
+                    z=z, x=x, y=y,
+                    srid=self.srid
                 )
+            )
+            tiles[tile_id] = compress(
+                tile, reader.header['tile_compression']
+            ) if tile else None
 
-                with open(pmtiles_filepath, 'rb') as pmtiles_file:
-                    self.pmtile.save(
-                        pmtiles_filename,
-                        File(pmtiles_file),
-                        save=True)
+        descriptor, path = tempfile.mkstemp(suffix='.pmtiles', dir=folder)
+        os.close(descriptor)
+        try:
+            update_archive(
+                reader, path, tiles,
+                bbox=[
+                    min([bbox[0] for bbox in bboxes]),
+                    min([bbox[1] for bbox in bboxes]),
+                    max([bbox[2] for bbox in bboxes]),
+                    max([bbox[3] for bbox in bboxes])
+                ]
+            )
+        except Exception:
+            os.remove(path)
+            raise
+        return path
 
-                os.remove(json_filepath)
-                os.remove(pmtiles_filepath)
+    def update_pmtiles(self, bboxes: list, version: int = None):
+        """
+        Regenerate the PMTiles tiles that are touched by the bboxes.
+
+        The tiles are rendered from the layer table with ST_AsMVT and
+        the new archive is written by copying the bytes of the other
+        tiles from the current archive, so editing a feature does not need
+        a full tippecanoe run. The archive file is replaced in place
+        once the transaction is committed. When there are more than
+        CLOUD_NATIVE_GIS_PMTILES_INCREMENTAL_MAX_TILES tiles to render,
+        the PMTiles are fully regenerated instead, outside of the lock.
+
+        :param bboxes: EPSG:4326 bboxes of the changed features,
+            before and after the change.
+        :param version: Layer version that the change made. When the
+            PMTiles are of the previous version, they are marked as
+            current after the update. When they miss an earlier change,
+            they are fully regenerated.
 
-                return (
-                    True,
-                    f"PMTiles generated successfully for layer '{self.name}'."
-                )
-            except subprocess.CalledProcessError:
-                return (
-                    False,
-                    f"Failed to generate PMTiles for layer '{self.name}'."
+        Returns:
+            tuple:
+                - bool: Success status of the operation.
+                - str: Message indicating the outcome
+        """
+        bboxes = [bbox for bbox in bboxes if bbox]
+        if not bboxes:
+            return True, f"No PMTiles changed for layer '{self.name}'."
+
+        # Serialise the updates of the layer PMTiles with a session advisory
+        # lock, which is held until the archive is replaced after the
+        # commit. The layer row is not locked, so the layer can be saved
+        # while tiles render.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_lock(%s, %s)', [PMTILES_LOCK_KEY, self.pk]
+            )
+        try:
+            with transaction.atomic():
+                tile_ids = self._update_pmtiles(bboxes, version)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_advisory_unlock(%s, %s)',
+                    [PMTILES_LOCK_KEY, self.pk]
                 )
 
+        if tile_ids is None:
+            # The full regeneration does not hold the lock, it writes the
+            # PMTiles to a new file.
+            return self.generate_pmtiles()
+        if tile_ids is False:
+            return False, f"No PMTiles found for layer '{self.name}'."
+        return (
+            True,
+            f"{len(tile_ids)} PMTiles updated for layer '{self.name}'."
+        )
+
+    def _update_pmtiles(self, bboxes: list, version: int = None):
+        """Write the tiles of bboxes to a new archive and replace the file.
+
+        The file is replaced and the PMTiles version is bumped on commit.
+        Return the updated tile ids, None when the PMTiles need a full
+        regeneration or False when there are no PMTiles.
+        """
+        self.refresh_from_db(fields=['pmtile', 'pmtile_version'])
+        if not self.pmtile or not os.path.isfile(self.pmtile.path):
+            return False
+        if (
+                version is not None and
+                self.pmtile_version is not None and
+                self.pmtile_version < version - 1
+        ):
+            return None
+
+        old_path = self.pmtile.path
+        with open(old_path, 'rb') as _file, mmap.mmap(
+                _file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as archive:
+            reader = PMTilesReader(
+                lambda offset, length: archive[offset:offset + length]
+            )
+            tile_ids = self._changed_tile_ids(reader.header, bboxes)
+            if tile_ids is None:
+                return None
+            new_path = self._write_changed_tiles(
+                reader, tile_ids, bboxes, os.path.dirname(old_path)
+            )
+
+        def _replace():
+            # Replace the file atomically, the archive that is being read
+            # keeps being served until it is closed.
+            os.replace(new_path, old_path)
+            if version is not None:
+                Layer.objects.filter(
+                    pk=self.pk, pmtile_version=version - 1
+                ).update(pmtile_version=version)
+
+        transaction.on_commit(_replace)
+        return tile_ids
+
     def _zip_shapefile(self, shp_filepath, working_dir, remove_file=True):
         zip_filepath = os.path.join(
             working_dir,
@@ -370,13 +714,21 @@ class Layer(AbstractTerm, AbstractResource):
         return zip_filepath
 
     def export_layer(
-            self, type: FileType, working_dir: str, filename=None
+            self, type: FileType, working_dir: str, filename=None,
+            query=None
     ):
         """
         Export the current layer to requested format.
 
         This method converts a layer in postgis table into
-        shapefile/geojson/GPKG/KML using the 'ogr2ogr.
+        shapefile/geojson/GPKG/KML/FlatGeobuf using the 'ogr2ogr,
+        and into GeoParquet with pyarrow.
+        FlatGeobuf is written with its packed R-tree index, so clients
+        can read a bbox with HTTP range requests.
+
+        Args:
+            query: SQL of the exported features, e.g. a page of them.
+                Defaults to all features of the layer.
 
         Returns:
             tuple:
@@ -387,7 +739,8 @@ class Layer(AbstractTerm, AbstractResource):
             FileType.GEOJSON: 'GeoJSON',
             FileType.GEOPACKAGE: 'GPKG',
             FileType.KML: 'KML',
-            FileType.SHAPEFILE: 'ESRI Shapefile'
+            FileType.SHAPEFILE: 'ESRI Shapefile',
+            FileType.FLATGEOBUF: 'FlatGeobuf'
         }
         ext = (
             '.shp' if type == FileType.SHAPEFILE else
@@ -406,11 +759,26 @@ class Layer(AbstractTerm, AbstractResource):
                 **connection.settings_dict
             )
         )
-        sql_str = (
+        sql_str = query or (
             'SELECT * FROM {table_name}'.format(
                 table_name=self.query_table_name
             )
         )
+        if type == FileType.GEOPARQUET:
+            # GDAL of the deployment does not have the Parquet driver,
+            # pyarrow is only imported for this export.
+            from cloud_native_gis.utils.geoparquet import (
+                GeoParquetError, export_geoparquet
+            )
+            try:
+                export_geoparquet(sql_str, export_filepath)
+            except (DatabaseError, GeoParquetError) as e:
+                return (None, f'{e}')
+            return (
+                export_filepath,
+                'Success'
+            )
+
         cmd_list = [
             'ogr2ogr',
             '-t_srs',
@@ -425,6 +793,9 @@ class Layer(AbstractTerm, AbstractResource):
         if type == FileType.SHAPEFILE:
             cmd_list.append('-lco')
             cmd_list.append('ENCODING=UTF-8')
+        elif type == FileType.FLATGEOBUF:
+            cmd_list.append('-lco')
+            cmd_list.append('SPATIAL_INDEX=YES')
 
         try:
             subprocess.run(cmd_list, check=True)
@@ -452,6 +823,7 @@ class Layer(AbstractTerm, AbstractResource):
                 attribute_name='id',
                 attribute_type='integer',
             )
+        self.increase_version()
 
     def assign_extent(self):
         """Query PostGIS for the layer extent and save it to the extent."""
@@ -469,6 +841,30 @@ class Layer(AbstractTerm, AbstractResource):
         except Exception:
             pass
 
+    def assign_srid(self):
+        """Query PostGIS for the srid of geometry and save it to the srid."""
+        try:
+            self.srid = find_srid(self.query_table_name)
+            self.save(update_fields=['srid'])
+        except Exception:
+            pass
+
+    def optimize_table(self, table_name: str = None):
+        """Build indexes of the layer table and refresh its statistics.
+
+        The table is clustered on the spatial index when
+        CLOUD_NATIVE_GIS_CLUSTER_ON_IMPORT setting is True.
+
+        :param table_name: Table to optimize, e.g. the staging table.
+            Default to the layer table.
+        """
+        optimize_table(
+            self.schema_name, table_name or self.table_name,
+            cluster=getattr(
+                settings, 'CLOUD_NATIVE_GIS_CLUSTER_ON_IMPORT', False
+            )
+        )
+
     def reset_attributes(self):
         """Reset attributes."""
         new_fields = [
@@ -495,6 +891,7 @@ class Layer(AbstractTerm, AbstractResource):
                         attribute_type=field.type,
                         attribute_order=idx
                     )
+            self.increase_version()
 
 
 class LayerAttributes(models.Model):
@@ -515,6 +912,29 @@ class LayerAttributes(models.Model):
     attribute_order = models.IntegerField(default=0)
 
 
+@receiver(post_save, sender=Layer)
+@receiver(post_delete, sender=Layer)
+def layer_resource_on_change(sender, instance: Layer, using, **kwargs):
+    """Invalidate the pygeoapi resource of the changed layer."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None and kwargs.get('created') is False:
+        # All fields of the existing layer are saved
+        update_fields = RESOURCE_FIELDS
+    invalidate_resource(instance, update_fields)
+    instance._resource_values = resource_values(instance)
+
+
+@receiver(post_save, sender=LayerAttributes)
+@receiver(post_delete, sender=LayerAttributes)
+def layer_attributes_resource_on_change(
+        sender, instance: LayerAttributes, using, **kwargs
+):
+    """Invalidate the pygeoapi resource, as the id field may change."""
+    layer = Layer.objects.filter(pk=instance.layer_id).first()
+    if layer:
+        invalidate_resource(layer)
+
+
 @receiver(post_delete, sender=Layer)
 def layer_on_delete(sender, instance: Layer, using, **kwargs):
     """Delete table and PMTile file when the layer is deleted."""
@@ -60,6 +60,8 @@ class LayerDownload(AbstractResource):
             (FileType.KML, FileType.KML),
             (FileType.SHAPEFILE, FileType.SHAPEFILE),
             (FileType.GEOPACKAGE, FileType.GEOPACKAGE),
+            (FileType.FLATGEOBUF, FileType.FLATGEOBUF),
+            (FileType.GEOPARQUET, FileType.GEOPARQUET),
         ),
         max_length=256
     )
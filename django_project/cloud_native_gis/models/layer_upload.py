@@ -7,8 +7,10 @@ import os
 import shutil
 import zipfile
 
+from celery import chord
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
@@ -17,9 +19,19 @@ from cloud_native_gis.models.layer import Layer, LayerAttributes
 from cloud_native_gis.models.style import (
     Style, LINE, POINT, POLYGON
 )
-from cloud_native_gis.tasks import import_data
-from cloud_native_gis.utils.connection import fields
-from cloud_native_gis.utils.geopandas import collection_to_postgis
+from cloud_native_gis.tasks import (
+    finalize_import_data, import_data, import_data_range, seed_tiles
+)
+from cloud_native_gis.utils.connection import (
+    delete_table, fields, set_table_logged, swap_table
+)
+from cloud_native_gis.utils.copy_loader import (
+    ImportEngine, copy_collection_range, copy_collection_to_postgis,
+    count_collection_features, create_collection_table, merge_metadata
+)
+from cloud_native_gis.utils.geopandas import (
+    collection_to_postgis, create_id_field
+)
 from cloud_native_gis.utils.main import id_generator
 from cloud_native_gis.utils.type import FileType
 
@@ -28,6 +40,11 @@ FOLDER_ROOT = os.path.join(
     settings.MEDIA_ROOT, FOLDER_FILES
 )
 
+# Default number of tasks that import a big file in parallel,
+# and the feature count from which a file is imported in parallel.
+IMPORT_PARALLEL_TASKS = 4
+IMPORT_PARALLEL_MIN_FEATURES = 1000000
+
 
 class UploadStatus(object):
     """Quick access for coupling variable with Log status string."""
@@ -69,6 +86,16 @@ class LayerUpload(AbstractResource):
         """Return unique id."""
         return str(self.layer.unique_id)
 
+    @property
+    def staging_table_name(self):
+        """Return table name that the data is imported to before swap.
+
+        The table is of the upload, so uploads to the same layer do not
+        share it. It is short, the names of its indexes are in the
+        identifier length limit.
+        """
+        return f'upload_{self.pk}_stage'
+
     @property
     def files(self):
         """Return list of files in this layer."""
@@ -106,16 +133,49 @@ class LayerUpload(AbstractResource):
             self.note = note
         self.save()
 
+    def save_data_progress(self, count, total):
+        """Update progress of saving data to database."""
+        self.update_status(
+            note=f'Save data to database ({count}/{total})',
+            progress=25 + (int(25 * count / total) if total else 0)
+        )
+
+    def parallel_ranges(self, filepath) -> list:
+        """Return feature ranges to import in parallel.
+
+        Empty when the file is imported in one task: the engine is not
+        COPY, CLOUD_NATIVE_GIS_IMPORT_PARALLEL_TASKS is below 2 or the
+        file has fewer features than
+        CLOUD_NATIVE_GIS_IMPORT_PARALLEL_MIN_FEATURES.
+        """
+        engine = getattr(
+            settings, 'CLOUD_NATIVE_GIS_IMPORT_ENGINE', ImportEngine.COPY
+        )
+        tasks = getattr(
+            settings, 'CLOUD_NATIVE_GIS_IMPORT_PARALLEL_TASKS',
+            IMPORT_PARALLEL_TASKS
+        )
+        if engine != ImportEngine.COPY or tasks < 2:
+            return []
+        total = count_collection_features(filepath)
+        if total < getattr(
+                settings, 'CLOUD_NATIVE_GIS_IMPORT_PARALLEL_MIN_FEATURES',
+                IMPORT_PARALLEL_MIN_FEATURES
+        ):
+            return []
+        size = -(-total // tasks)
+        return [
+            (start, min(start + size, total))
+            for start in range(0, total, size)
+        ]
+
     def import_data(self):
         """Import data to database."""
         if self.status == UploadStatus.RUNNING:
             return
 
+        layer = self.layer
         try:
-            layer = self.layer
-            layer.is_ready = False
-            layer.save()
-
             # Need to extract first
             self.update_status(
                 status=UploadStatus.RUNNING, note='Extract files', progress=20
@@ -136,67 +196,51 @@ class LayerUpload(AbstractResource):
                         note='Save data to database',
                         progress=25
                     )
-                    metadata = collection_to_postgis(
-                        self.filepath(file),
-                        table_name=layer.table_name,
-                        schema_name=layer.schema_name
-                    )
-
-                    # Save fields to layer
-                    self.update_status(
-                        status=UploadStatus.RUNNING,
-                        note='Save metadata to database',
-                        progress=50
-                    )
-                    self.layer.layerattributes_set.all().delete()
-                    for idx, field in enumerate(
-                            fields(
-                                layer.schema_name,
-                                layer.table_name
-                            )
-                    ):
-                        if field.name != 'geometry':
-                            LayerAttributes.objects.create(
-                                layer=layer,
-                                attribute_name=field.name,
-                                attribute_type=field.type,
-                                attribute_order=idx
+                    ranges = self.parallel_ranges(self.filepath(file))
+                    if ranges:
+                        # The import is finished by finalize_import_data
+                        # after all ranges are copied.
+                        create_collection_table(
+                            self.filepath(file),
+                            table_name=self.staging_table_name,
+                            schema_name=layer.schema_name,
+                            unlogged=True
+                        )
+                        chord(
+                            import_data_range.s(
+                                self.id, file, start, stop,
+                                progress=25 // len(ranges)
                             )
+                            for start, stop in ranges
+                        )(finalize_import_data.s(self.id))
+                        return
 
-                    # Generate pmtiles
-                    self.update_status(
-                        status=UploadStatus.RUNNING,
-                        note='Generate pmtiles',
-                        progress=75
+                    engine = getattr(
+                        settings, 'CLOUD_NATIVE_GIS_IMPORT_ENGINE',
+                        ImportEngine.COPY
                     )
-                    layer.generate_pmtiles()
-
-                    layer.is_ready = True
-                    layer.metadata = metadata
-
-                    # Update default style
-                    geometry_type = metadata['GEOMETRY TYPE'].lower()
-                    if not layer.default_style_id:
-                        default_style = POINT
-                        if 'line' in geometry_type:
-                            default_style = LINE
-                        elif 'polygon' in geometry_type:
-                            default_style = POLYGON
-                        style, _ = Style.objects.get_or_create(
-                            name=Style.default_style_name(geometry_type),
-                            defaults={
-                                'style': default_style
-                            }
+                    if engine == ImportEngine.GEOPANDAS:
+                        metadata = collection_to_postgis(
+                            self.filepath(file),
+                            table_name=self.staging_table_name,
+                            schema_name=layer.schema_name
+                        )
+                    else:
+                        metadata = copy_collection_to_postgis(
+                            self.filepath(file),
+                            table_name=self.staging_table_name,
+                            schema_name=layer.schema_name,
+                            progress=self.save_data_progress
                         )
-                        layer.update_default_style(style)
-                    layer.save()
-                    layer.add_id()
-                    layer.assign_extent()
+                    self.publish_staging_table()
+                    self.save_layer(metadata)
 
                     # stop when found first file
                     break
         except Exception as e:
-            # Save fields to layer
+            # The live table is only replaced when the staging table is
+            # complete, so it keeps serving the previous data.
+            delete_table(layer.schema_name, self.staging_table_name)
             self.update_status(
                 status=UploadStatus.FAILED,
                 note=f'{e}'
@@ -209,11 +253,148 @@ class LayerUpload(AbstractResource):
             )
             # self.delete_folder()
 
+    def import_data_range(self, file, start, stop, progress=0):
+        """Copy features [start, stop) of the file to the staging table.
+
+        Run in parallel with the other ranges, so the status is updated
+        with queryset update instead of save.
+
+        :param progress: Progress to add when the range is copied.
+
+        Return metadata of range, or None when it failed.
+        """
+        layer = self.layer
+        try:
+            metadata = copy_collection_range(
+                self.filepath(file),
+                table_name=self.staging_table_name,
+                schema_name=layer.schema_name,
+                start=start, stop=stop
+            )
+        except Exception as e:
+            LayerUpload.objects.filter(pk=self.pk).update(
+                status=UploadStatus.FAILED, note=f'{e}'
+            )
+            return None
+        LayerUpload.objects.filter(
+            pk=self.pk, status=UploadStatus.RUNNING
+        ).update(progress=F('progress') + progress)
+        return metadata
+
+    def finalize_import_data(self, metadata_list):
+        """Swap the staging table in and save the layer.
+
+        :param metadata_list: Metadata of the ranges, in order.
+        """
+        layer = self.layer
+        self.refresh_from_db()
+        try:
+            if self.status == UploadStatus.FAILED:
+                delete_table(layer.schema_name, self.staging_table_name)
+                return
+            set_table_logged(layer.schema_name, self.staging_table_name)
+            self.publish_staging_table()
+            self.save_layer(merge_metadata(metadata_list))
+        except Exception as e:
+            delete_table(layer.schema_name, self.staging_table_name)
+            self.update_status(
+                status=UploadStatus.FAILED,
+                note=f'{e}'
+            )
+        else:
+            self.update_status(
+                status=UploadStatus.SUCCESS,
+                note='',
+                progress=100
+            )
+
+    def publish_staging_table(self):
+        """Build id and indexes of the staging table and swap it in.
+
+        The live table keeps serving the previous data until the staging
+        table replaces it in one transaction.
+        """
+        layer = self.layer
+        self.update_status(
+            status=UploadStatus.RUNNING,
+            note='Optimize table',
+            progress=50
+        )
+        create_id_field(layer.schema_name, self.staging_table_name)
+        layer.optimize_table(self.staging_table_name)
+        swap_table(
+            layer.schema_name, self.staging_table_name, layer.table_name
+        )
+
+    def save_layer(self, metadata):
+        """Save attributes, pmtiles and metadata of the imported table."""
+        layer = self.layer
+
+        # Save fields to layer
+        self.update_status(
+            status=UploadStatus.RUNNING,
+            note='Save metadata to database',
+            progress=60
+        )
+        self.layer.layerattributes_set.all().delete()
+        for idx, field in enumerate(
+                fields(
+                    layer.schema_name,
+                    layer.table_name
+                )
+        ):
+            if field.name != 'geometry':
+                LayerAttributes.objects.create(
+                    layer=layer,
+                    attribute_name=field.name,
+                    attribute_type=field.type,
+                    attribute_order=idx
+                )
+        layer.assign_extent()
+        layer.assign_srid()
+
+        # Invalidate the cached tiles of previous data
+        layer.increase_version()
+        layer.build_tile_coverage()
+
+        # Generate pmtiles
+        self.update_status(
+            status=UploadStatus.RUNNING,
+            note='Generate pmtiles',
+            progress=75
+        )
+        layer.generate_pmtiles()
+
+        layer.is_ready = True
+        layer.metadata = metadata
+
+        # Update default style
+        geometry_type = metadata['GEOMETRY TYPE'].lower()
+        if not layer.default_style_id:
+            default_style = POINT
+            if 'line' in geometry_type:
+                default_style = LINE
+            elif 'polygon' in geometry_type:
+                default_style = POLYGON
+            style, _ = Style.objects.get_or_create(
+                name=Style.default_style_name(geometry_type),
+                defaults={
+                    'style': default_style
+                }
+            )
+            layer.update_default_style(style)
+        layer.save()
+
+        # Warm up the tile cache of the new data
+        if getattr(settings, 'CLOUD_NATIVE_GIS_SEED_ON_IMPORT', False):
+            transaction.on_commit(lambda: seed_tiles.delay(layer.id))
+
 
 @receiver(post_delete, sender=LayerUpload)
 def layer_upload_on_delete(sender, instance: LayerUpload, using, **kwargs):
-    """Delete folder when the layer deleted."""
+    """Delete folder and staging table when the layer deleted."""
     instance.delete_folder()
+    delete_table(instance.layer.schema_name, instance.staging_table_name)
 
 
 @receiver(post_save, sender=LayerUpload)
@@ -15,6 +15,7 @@ class LayerSerializer(serializers.ModelSerializer):
     """Serializer for layer."""
 
     tile_url = serializers.SerializerMethodField()
+    pmtiles_tile_url = serializers.SerializerMethodField()
     created_by = serializers.SerializerMethodField()
     default_style = serializers.SerializerMethodField()
     styles = serializers.SerializerMethodField()
@@ -35,6 +36,11 @@ class LayerSerializer(serializers.ModelSerializer):
         request = self.context.get('request', None)
         return obj.absolute_tile_url(request)
 
+    def get_pmtiles_tile_url(self, obj: Layer):
+        """Return pmtiles_tile_url."""
+        request = self.context.get('request', None)
+        return obj.absolute_pmtiles_tile_url(request)
+
     def get_created_by(self, obj: Layer):
         """Return created_by."""
         return obj.created_by.username
@@ -25,6 +25,63 @@ def import_data(layer_id):
         logger.error(f'Layer {layer_id} does not exist')
 
 
+@app.task
+def import_data_range(layer_id, file, start, stop, progress=0):
+    """Import a feature range of the file from layer id."""
+    from cloud_native_gis.models import LayerUpload
+    try:
+        layer = LayerUpload.objects.get(id=layer_id)
+        return layer.import_data_range(file, start, stop, progress=progress)
+    except LayerUpload.DoesNotExist:
+        logger.error(f'Layer {layer_id} does not exist')
+
+
+@app.task
+def finalize_import_data(metadata_list, layer_id):
+    """Finalize the parallel import of layer id."""
+    from cloud_native_gis.models import LayerUpload
+    try:
+        layer = LayerUpload.objects.get(id=layer_id)
+        layer.finalize_import_data(metadata_list)
+    except LayerUpload.DoesNotExist:
+        logger.error(f'Layer {layer_id} does not exist')
+
+
+@app.task
+def update_pmtiles(layer_id, bboxes, version=None):
+    """Regenerate the PMTiles of layer id that are touched by bboxes."""
+    from cloud_native_gis.models import Layer
+    try:
+        layer = Layer.objects.get(id=layer_id)
+        success, message = layer.update_pmtiles(bboxes, version)
+        if not success:
+            logger.error(message)
+    except Layer.DoesNotExist:
+        logger.error(f'Layer {layer_id} does not exist')
+
+
+@app.task
+def seed_tiles(layer_id, min_zoom=None, max_zoom=None, workers=None):
+    """Render the vector tiles of layer id to the tile cache."""
+    from cloud_native_gis.models import Layer
+    try:
+        layer = Layer.objects.get(id=layer_id)
+
+        def progress(stats):
+            logger.info(
+                f"Seeding layer {layer_id}: zoom {stats['zoom']}, "
+                f"{stats['rendered']} tiles rendered, "
+                f"{stats['empty']} empty tiles skipped, "
+                f"{stats['tiles_per_second']:.1f} tiles/s"
+            )
+
+        layer.seed_tiles(
+            min_zoom, max_zoom, workers=workers, progress=progress
+        )
+    except Layer.DoesNotExist:
+        logger.error(f'Layer {layer_id} does not exist')
+
+
 @app.task
 def process_layer_download(layer_download_id):
     """Process layer download from layer_download id."""
@@ -3,5 +3,6 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 from .api import *
 from .layer_form import *
+from .models import *
 from .pygeoapi import *
 from .utils import *
@@ -2,4 +2,5 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 from .layer import *
 from .context import *
+from .layer_download import *
 from .pmtile import *
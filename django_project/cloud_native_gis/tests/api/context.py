@@ -84,3 +84,75 @@ class ContextAPIViewTest(BaseTest, TestCase):
             'registry': 'native'
         })
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def test_successful_native_post_query(self):
+        # Points in the body, as x/y list or as GeoJSON MultiPoint
+        with patch('cloud_native_gis.api.context.query_features') as mock_query_features:
+            mock_query_features.return_value = [
+                {'coordinates': (1.0, 1.0), 'feature': {'name': 'Test'}}]
+
+            response = self.client.post('/api/context/', {
+                'key': str(self.layer.unique_id),
+                'x': [1, 2],
+                'y': [1, 2],
+                'registry': 'native',
+                'attr': ['name']
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            kwargs = mock_query_features.call_args.kwargs
+            self.assertEqual(kwargs['coordinates'], [(1.0, 1.0), (2.0, 2.0)])
+            self.assertEqual(kwargs['field_names'], ['name'])
+
+            response = self.client.post('/api/context/', {
+                'key': str(self.layer.unique_id),
+                'geometry': {
+                    'type': 'MultiPoint',
+                    'coordinates': [[3, 4], [5, 6]]
+                },
+                'registry': 'native'
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            kwargs = mock_query_features.call_args.kwargs
+            self.assertEqual(kwargs['coordinates'], [(3.0, 4.0), (5.0, 6.0)])
+
+    def test_invalid_post_query(self):
+        response = self.client.post(
+            '/api/context/', {'key': 'test-layer'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Required request argument', response.data)
+
+        response = self.client.post('/api/context/', {
+            'key': 'test-layer',
+            'geometry': {'type': 'LineString', 'coordinates': [[1, 2]]},
+            'registry': 'native'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Geometry should be a Point or MultiPoint', response.data)
+
+        for geometry in [
+            'POINT (1 2)',
+            [1, 2],
+            {'type': 'Point', 'coordinates': 'a'},
+            {'type': 'Point', 'coordinates': ['1', '2']},
+            {'type': 'MultiPoint', 'coordinates': [1, 2]},
+            {'type': 'MultiPoint', 'coordinates': [[1]]},
+            {'type': 'Feature', 'geometry': None},
+        ]:
+            response = self.client.post('/api/context/', {
+                'key': 'test-layer',
+                'geometry': geometry,
+                'registry': 'native'
+            }, format='json')
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_too_many_points(self):
+        with self.settings(CLOUD_NATIVE_GIS_CONTEXT_MAX_POINTS=1):
+            response = self.client.get('/api/context/', {
+                'key': 'test-layer', 'x': '1,2', 'y': '1,2',
+                'registry': 'native'
+            })
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn('should not exceed 1', response.data)
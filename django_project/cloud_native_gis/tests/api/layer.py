@@ -242,3 +242,60 @@ class DataPreviewAPITest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['count'], 0)
         self.assertEqual(len(response.data['data']), 0)
+
+    def _get_data_preview(self, **data):
+        """Return data preview API response of the query data."""
+        request = self.factory.get(
+            reverse('data-preview', kwargs={
+                'layer_id': self.layer.id
+            }),
+            data=data
+        )
+        request.user = self.superuser
+        return DataPreviewAPI.as_view()(request, layer_id=self.layer.id)
+
+    def test_data_preview_api_cursor(self):
+        """Test data preview API pages with the cursor links."""
+        response = self._get_data_preview(page_size=1)
+        self.assertEqual(response.data['data'][0]['id'], 1)
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+        # Next page
+        cursor = urllib.parse.parse_qs(
+            urllib.parse.urlparse(response.data['next']).query
+        )['cursor']
+        response = self._get_data_preview(page_size=1, cursor=cursor[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['page'], 2)
+        self.assertEqual(response.data['data'][0]['id'], 2)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+        # Back to the first page
+        cursor = urllib.parse.parse_qs(
+            urllib.parse.urlparse(response.data['previous']).query
+        )['cursor']
+        response = self._get_data_preview(page_size=1, cursor=cursor[0])
+        self.assertEqual(response.data['page'], 1)
+        self.assertEqual(response.data['data'][0]['id'], 1)
+        self.assertIsNone(response.data['previous'])
+
+        # Jump to a page
+        response = self._get_data_preview(page_size=1, page=2)
+        self.assertEqual(response.data['data'][0]['id'], 2)
+        self.assertIsNotNone(response.data['previous'])
+        response = self._get_data_preview(page_size=1, page=3)
+        self.assertEqual(len(response.data['data']), 0)
+
+        response = self._get_data_preview(page_size=1, cursor='invalid')
+        self.assertEqual(response.status_code, 400)
+
+    def test_data_preview_api_max_offset(self):
+        """Test the page number can not skip more than the max offset."""
+        with self.settings(CLOUD_NATIVE_GIS_DATA_PREVIEW_MAX_OFFSET=1):
+            response = self._get_data_preview(page_size=1, page=2)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['data'][0]['id'], 2)
+            response = self._get_data_preview(page_size=1, page=3)
+            self.assertEqual(response.status_code, 400)
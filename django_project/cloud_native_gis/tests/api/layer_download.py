@@ -162,6 +162,8 @@ class TestLayerDownloadAPI(TestCase):
             (FileType.SHAPEFILE, '.zip'),
             (FileType.GEOPACKAGE, '.gpkg'),
             (FileType.KML, '.kml'),
+            (FileType.FLATGEOBUF, '.fgb'),
+            (FileType.GEOPARQUET, '.parquet'),
         ]
 
         for file_type, extension in file_types:
@@ -4,6 +4,7 @@
 """Cloud Native GIS."""
 
 import os
+import shutil
 import tempfile
 import uuid
 from django.test import TestCase, RequestFactory
@@ -13,9 +14,14 @@ from django.conf import settings
 from django.urls import reverse
 
 from cloud_native_gis.models.layer import Layer, LayerType
-from cloud_native_gis.api.pmtile import serve_pmtiles
+from cloud_native_gis.api.pmtile import serve_pmtiles, serve_pmtiles_tile
 from cloud_native_gis.tests.model_factories import create_user
-from cloud_native_gis.utils.range_request import RangeRequestReader
+from cloud_native_gis.utils.pmtiles import (
+    Compression, PMTilesWriter, TileType, compress, zxy_to_tileid
+)
+from cloud_native_gis.utils.range_request import (
+    RangeRequestReader, RangeRequestReaderPool, parse_range_header
+)
 
 
 class TestRangeRequestReader(TestCase):
@@ -78,6 +84,15 @@ class TestRangeRequestReader(TestCase):
         self.assertEqual(data, self.test_data)
         self.assertEqual(len(data), 1000)
 
+    def test_iter_range(self):
+        """Test iterating range in chunks closes the reader."""
+        chunks = [
+            bytes(chunk) for chunk in self.reader.iter_range(10, 100, 30)
+        ]
+        self.assertEqual([len(chunk) for chunk in chunks], [30, 30, 30, 10])
+        self.assertEqual(b''.join(chunks), self.test_data[10:110])
+        self.assertTrue(self.reader.mmap.closed)
+
     def test_close(self):
         """Test proper cleanup when closing."""
         reader = RangeRequestReader(self.test_file_path)
@@ -93,6 +108,97 @@ class TestRangeRequestReader(TestCase):
             RangeRequestReader(self.test_file_path)
 
 
+class TestParseRangeHeader(TestCase):
+    """Test class for parsing Range header."""
+
+    def test_ranges(self):
+        """Test first-last, first- and suffix ranges."""
+        self.assertEqual(parse_range_header('bytes=0-99', 1000), [(0, 99)])
+        self.assertEqual(parse_range_header('bytes=500-', 1000), [(500, 999)])
+        self.assertEqual(parse_range_header('bytes=-100', 1000), [(900, 999)])
+        self.assertEqual(parse_range_header('bytes=-5000', 1000), [(0, 999)])
+        self.assertEqual(
+            parse_range_header('bytes=900-2000', 1000), [(900, 999)]
+        )
+
+    def test_multiple_ranges(self):
+        """Test ranges are sorted and the close ones coalesced."""
+        self.assertEqual(
+            parse_range_header('bytes=500-599, 0-99', 1000),
+            [(0, 99), (500, 599)]
+        )
+        self.assertEqual(
+            parse_range_header('bytes=0-99,50-149,160-199', 1000),
+            [(0, 199)]
+        )
+
+    def test_unsatisfiable_and_invalid(self):
+        """Test unsatisfiable, ignored and invalid headers."""
+        self.assertEqual(parse_range_header('bytes=1000-', 1000), [])
+        self.assertEqual(parse_range_header('bytes=-0', 1000), [])
+        self.assertIsNone(parse_range_header('items=0-1', 1000))
+        for header in ['bytes=invalid', 'bytes=5-1', 'bytes=a-b', 'bytes=']:
+            with self.assertRaises(ValueError):
+                parse_range_header(header, 1000)
+
+
+class TestRangeRequestReaderPool(TestCase):
+    """Test class for the pool of readers."""
+
+    def setUp(self):
+        """To setup test."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.pool = RangeRequestReaderPool(size=1)
+
+    def tearDown(self):
+        """To clean up test."""
+        self.pool.clear()
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, data):
+        """Write data to file in temp dir."""
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_reader_is_reused(self):
+        """Test the same reader is returned for the unchanged file."""
+        path = self._write('a.pmtiles', b'a' * 100)
+        reader = self.pool.get(path)
+        reader.close()
+        self.assertFalse(reader.mmap.closed)
+        self.assertIs(self.pool.get(path), reader)
+        reader.close()
+
+    def test_replaced_file_is_reopened(self):
+        """Test the replaced file is not served from the old map."""
+        path = self._write('a.pmtiles', b'a' * 100)
+        reader = self.pool.get(path)
+        os.replace(self._write('b.pmtiles', b'b' * 100), path)
+
+        new_reader = self.pool.get(path)
+        self.assertIsNot(new_reader, reader)
+        self.assertEqual(new_reader.read_range(0, 1), b'b')
+        # The old reader is still open for its user
+        self.assertEqual(reader.read_range(0, 1), b'a')
+        reader.close()
+        self.assertTrue(reader.mmap.closed)
+        new_reader.close()
+
+    def test_evicted_reader_is_closed(self):
+        """Test the least recently used reader is closed after use."""
+        path_a = self._write('a.pmtiles', b'a' * 100)
+        path_b = self._write('b.pmtiles', b'b' * 100)
+        reader_a = self.pool.get(path_a)
+        reader_b = self.pool.get(path_b)
+        self.assertFalse(reader_a.mmap.closed)
+        reader_a.close()
+        self.assertTrue(reader_a.mmap.closed)
+        reader_b.close()
+        self.assertFalse(reader_b.mmap.closed)
+
+
 class TestServePMTiles(TestCase):
     def setUp(self):
         self.user = create_user(password='test')
@@ -120,7 +226,7 @@ class TestServePMTiles(TestCase):
         os.rmdir(self.temp_dir)
 
     @patch('cloud_native_gis.api.pmtile.os.path.exists')
-    @patch('cloud_native_gis.api.base.RangeRequestReader')
+    @patch('cloud_native_gis.api.base.get_reader')
     def test_file_not_found(self, mock_reader, mock_exists):
         """Test 404 response when file doesn't exist."""
         mock_exists.return_value = False
@@ -138,31 +244,61 @@ class TestServePMTiles(TestCase):
         with self.assertRaises(Http404):
             serve_pmtiles(request, layer_uuid)
 
-    @patch('cloud_native_gis.api.pmtile.os.path.exists')
-    @patch('cloud_native_gis.api.base.RangeRequestReader')
-    def test_serve_full_file(self, mock_reader, mock_exists):
-        """Test serving entire file when no range header is present."""
-        mock_exists.return_value = True
-
-        # Setup mock reader
-        mock_reader_instance = MagicMock()
-        mock_reader_instance.read_all.return_value = self.test_data
-        mock_reader.return_value = mock_reader_instance
-
+    @patch('cloud_native_gis.api.base.get_reader')
+    def test_serve_full_file(self, mock_reader):
+        """Test streaming entire file when no range header is present."""
         layer_uuid = str(self.layer_1.unique_id)
         url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
         request = self.factory.get(url)
         response = serve_pmtiles(request, layer_uuid)
 
         self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
         self.assertEqual(response['Content-Type'], 'application/octet-stream')
         self.assertEqual(response['Content-Length'], '1000')
         self.assertEqual(response['Accept-Ranges'], 'bytes')
-        self.assertEqual(response.content, self.test_data)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.test_data
+        )
+        response.close()
+        mock_reader.assert_not_called()
+
+    @patch('cloud_native_gis.api.base.RANGE_RESPONSE_MAX_SIZE', 10)
+    @patch('cloud_native_gis.api.base.STREAM_CHUNK_SIZE', 64)
+    def test_serve_streamed_range(self):
+        """Test streaming a range bigger than RANGE_RESPONSE_MAX_SIZE."""
+        layer_uuid = str(self.layer_1.unique_id)
+        url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
+        request = self.factory.get(url, HTTP_RANGE='bytes=100-399')
+        response = serve_pmtiles(request, layer_uuid)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Length'], '300')
+        self.assertEqual(response['Content-Range'], 'bytes 100-399/1000')
+        self.assertEqual(
+            b''.join(response.streaming_content), self.test_data[100:400]
+        )
+        response.close()
+
+    @patch('cloud_native_gis.api.base.RANGE_RESPONSE_MAX_SIZE', 10)
+    @patch('cloud_native_gis.api.base.get_reader')
+    def test_streamed_range_closed_without_iterating(self, mock_reader):
+        """Test the reader is closed when the stream never started."""
+        layer_uuid = str(self.layer_1.unique_id)
+        url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
+        for range_header in ('bytes=100-399', 'bytes=0-99,500-599'):
+            mock_reader.reset_mock()
+            request = self.factory.get(url, HTTP_RANGE=range_header)
+            response = serve_pmtiles(request, layer_uuid)
+            self.assertEqual(response.status_code, 206)
+            mock_reader.return_value.close.assert_not_called()
+            response.close()
+            mock_reader.return_value.close.assert_called_once()
 
     @patch('cloud_native_gis.api.pmtile.os.path.exists')
     @patch('cloud_native_gis.api.pmtile.os.path.getsize')
-    @patch('cloud_native_gis.api.base.RangeRequestReader')
+    @patch('cloud_native_gis.api.base.get_reader')
     def test_serve_partial_content(
         self, mock_reader, mock_getsize, mock_exists
     ):
@@ -189,7 +325,7 @@ class TestServePMTiles(TestCase):
         self.assertEqual(response.content, self.test_data[0:100])
 
     @patch('cloud_native_gis.api.pmtile.os.path.exists')
-    @patch('cloud_native_gis.api.base.RangeRequestReader')
+    @patch('cloud_native_gis.api.base.get_reader')
     def test_invalid_range_header(self, mock_reader, mock_exists):
         """Test handling of invalid range header."""
         mock_exists.return_value = True
@@ -204,7 +340,7 @@ class TestServePMTiles(TestCase):
 
     @patch('cloud_native_gis.api.pmtile.os.path.exists')
     @patch('cloud_native_gis.api.pmtile.os.path.getsize')
-    @patch('cloud_native_gis.api.base.RangeRequestReader')
+    @patch('cloud_native_gis.api.base.get_reader')
     def test_range_end_omitted(self, mock_reader, mock_getsize, mock_exists):
         """Test range request where end byte is omitted."""
         mock_exists.return_value = True
@@ -226,26 +362,27 @@ class TestServePMTiles(TestCase):
         self.assertEqual(response['Content-Range'], 'bytes 500-999/1000')
 
     @patch('cloud_native_gis.api.pmtile.os.path.exists')
-    @patch('cloud_native_gis.api.base.RangeRequestReader')
+    @patch('cloud_native_gis.api.base.get_reader')
     def test_reader_cleanup(self, mock_reader, mock_exists):
-        """Test that RangeRequestReader is properly closed."""
+        """Test that the reader is properly closed."""
         mock_exists.return_value = True
 
         mock_reader_instance = MagicMock()
-        mock_reader_instance.read_all.return_value = self.test_data
+        mock_reader_instance.read_range.return_value = self.test_data[0:100]
         mock_reader.return_value = mock_reader_instance
 
         layer_uuid = str(self.layer_1.unique_id)
         url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
         request = self.factory.get(url)
+        request.headers = {'Range': 'bytes=0-99'}
         serve_pmtiles(request, layer_uuid)
 
         mock_reader_instance.close.assert_called_once()
 
     @patch('cloud_native_gis.api.pmtile.os.path.exists')
-    @patch('cloud_native_gis.api.base.RangeRequestReader')
+    @patch('cloud_native_gis.api.base.get_reader')
     def test_reader_cleanup_on_error(self, mock_reader, mock_exists):
-        """Test that RangeRequestReader is closed even if an error occurs."""
+        """Test that the reader is closed even if an error occurs."""
         mock_exists.return_value = True
 
         mock_reader_instance = MagicMock()
@@ -261,3 +398,164 @@ class TestServePMTiles(TestCase):
             serve_pmtiles(request, layer_uuid)
 
         mock_reader_instance.close.assert_called_once()
+
+    def test_serve_suffix_range(self):
+        """Test serving the last bytes of file."""
+        layer_uuid = str(self.layer_1.unique_id)
+        url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
+        request = self.factory.get(url, HTTP_RANGE='bytes=-100')
+        response = serve_pmtiles(request, layer_uuid)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 900-999/1000')
+        self.assertEqual(response.content, self.test_data[900:])
+
+    def test_serve_multiple_ranges(self):
+        """Test serving multiple ranges as multipart/byteranges."""
+        layer_uuid = str(self.layer_1.unique_id)
+        url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
+        request = self.factory.get(url, HTTP_RANGE='bytes=0-9,500-509')
+        response = serve_pmtiles(request, layer_uuid)
+
+        self.assertEqual(response.status_code, 206)
+        content_type, boundary = response['Content-Type'].split(
+            '; boundary='
+        )
+        self.assertEqual(content_type, 'multipart/byteranges')
+        content = b''.join(response.streaming_content)
+        self.assertEqual(len(content), int(response['Content-Length']))
+
+        parts = content.split(f'--{boundary}'.encode())
+        self.assertEqual(len(parts), 4)
+        self.assertIn(b'Content-Range: bytes 0-9/1000', parts[1])
+        self.assertTrue(parts[1].endswith(self.test_data[0:10] + b'\r\n'))
+        self.assertIn(b'Content-Range: bytes 500-509/1000', parts[2])
+        self.assertTrue(
+            parts[2].endswith(self.test_data[500:510] + b'\r\n')
+        )
+        self.assertEqual(parts[3], b'--\r\n')
+        response.close()
+
+    def test_range_not_satisfiable(self):
+        """Test 416 response when no range is satisfiable."""
+        layer_uuid = str(self.layer_1.unique_id)
+        url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
+        request = self.factory.get(url, HTTP_RANGE='bytes=1000-1100')
+        response = serve_pmtiles(request, layer_uuid)
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1000')
+
+    def test_conditional_get(self):
+        """Test validators, Cache-Control and 304 response."""
+        self.layer_1.cache_max_age = 600
+        self.layer_1.save()
+        layer_uuid = str(self.layer_1.unique_id)
+        url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
+        response = serve_pmtiles(self.factory.get(url), layer_uuid)
+        response.close()
+        etag = response['ETag']
+        self.assertIn('max-age=600', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+
+        request = self.factory.get(url, HTTP_IF_NONE_MATCH=etag)
+        response = serve_pmtiles(request, layer_uuid)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_range(self):
+        """Test If-Range serves the whole file when it does not match."""
+        layer_uuid = str(self.layer_1.unique_id)
+        url = reverse('serve-pmtiles', kwargs={'layer_uuid': layer_uuid})
+        response = serve_pmtiles(self.factory.get(url), layer_uuid)
+        response.close()
+        etag = response['ETag']
+
+        request = self.factory.get(
+            url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag
+        )
+        response = serve_pmtiles(request, layer_uuid)
+        self.assertEqual(response.status_code, 206)
+
+        request = self.factory.get(
+            url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outdated"'
+        )
+        response = serve_pmtiles(request, layer_uuid)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+
+class TestServePMTilesTile(TestCase):
+    """Test class for serving z/x/y tile of PMTiles."""
+
+    def setUp(self):
+        """To setup test."""
+        self.user = create_user(password='test')
+        self.layer = Layer.objects.create(
+            name='Test Layer',
+            created_by=self.user,
+            is_ready=True
+        )
+        self.temp_dir = tempfile.mkdtemp()
+        path = os.path.join(self.temp_dir, 'test.pmtiles')
+        self.tile = compress(b'tile 1/1/0', Compression.GZIP)
+        writer = PMTilesWriter(path)
+        writer.write_tile(zxy_to_tileid(1, 1, 0), self.tile)
+        writer.finalize(
+            {
+                'tile_compression': Compression.GZIP,
+                'tile_type': TileType.MVT,
+                'min_zoom': 0,
+                'max_zoom': 1,
+                'min_lon_e7': 0,
+                'min_lat_e7': 0,
+                'max_lon_e7': 0,
+                'max_lat_e7': 0,
+                'center_zoom': 0,
+                'center_lon_e7': 0,
+                'center_lat_e7': 0
+            },
+            {}
+        )
+        with open(path, 'rb') as _file:
+            self.layer.pmtile.save('test.pmtiles', _file)
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        """To clean up test."""
+        self.layer.pmtile.delete(save=False)
+        shutil.rmtree(self.temp_dir)
+
+    def _get(self, z, x, y):
+        """Return response of tile."""
+        layer_uuid = str(self.layer.unique_id)
+        url = reverse(
+            'serve-pmtiles-tile',
+            kwargs={'layer_uuid': layer_uuid, 'z': z, 'x': x, 'y': y}
+        )
+        return serve_pmtiles_tile(self.factory.get(url), layer_uuid, z, x, y)
+
+    def test_serve_tile(self):
+        """Test the tile is served as stored in the archive."""
+        response = self._get(1, 1, 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-protobuf')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content, self.tile)
+        self.assertIn('ETag', response)
+        self.assertTrue(
+            self.layer.pmtiles_tile_url.endswith('/{z}/{x}/{y}/')
+        )
+
+    def test_serve_missing_tile(self):
+        """Test tile that is not in the archive returns 404."""
+        response = self._get(1, 0, 0)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.content, b'')
+
+    def test_serve_tile_outside_archive(self):
+        """Test tile outside the zoom levels or the grid returns 404."""
+        for z, x, y in [(2, 0, 0), (40, 0, 0), (1, 2, 0), (1, 0, 2)]:
+            response = self._get(z, x, y)
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.content, b'')
@@ -1,3 +1,4 @@
 # SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
 # SPDX-License-Identifier: AGPL-3.0-or-later
 from .layer import *
+from .layer_download import *
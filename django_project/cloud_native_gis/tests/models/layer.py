@@ -3,19 +3,24 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 
+import json
 import os
 import shutil
 import uuid
 
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 
 from cloud_native_gis.models import (
     Layer, LayerUpload,
     UploadStatus
 )
 from cloud_native_gis.tests.model_factories import create_user
-from cloud_native_gis.utils.connection import count_features
+from cloud_native_gis.utils.connection import count_features, swap_table
 from cloud_native_gis.utils.main import ABS_PATH
+from cloud_native_gis.utils.pmtiles import PMTilesReader, decompress
+from cloud_native_gis.utils.pmtiles_builder import PMTilesEngine
 from cloud_native_gis.utils.type import FileType
 
 
@@ -174,3 +179,205 @@ class TestLayerModel(TestCase):
         self.assertEqual(len(layer.extent), 4)
 
         layer.delete()
+
+    def test_import_data_sets_srid(self):
+        """import_data should store the srid of the geometry column."""
+        layer, _ = self._create_imported_layer()
+        self.assertEqual(layer.srid, 4326)
+        layer.delete()
+
+    def test_import_data_optimizes_table(self):
+        """import_data should index, analyze and swap in the layer table."""
+        from django.db import connection
+        layer, layer_upload = self._create_imported_layer()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT indexname, indexdef FROM pg_indexes '
+                'WHERE schemaname = %s AND tablename = %s',
+                [layer.schema_name, layer.table_name]
+            )
+            indexes = dict(cursor.fetchall())
+        self.assertIn(
+            'USING gist (geometry)',
+            indexes[f'idx_{layer.table_name}_geometry']
+        )
+        self.assertIn(
+            'UNIQUE INDEX', indexes[f'idx_{layer.table_name}_id']
+        )
+
+        with connection.cursor() as cursor:
+            # The statistics are only collected by ANALYZE
+            cursor.execute(
+                'SELECT COUNT(*) FROM pg_stats '
+                'WHERE schemaname = %s AND tablename = %s',
+                [layer.schema_name, layer.table_name]
+            )
+            self.assertGreater(cursor.fetchone()[0], 0)
+
+            # The staging table was swapped in
+            cursor.execute(
+                'SELECT to_regclass(%s)',
+                [f'{layer.schema_name}.{layer_upload.staging_table_name}']
+            )
+            self.assertIsNone(cursor.fetchone()[0])
+
+        layer.delete()
+
+    @override_settings(
+        CLOUD_NATIVE_GIS_IMPORT_PARALLEL_TASKS=4,
+        CLOUD_NATIVE_GIS_IMPORT_PARALLEL_MIN_FEATURES=1
+    )
+    def test_import_data_parallel(self):
+        """import_data should copy ranges in parallel and swap the table."""
+        def run_chord(header):
+            """Run the chord synchronously."""
+            results = [task.apply().get() for task in header]
+            return lambda callback: callback.apply(args=(results,)).get()
+
+        with patch(
+                'cloud_native_gis.models.layer_upload.chord', run_chord
+        ):
+            layer, layer_upload = self._create_imported_layer()
+        layer_upload.refresh_from_db()
+
+        self.assertEqual(layer_upload.status, UploadStatus.SUCCESS)
+        self.assertEqual(layer.metadata['FEATURE COUNT'], 15)
+        self.assertEqual(layer.metadata['GEOMETRY TYPE'], 'Point')
+        self.assertEqual(
+            count_features(layer.schema_name, layer.table_name), 15
+        )
+        self.assertEqual(
+            layer.attribute_names, ['CITY_NAME', 'CITY_TYPE', 'COUNTRY', 'id']
+        )
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT to_regclass(%s)',
+                [f'{layer.schema_name}.{layer_upload.staging_table_name}']
+            )
+            self.assertIsNone(cursor.fetchone()[0])
+        layer.delete()
+
+    def test_reimport_keeps_layer_ready(self):
+        """Re-import should swap the table without making layer not ready."""
+        layer, layer_upload = self._create_imported_layer()
+        version = layer.version
+        statuses = []
+
+        original_swap_table = swap_table
+
+        def _swap_table(*args, **kwargs):
+            """Check the live layer while the new data is being swapped."""
+            layer.refresh_from_db()
+            statuses.append(layer.is_ready)
+            self.assertEqual(
+                count_features(layer.schema_name, layer.table_name), 15
+            )
+            original_swap_table(*args, **kwargs)
+
+        filepath = ABS_PATH(
+            'cloud_native_gis', 'tests', '_fixtures',
+            'capital_cities.zip'
+        )
+        new_upload = LayerUpload.objects.create(
+            layer=layer,
+            created_by=self.user
+        )
+        new_upload.emptying_folder()
+        shutil.copy(filepath, new_upload.folder)
+        with patch(
+                'cloud_native_gis.models.layer_upload.swap_table',
+                _swap_table
+        ):
+            new_upload.import_data()
+        new_upload.refresh_from_db()
+        layer.refresh_from_db()
+
+        self.assertEqual(new_upload.status, UploadStatus.SUCCESS)
+        self.assertEqual(statuses, [True])
+        self.assertTrue(layer.is_ready)
+        self.assertGreater(layer.version, version)
+        self.assertEqual(
+            count_features(layer.schema_name, layer.table_name), 15
+        )
+        self._assert_id_sequence(layer)
+        layer.delete()
+
+    def test_generate_pmtiles_streams_features(self):
+        """generate_pmtiles should stream the table to tippecanoe stdin."""
+        layer, layer_upload = self._create_imported_layer()
+        # The layer only exists in the table
+        layer_upload.emptying_folder()
+        features = []
+
+        class _Stdin:
+            def write(self, data):
+                features.append(json.loads(data))
+
+            def close(self):
+                pass
+
+        class _Process:
+            def __init__(self, command, stdin=None):
+                self.stdin = _Stdin()
+                self.output = command[command.index('-o') + 1]
+
+            def wait(self):
+                with open(self.output, 'wb') as _file:
+                    _file.write(b'pmtiles')
+                return 0
+
+        with override_settings(
+                CLOUD_NATIVE_GIS_PMTILES_ENGINE=PMTilesEngine.TIPPECANOE
+        ), patch(
+            'cloud_native_gis.models.layer.command_installed',
+            return_value=True
+        ), patch(
+            'cloud_native_gis.models.layer.subprocess.Popen', _Process
+        ):
+            success, _ = layer.generate_pmtiles()
+
+        self.assertTrue(success)
+        self.assertEqual(len(features), 15)
+        self.assertEqual(features[0]['type'], 'Feature')
+        self.assertEqual(
+            sorted(features[0]['properties'].keys()),
+            ['CITY_NAME', 'CITY_TYPE', 'COUNTRY', 'id']
+        )
+        layer.refresh_from_db()
+        with layer.pmtile.open('rb') as _file:
+            self.assertEqual(_file.read(), b'pmtiles')
+        layer.delete()
+
+    @override_settings(
+        CLOUD_NATIVE_GIS_PMTILES_ENGINE=PMTilesEngine.NATIVE,
+        CLOUD_NATIVE_GIS_PMTILES_MAX_ZOOM=4,
+        CLOUD_NATIVE_GIS_PMTILES_WORKERS=1
+    )
+    def test_generate_native_pmtiles(self):
+        """generate_pmtiles should build the archive with ST_AsMVT."""
+        layer, _ = self._create_imported_layer()
+        self.assertTrue(layer.generate_pmtiles()[0])
+        layer.refresh_from_db()
+
+        with layer.pmtile.open('rb') as _file:
+            data = _file.read()
+        reader = PMTilesReader(
+            lambda offset, length: data[offset:offset + length]
+        )
+        self.assertEqual(reader.header['max_zoom'], 4)
+        self.assertEqual(
+            reader.metadata()['vector_layers'][0]['id'], 'default'
+        )
+        self.assertIsNotNone(reader.get_tile(0, 0, 0))
+        # Only tiles with features are in the archive
+        self.assertLess(
+            reader.header['addressed_tiles_count'],
+            sum([4 ** z for z in range(5)])
+        )
+        for entry in reader.entries():
+            self.assertGreater(
+                len(decompress(reader.tile_data(entry), 2)), 0
+            )
+        layer.delete()
@@ -8,6 +8,8 @@ import shutil
 import tempfile
 import uuid
 
+import fiona
+import geopandas
 from django.test import TestCase
 
 from cloud_native_gis.models import (
@@ -185,6 +187,51 @@ class TestLayerDownloadModel(TestCase):
         self.assertTrue(os.path.exists(layer_download.path))
         self.assertTrue(layer_download.path.endswith('.kml'))
 
+    def test_download_flatgeobuf_success(self):
+        """Test downloading layer as FlatGeobuf with its spatial index."""
+        layer_download = LayerDownload.export_layer(
+            self.user,
+            self.layer,
+            FileType.FLATGEOBUF,
+            self.working_dir
+        )
+
+        # Run the download
+        layer_download.run()
+
+        # Refresh from database
+        layer_download.refresh_from_db()
+
+        # Assert success
+        self.assertEqual(layer_download.status, DownloadStatus.SUCCESS)
+        self.assertTrue(os.path.exists(layer_download.path))
+        self.assertTrue(layer_download.path.endswith('.fgb'))
+        with fiona.open(layer_download.path) as collection:
+            self.assertEqual(collection.driver, 'FlatGeobuf')
+            self.assertGreater(len(collection), 0)
+
+    def test_download_geoparquet_success(self):
+        """Test downloading layer as GeoParquet."""
+        layer_download = LayerDownload.export_layer(
+            self.user,
+            self.layer,
+            FileType.GEOPARQUET,
+            self.working_dir
+        )
+
+        # Run the download
+        layer_download.run()
+
+        # Refresh from database
+        layer_download.refresh_from_db()
+
+        # Assert success
+        self.assertEqual(layer_download.status, DownloadStatus.SUCCESS)
+        self.assertTrue(layer_download.path.endswith('.parquet'))
+        dataframe = geopandas.read_parquet(layer_download.path)
+        self.assertGreater(len(dataframe), 0)
+        self.assertEqual(dataframe.crs, 'OGC:CRS84')
+
     def test_download_original_file_not_found(self):
         """Test downloading original file when it doesn't exist."""
         # Create layer without upload
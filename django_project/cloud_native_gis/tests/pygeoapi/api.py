@@ -4,17 +4,26 @@
 """Tests for OGC API (pygeoapi) endpoints and base helpers."""
 
 import base64
+import io
+import json
+from unittest.mock import MagicMock, patch
 
+import geopandas
 from django.core.files.storage import FileSystemStorage
-from django.test import TestCase, TransactionTestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIRequestFactory
 
 from core.settings.utils import absolute_path
-from cloud_native_gis.models.layer import Layer
+from cloud_native_gis.models.layer import Layer, LayerAttributes
 from cloud_native_gis.models.layer_upload import LayerUpload
 from cloud_native_gis.tests.base import BaseTest
 from cloud_native_gis.tests.model_factories import create_user
+from cloud_native_gis.utils.connection import iterate_geojson_page
+from cloud_native_gis.utils.pygeoapi_config import (
+    ResourceRegistry, cached_table_model
+)
 
 
 def _cid(layer):
@@ -64,6 +73,119 @@ class BaseHelpersTest(TestCase):
         config = get_resources(self._get())
         self.assertIn(_cid(layer), config['resources'])
 
+    def test_get_resources_single_collection(self):
+        """get_resources resolves only the requested collection."""
+        from cloud_native_gis.api.pygeoapi.base import get_resources
+        layer = Layer.objects.create(name='L1', created_by=self.user)
+        Layer.objects.create(name='L2', created_by=self.user)
+        config = get_resources(self._get(), _cid(layer))
+        self.assertEqual(list(config['resources']), [_cid(layer)])
+        config = get_resources(self._get(), 'not-a-uuid')
+        self.assertEqual(config['resources'], {})
+
+    def test_get_resources_uses_registry(self):
+        """The layer table is only inspected again after the layer changed."""
+        from cloud_native_gis.api.pygeoapi.base import get_resources
+        layer = Layer.objects.create(name='L', created_by=self.user)
+        with patch(
+                'cloud_native_gis.utils.pygeoapi_config._detect_id_field',
+                return_value='id'
+        ) as detect_id_field:
+            get_resources(self._get())
+            config = get_resources(self._get())
+            self.assertEqual(detect_id_field.call_count, 1)
+            self.assertNotIn('password', str(
+                ResourceRegistry.cache().get(
+                    ResourceRegistry.cache_key(layer)
+                )
+            ))
+            self.assertIn(
+                'password', config['resources'][_cid(layer)][
+                    'providers'][0]['data']
+            )
+
+            # Saving other fields keeps the resource
+            layer.save(update_fields=['extent'])
+            get_resources(self._get())
+            self.assertEqual(detect_id_field.call_count, 1)
+
+            # Saving unchanged fields keeps the resource
+            layer.save()
+            Layer.objects.get(pk=layer.pk).save()
+            get_resources(self._get())
+            self.assertEqual(detect_id_field.call_count, 1)
+
+            layer.name = 'New name'
+            layer.save()
+            config = get_resources(self._get())
+            self.assertEqual(detect_id_field.call_count, 2)
+            self.assertEqual(
+                config['resources'][_cid(layer)]['title'], {'en': 'New name'}
+            )
+
+    def test_get_resources_invalidated_per_layer(self):
+        """Changing a layer keeps the resources of the other layers."""
+        from cloud_native_gis.api.pygeoapi.base import get_api, get_resources
+        layer = Layer.objects.create(name='L1', created_by=self.user)
+        other = Layer.objects.create(name='L2', created_by=self.user)
+        with patch(
+                'cloud_native_gis.utils.pygeoapi_config._detect_id_field',
+                return_value='id'
+        ) as detect_id_field:
+            api_ = get_api(get_resources(self._get(), _cid(layer)))
+            get_resources(self._get())
+            self.assertEqual(detect_id_field.call_count, 2)
+
+            other.name = 'New name'
+            other.save()
+            get_resources(self._get())
+            self.assertEqual(detect_id_field.call_count, 3)
+            self.assertIs(
+                get_api(get_resources(self._get(), _cid(layer))), api_
+            )
+
+    def test_get_api_reused_by_version(self):
+        """The API instance is reused for the same resources."""
+        from cloud_native_gis.api.pygeoapi.base import get_api, get_resources
+        layer = Layer.objects.create(name='L', created_by=self.user)
+        api_ = get_api(get_resources(self._get(), _cid(layer)))
+        self.assertIs(get_api(get_resources(self._get(), _cid(layer))), api_)
+        self.assertIsNot(get_api(get_resources(self._get())), api_)
+
+        layer.name = 'New name'
+        layer.save()
+        self.assertIsNot(
+            get_api(get_resources(self._get(), _cid(layer))), api_
+        )
+
+    def test_get_api_by_config(self):
+        """The API instance is built again when the config changed."""
+        from django.conf import settings
+        from cloud_native_gis.api.pygeoapi.base import get_api, get_resources
+        api_ = get_api(get_resources(self._get()))
+        with override_settings(
+                PYGEOAPI_CONFIG={
+                    **settings.PYGEOAPI_CONFIG, 'logging': {'level': 'DEBUG'}
+                }
+        ):
+            self.assertIsNot(get_api(get_resources(self._get())), api_)
+        self.assertIs(get_api(get_resources(self._get())), api_)
+
+    def test_table_model_invalidated(self):
+        """The reflected table model is kept until a layer changed."""
+        layer = Layer.objects.create(name='L', created_by=self.user)
+        reflect = MagicMock(side_effect=lambda *args: object())
+        args = (layer.table_name, 'id', ['public_gis'], 'engine')
+        model = cached_table_model(reflect, *args)
+        self.assertIs(cached_table_model(reflect, *args), model)
+        self.assertEqual(reflect.call_count, 1)
+
+        LayerAttributes.objects.create(
+            layer=layer, attribute_name='name', attribute_type='str'
+        )
+        self.assertIsNot(cached_table_model(reflect, *args), model)
+        self.assertEqual(reflect.call_count, 2)
+
 # ---------------------------------------------------------------------------
 # Authentication – ogc_authenticate decorator
 # ---------------------------------------------------------------------------
@@ -321,6 +443,87 @@ class OGCCollectionTest(BaseTest, TransactionTestCase):
         ).json()
         self.assertEqual(data['numberReturned'], 1)
 
+    def test_items_streamed(self):
+        """Large pages of items are streamed as the same FeatureCollection."""
+        url = _url('collection-items', collection_id=self.cid) + '&limit=5'
+        expected = self.assertRequestGetView(url, 200).json()
+        with override_settings(CLOUD_NATIVE_GIS_OGC_STREAM_MIN_LIMIT=5):
+            response = self.assertRequestGetView(url, 200)
+            self.assertTrue(response.streaming)
+            data = json.loads(b''.join(response.streaming_content))
+            self.assertEqual(data['type'], 'FeatureCollection')
+            self.assertEqual(data['numberMatched'], 2)
+            self.assertEqual(data['numberReturned'], 2)
+            self.assertEqual(
+                sorted(feature['id'] for feature in data['features']),
+                sorted(feature['id'] for feature in expected['features'])
+            )
+            for feature in data['features']:
+                self.assertEqual(feature['type'], 'Feature')
+                self.assertIn('coordinates', feature['geometry'])
+                self.assertIn('name', feature['properties'])
+
+            # Offset and bbox
+            data = json.loads(
+                b''.join(
+                    self.assertRequestGetView(
+                        url + '&offset=1&bbox=-180,-90,180,90', 200
+                    ).streaming_content
+                )
+            )
+            self.assertEqual(data['numberMatched'], 2)
+            self.assertEqual(data['numberReturned'], 1)
+            self.assertIn('prev', [link['rel'] for link in data['links']])
+
+            # Filter is run by pygeoapi
+            response = self.assertRequestGetView(url + '&filter=id%3D1', 200)
+            self.assertFalse(response.streaming)
+
+    def test_items_stream_cursor(self):
+        """Streamed items are read from a cursor that is not holdable."""
+        features = iterate_geojson_page(
+            self.layer.schema_name, self.layer.table_name, 'id', limit=10,
+            fetch_size=1
+        )
+        self.assertEqual(json.loads(next(features))['type'], 'Feature')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT is_holdable FROM pg_cursors "
+                "WHERE name LIKE '_django_curs_%%'"
+            )
+            self.assertEqual(cursor.fetchall(), [(False,)])
+        features.close()
+
+    def test_items_flatgeobuf(self):
+        """GET …/items?f=fgb returns the page as FlatGeobuf."""
+        url = reverse(
+            'collection-items', kwargs={'collection_id': self.cid}
+        ) + '?f=fgb&limit=1'
+        response = self.assertRequestGetView(url, 200)
+        self.assertEqual(response['Content-Type'], 'application/flatgeobuf')
+        self.assertIn('.fgb', response['Content-Disposition'])
+        self.assertTrue(
+            b''.join(response.streaming_content).startswith(b'fgb\x03')
+        )
+
+        # Parameters that are not supported
+        self.assertRequestGetView(url + '&sortby=id', 400)
+
+    def test_items_geoparquet(self):
+        """GET …/items?f=parquet returns the page as GeoParquet."""
+        url = reverse(
+            'collection-items', kwargs={'collection_id': self.cid}
+        ) + '?f=parquet&limit=1'
+        response = self.assertRequestGetView(url, 200)
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.apache.parquet'
+        )
+        dataframe = geopandas.read_parquet(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertEqual(len(dataframe), 1)
+        self.assertIn('name', dataframe.columns)
+
     def test_items_options(self):
         """OPTIONS /ogc/collections/{id}/items is supported."""
         from django.test.client import Client
@@ -3,5 +3,16 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 
+from .copy_loader import *
 from .fiona import *
+from .geojson_stream import *
+from .geometry import *
+from .geoparquet import *
 from .geopandas import *
+from .pmtiles import *
+from .pmtiles_builder import *
+from .tile_cache import *
+from .tile_coverage import *
+from .tile_seed import *
+from .tile_source import *
+from .vector_tile import *
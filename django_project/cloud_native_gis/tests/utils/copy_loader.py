@@ -0,0 +1,124 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import json
+import os
+import tempfile
+import uuid
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from cloud_native_gis.models import Layer
+from cloud_native_gis.tests.model_factories import create_user
+from cloud_native_gis.utils.connection import count_features, fields
+from cloud_native_gis.utils.copy_loader import (
+    _copy_value, copy_collection_to_postgis
+)
+from cloud_native_gis.utils.main import ABS_PATH
+
+
+class TestCopyLoader(TransactionTestCase):
+    """Test class for COPY loader."""
+
+    def setUp(self):
+        """To setup test."""
+        self.user = create_user()
+        self.layer = Layer.objects.create(
+            unique_id=uuid.uuid4(),
+            name='Copy Loader Test',
+            created_by=self.user,
+        )
+
+    def tearDown(self):
+        """Delete the layer."""
+        self.layer.delete()
+
+    def _geojson_file(self, features):
+        """Write features to a temporary geojson file."""
+        _file = tempfile.NamedTemporaryFile(
+            mode='w', suffix='.geojson', delete=False
+        )
+        json.dump({'type': 'FeatureCollection', 'features': features}, _file)
+        _file.close()
+        self.addCleanup(os.remove, _file.name)
+        return _file.name
+
+    def test_copy_value(self):
+        """Test value is escaped in COPY text format."""
+        self.assertEqual(_copy_value(None), '\\N')
+        self.assertEqual(_copy_value(True), 'true')
+        self.assertEqual(_copy_value('a\tb\nc\\d'), 'a\\tb\\nc\\\\d')
+        self.assertEqual(_copy_value(1.5), '1.5')
+
+    @override_settings(CLOUD_NATIVE_GIS_IMPORT_CHUNK_SIZE=4)
+    def test_copy_collection_to_postgis(self):
+        """Test collection is copied in chunks."""
+        filepath = ABS_PATH(
+            'cloud_native_gis', 'tests', '_fixtures',
+            'capital_cities.zip'
+        )
+        progress = []
+        metadata = copy_collection_to_postgis(
+            filepath, self.layer.table_name, self.layer.schema_name,
+            progress=lambda count, total: progress.append((count, total))
+        )
+        self.assertEqual(metadata['FEATURE COUNT'], 15)
+        self.assertEqual(metadata['GEOMETRY SRS'], 'EPSG:4326')
+        self.assertEqual(metadata['GEOMETRY TYPE'], 'Point')
+        self.assertEqual(progress, [(4, 15), (8, 15), (12, 15), (15, 15)])
+        self.assertEqual(
+            count_features(self.layer.schema_name, self.layer.table_name),
+            15
+        )
+        self.assertEqual(
+            [
+                field.name for field in
+                fields(self.layer.schema_name, self.layer.table_name)
+            ],
+            ['CITY_TYPE', 'CITY_NAME', 'COUNTRY', 'geometry']
+        )
+
+    def test_null_and_special_values(self):
+        """Test null and special characters are kept."""
+        filepath = self._geojson_file([
+            {
+                'type': 'Feature',
+                'properties': {'id': 1, 'name': 'a\tb\\c', 'value': None},
+                'geometry': {'type': 'Point', 'coordinates': [1, 2]}
+            },
+            {
+                'type': 'Feature',
+                'properties': {'id': 2, 'name': '', 'value': 1.5},
+                'geometry': None
+            }
+        ])
+        copy_collection_to_postgis(
+            filepath, self.layer.table_name, self.layer.schema_name
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id, name, value, ST_AsText(geometry) '
+                f'FROM {self.layer.query_table_name} ORDER BY id'
+            )
+            self.assertEqual(
+                cursor.fetchall(),
+                [(1, 'a\tb\\c', None, 'POINT(1 2)'), (2, '', 1.5, None)]
+            )
+
+    def test_string_id_raises_value_error(self):
+        """Test ValueError is raised when id is a string."""
+        filepath = self._geojson_file([
+            {
+                'type': 'Feature',
+                'properties': {'id': 'SOM'},
+                'geometry': {'type': 'Point', 'coordinates': [1, 2]}
+            }
+        ])
+        with self.assertRaises(ValueError) as ctx:
+            copy_collection_to_postgis(
+                filepath, self.layer.table_name, self.layer.schema_name
+            )
+        self.assertIn("'id'", str(ctx.exception))
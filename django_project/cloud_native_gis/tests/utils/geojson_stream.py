@@ -0,0 +1,70 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import gzip
+import json
+
+from django.test import TestCase
+
+from cloud_native_gis.utils.geojson_stream import (
+    gzip_chunks, iterate_feature_collection
+)
+
+
+class TestGeojsonStream(TestCase):
+    """Test class for streaming GeoJSON FeatureCollection."""
+
+    def setUp(self):
+        """To setup test."""
+        self.features = [
+            json.dumps(
+                {
+                    'type': 'Feature', 'id': index,
+                    'geometry': None, 'properties': {'name': 'a' * 20}
+                }
+            )
+            for index in range(10)
+        ]
+
+    def test_feature_collection(self):
+        """Test features are chunked into a valid FeatureCollection."""
+        chunks = list(
+            iterate_feature_collection(
+                iter(self.features),
+                lambda returned: {'numberReturned': returned},
+                chunk_size=200
+            )
+        )
+        # The head is sent before the first feature
+        self.assertEqual(
+            chunks[0], b'{"type":"FeatureCollection","features":['
+        )
+        self.assertGreater(len(chunks), 3)
+
+        data = json.loads(b''.join(chunks))
+        self.assertEqual(data['type'], 'FeatureCollection')
+        self.assertEqual(data['numberReturned'], 10)
+        self.assertEqual(
+            [feature['id'] for feature in data['features']], list(range(10))
+        )
+
+    def test_empty_feature_collection(self):
+        """Test FeatureCollection without features."""
+        data = json.loads(
+            b''.join(
+                iterate_feature_collection(
+                    iter([]), lambda returned: {'numberReturned': returned}
+                )
+            )
+        )
+        self.assertEqual(data['features'], [])
+        self.assertEqual(data['numberReturned'], 0)
+
+    def test_gzip_chunks(self):
+        """Test chunks are compressed as one gzip stream."""
+        chunks = [b'{"a":', b'1}']
+        compressed = list(gzip_chunks(iter(chunks)))
+        self.assertEqual(len(compressed), 3)
+        self.assertEqual(gzip.decompress(b''.join(compressed)), b'{"a":1}')
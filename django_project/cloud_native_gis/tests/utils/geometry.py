@@ -0,0 +1,82 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import shutil
+import uuid
+
+from django.test import TestCase
+
+from cloud_native_gis.models import Layer, LayerUpload
+from cloud_native_gis.tests.model_factories import create_user
+from cloud_native_gis.utils.geometry import query_features
+from cloud_native_gis.utils.main import ABS_PATH
+
+
+class TestQueryFeatures(TestCase):
+    """Test class for query features."""
+
+    def setUp(self):
+        """To setup test."""
+        self.user = create_user()
+        filepath = ABS_PATH(
+            'cloud_native_gis', 'tests', '_fixtures',
+            'capital_cities.zip'
+        )
+        self.layer = Layer.objects.create(
+            unique_id=uuid.uuid4(),
+            name='Test Layer',
+            created_by=self.user
+        )
+        layer_upload = LayerUpload.objects.create(
+            layer=self.layer,
+            created_by=self.user
+        )
+        layer_upload.emptying_folder()
+        shutil.copy(filepath, layer_upload.folder)
+        layer_upload.import_data()
+        self.layer.refresh_from_db()
+
+    def tearDown(self):
+        """Delete the layer."""
+        self.layer.delete()
+
+    def test_query_features(self):
+        """Test features are returned in the coordinates order."""
+        coordinates = [
+            (25.92, -24.65),  # Gaborone
+            (-150, -40),  # Pacific ocean
+            (39.27, -6.81)  # Dar es Salaam
+        ]
+        for srid, storage_srid in [(4326, self.layer.srid), (4326, None)]:
+            data = query_features(
+                self.layer.query_table_name,
+                field_names=self.layer.attribute_names,
+                coordinates=coordinates,
+                tolerance=0.1,
+                srid=srid,
+                storage_srid=storage_srid
+            )
+            self.assertEqual(data['status_message'], '')
+            result = data['result']
+            self.assertEqual(
+                [row['coordinates'] for row in result], coordinates
+            )
+            self.assertIn('GABORONE', result[0]['feature'].values())
+            self.assertEqual(
+                set(result[1]['feature'].values()), {''}
+            )
+            self.assertIn('DAR ES SALAAM', result[2]['feature'].values())
+
+    def test_query_features_transformed(self):
+        """Test query in other srid than the storage srid."""
+        data = query_features(
+            self.layer.query_table_name,
+            field_names=self.layer.attribute_names,
+            coordinates=[(2885515.0, -2835000.0)],  # Gaborone
+            tolerance=10000,
+            srid=3857,
+            storage_srid=self.layer.srid
+        )
+        self.assertIn('GABORONE', data['result'][0]['feature'].values())
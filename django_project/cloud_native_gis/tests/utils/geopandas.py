@@ -5,7 +5,7 @@
 
 import uuid
 
-from django.db import connection
+from django.db import connection, transaction
 from django.test import TransactionTestCase
 from psycopg2.errors import InvalidParameterValue, UndefinedColumn
 
@@ -425,3 +425,28 @@ class TestCreateIdField(TransactionTestCase):
 
         self.assertEqual(ids, [1, 2])
         self.assertIn('nextval', self._get_column_default())
+
+    def test_table_created_in_transaction(self):
+        """create_id_field sees a table that is not committed yet."""
+        table_name = f'{self.layer.table_name}_staging'
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TABLE {self.layer.schema_name}.{table_name} AS '
+                    f'SELECT * FROM {self.layer.query_table_name}'
+                )
+            create_id_field(self.layer.schema_name, table_name)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT id FROM {self.layer.schema_name}.{table_name} '
+                    f'ORDER BY id'
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                cursor.execute(
+                    f'DROP TABLE {self.layer.schema_name}.{table_name}'
+                )
+                cursor.execute(
+                    f'DROP SEQUENCE '
+                    f'{self.layer.schema_name}.{table_name}_id_seq'
+                )
+        self.assertEqual(ids, [1, 2])
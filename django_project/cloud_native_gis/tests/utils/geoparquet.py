@@ -0,0 +1,68 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import geopandas
+import pyarrow.parquet as pq
+import shapely
+from django.test import TestCase
+
+from cloud_native_gis.utils.geoparquet import export_geoparquet
+
+Column = namedtuple('Column', 'name type_code')
+
+
+class TestGeoparquet(TestCase):
+    """Test class for GeoParquet export."""
+
+    def setUp(self):
+        """To setup test."""
+        self.folder = tempfile.mkdtemp()
+        self.rows = [
+            (
+                index, f'name {index}', Decimal('1.5'), {'a': [index]},
+                b'ewkb',
+                memoryview(shapely.to_wkb(shapely.Point(index, index)))
+            )
+            for index in range(5)
+        ]
+
+    def tearDown(self):
+        """To clean up test."""
+        shutil.rmtree(self.folder)
+
+    @patch('cloud_native_gis.utils.geoparquet.transaction')
+    @patch('cloud_native_gis.utils.geoparquet.connection')
+    def test_export_geoparquet(self, connection, transaction):
+        """Test rows are written by row groups with WKB geometry."""
+        cursor = MagicMock()
+        cursor.description = [
+            Column('id', 20), Column('name', 25), Column('value', 1700),
+            Column('data', 3802), Column('geometry', 0),
+            Column('__geometry', 17)
+        ]
+        cursor.fetchmany.side_effect = [
+            self.rows[:2], self.rows[2:4], self.rows[4:], []
+        ]
+        connection.chunked_cursor.return_value.__enter__.return_value = (
+            cursor
+        )
+
+        path = os.path.join(self.folder, 'test.parquet')
+        export_geoparquet('SELECT * FROM test.table', path, chunk_size=2)
+
+        self.assertEqual(pq.ParquetFile(path).num_row_groups, 3)
+        dataframe = geopandas.read_parquet(path)
+        self.assertEqual(list(dataframe['id']), [0, 1, 2, 3, 4])
+        self.assertEqual(list(dataframe['value']), [1.5] * 5)
+        self.assertEqual(dataframe['data'][1], '{"a": [1]}')
+        self.assertEqual(dataframe.geometry[3], shapely.Point(3, 3))
+        self.assertEqual(dataframe.crs, 'OGC:CRS84')
@@ -0,0 +1,143 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import os
+import random
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from cloud_native_gis.utils.pmtiles import (
+    Compression, PMTilesReader, PMTilesWriter, TileType, compress,
+    decompress, tileid_to_zxy, update_archive, zxy_to_tileid
+)
+from cloud_native_gis.utils.vector_tile import tile_range
+
+HEADER = {
+    'tile_compression': Compression.GZIP,
+    'tile_type': TileType.MVT,
+    'min_zoom': 0,
+    'max_zoom': 3,
+    'min_lon_e7': 0,
+    'min_lat_e7': 0,
+    'max_lon_e7': 100000000,
+    'max_lat_e7': 100000000,
+    'center_zoom': 0,
+    'center_lon_e7': 0,
+    'center_lat_e7': 0
+}
+
+
+class TestPMTiles(TestCase):
+    """Test class for PMTiles archive."""
+
+    def setUp(self):
+        """To setup test."""
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """To clean up test."""
+        shutil.rmtree(self.folder)
+
+    def _reader(self, path):
+        """Return reader of archive in path."""
+        with open(path, 'rb') as _file:
+            data = _file.read()
+        return PMTilesReader(lambda offset, length: data[offset:offset + length])
+
+    def _write(self, tiles: dict, name='test.pmtiles'):
+        """Write archive of tiles."""
+        path = os.path.join(self.folder, name)
+        writer = PMTilesWriter(path)
+        for tile_id in sorted(tiles):
+            writer.write_tile(tile_id, tiles[tile_id])
+        writer.finalize(HEADER, {'name': 'test'})
+        return path
+
+    def test_tile_id(self):
+        """Test tile id of z/x/y."""
+        self.assertEqual(zxy_to_tileid(0, 0, 0), 0)
+        self.assertEqual(zxy_to_tileid(1, 0, 0), 1)
+        self.assertEqual(zxy_to_tileid(1, 0, 1), 2)
+        self.assertEqual(zxy_to_tileid(1, 1, 1), 3)
+        self.assertEqual(zxy_to_tileid(1, 1, 0), 4)
+        self.assertEqual(zxy_to_tileid(2, 0, 0), 5)
+        for tile_id in range(1000):
+            self.assertEqual(
+                zxy_to_tileid(*tileid_to_zxy(tile_id)), tile_id
+            )
+
+    def test_tile_range(self):
+        """Test range of tiles of bbox."""
+        self.assertEqual(tile_range(0, [-180, -90, 180, 90]), [0, 0, 0, 0])
+        self.assertEqual(tile_range(1, [10, 10, 20, 20]), [1, 0, 1, 0])
+        self.assertEqual(
+            tile_range(1, [-10, -10, 10, 10]), [0, 0, 1, 1]
+        )
+        self.assertEqual(
+            tile_range(2, [10, 10, 20, 20], margin=0.5), [1, 1, 2, 2]
+        )
+
+    def test_read_write(self):
+        """Test the written tiles are read back."""
+        tiles = {
+            tile_id: compress(f'tile {tile_id % 7}'.encode(), 2)
+            for tile_id in range(zxy_to_tileid(4, 0, 0))
+        }
+        path = self._write(tiles)
+        reader = self._reader(path)
+        self.assertEqual(reader.metadata(), {'name': 'test'})
+        self.assertEqual(reader.header['max_zoom'], 3)
+        self.assertEqual(reader.header['addressed_tiles_count'], len(tiles))
+        self.assertEqual(reader.header['tile_contents_count'], 7)
+        self.assertEqual(
+            decompress(reader.get_tile(3, 2, 5), 2),
+            f'tile {zxy_to_tileid(3, 2, 5) % 7}'.encode()
+        )
+        self.assertIsNone(reader.get_tile(4, 0, 0))
+
+    def test_leaf_directories(self):
+        """Test archive with more entries than the root directory."""
+        generator = random.Random(0)
+        tiles = {
+            tile_id: str(tile_id).encode() * generator.randint(1, 50)
+            for tile_id in generator.sample(range(300000), 50000)
+        }
+        path = self._write(tiles)
+        reader = self._reader(path)
+        self.assertGreater(reader.header['leaf_directory_length'], 0)
+        for tile_id in generator.sample(sorted(tiles), 100):
+            entry = reader.find_entry(tile_id)
+            self.assertEqual(reader.tile_data(entry), tiles[tile_id])
+        self.assertIsNone(reader.find_entry(300000))
+        self.assertEqual(len(list(reader.entries())), len(tiles))
+
+    def test_update_archive(self):
+        """Test only the replaced tiles are changed."""
+        tiles = {tile_id: b'same' for tile_id in range(10)}
+        tiles[20] = b'other'
+        path = self._write(tiles)
+        new_path = os.path.join(self.folder, 'new.pmtiles')
+        update_archive(
+            self._reader(path), new_path,
+            {5: b'new', 6: None, 20: None, 30: b'added'},
+            bbox=[-20, -20, 5, 5]
+        )
+        reader = self._reader(new_path)
+        result = {}
+        for entry in reader.entries():
+            for tile_id in range(
+                    entry.tile_id, entry.tile_id + entry.run_length
+            ):
+                result[tile_id] = reader.tile_data(entry)
+        expected = {tile_id: b'same' for tile_id in range(10)}
+        expected[5] = b'new'
+        del expected[6]
+        expected[30] = b'added'
+        self.assertEqual(result, expected)
+        self.assertEqual(reader.header['min_lon_e7'], -200000000)
+        self.assertEqual(reader.header['max_lon_e7'], 100000000)
+        self.assertEqual(reader.metadata(), {'name': 'test'})
@@ -0,0 +1,72 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from cloud_native_gis.utils.pmtiles import PMTilesReader, decompress
+from cloud_native_gis.utils.pmtiles_builder import build_pmtiles
+from cloud_native_gis.utils.vector_tile import tile_range
+
+
+@patch('cloud_native_gis.utils.pmtiles_builder.tile_has_features')
+@patch('cloud_native_gis.utils.pmtiles_builder.querying_vector_tile')
+class TestPMTilesBuilder(TestCase):
+    """Test class for building PMTiles archive."""
+
+    def setUp(self):
+        """To setup test."""
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """To clean up test."""
+        shutil.rmtree(self.folder)
+
+    def _build(self, workers: int) -> bytes:
+        """Build archive with workers and return its bytes."""
+        path = os.path.join(self.folder, f'{workers}.pmtiles')
+        build_pmtiles(
+            path, 'test.table', {'name': 'text'}, 4326,
+            bbox=[10, 10, 20, 20], min_zoom=0, max_zoom=3, workers=workers
+        )
+        with open(path, 'rb') as _file:
+            return _file.read()
+
+    def test_build_pmtiles_workers(
+            self, querying_vector_tile, tile_has_features
+    ):
+        """Test the archive is the same whatever the worker count."""
+        threads = set()
+
+        def _tile(table_name, field_names, z, x, y, srid):
+            threads.add(threading.get_ident())
+            # Only the tiles of the point 15, 15 have features
+            if tile_range(z, [15, 15, 15, 15])[:2] == [x, y]:
+                return [f'{z}/{x}/{y}'.encode()]
+            return []
+
+        querying_vector_tile.side_effect = _tile
+        tile_has_features.return_value = False
+
+        data = self._build(1)
+        self.assertEqual(threads, {threading.get_ident()})
+        threads.clear()
+        self.assertEqual(self._build(3), data)
+        self.assertNotIn(threading.get_ident(), threads)
+
+        reader = PMTilesReader(
+            lambda offset, length: data[offset:offset + length]
+        )
+        self.assertEqual(reader.header['max_zoom'], 3)
+        self.assertEqual(reader.header['addressed_tiles_count'], 4)
+        self.assertEqual(
+            decompress(reader.get_tile(3, 4, 3), 2), b'3/4/3'
+        )
+        self.assertIsNone(reader.get_tile(3, 0, 0))
@@ -0,0 +1,75 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import uuid
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from cloud_native_gis.models import Layer, LayerAttributes
+from cloud_native_gis.tests.model_factories import create_user
+from cloud_native_gis.utils.tile_cache import get_vector_tile, tile_cache
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
+        'tiles': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cloud-native-gis-test-tiles',
+            'OPTIONS': {'MAX_ENTRIES': 100}
+        }
+    },
+    CLOUD_NATIVE_GIS_TILE_CACHE='tiles'
+)
+@patch('cloud_native_gis.utils.tile_cache.querying_vector_tile')
+class TestTileCache(TestCase):
+    """Test class for vector tile cache."""
+
+    def setUp(self):
+        """To setup test."""
+        self.user = create_user()
+        self.layer = Layer.objects.create(
+            unique_id=uuid.uuid4(),
+            name='Test Layer',
+            created_by=self.user
+        )
+
+    def tearDown(self):
+        """Clear the cache."""
+        tile_cache().clear()
+
+    def test_tile_is_cached(self, querying_vector_tile):
+        """Test tile is rendered once."""
+        querying_vector_tile.return_value = [b'tile']
+        self.assertEqual(get_vector_tile(self.layer, 1, 0, 0), b'tile')
+        self.assertEqual(get_vector_tile(self.layer, 1, 0, 0), b'tile')
+        self.assertEqual(querying_vector_tile.call_count, 1)
+
+        # Empty tile is also cached
+        querying_vector_tile.return_value = [b'']
+        self.assertEqual(get_vector_tile(self.layer, 1, 1, 0), b'')
+        self.assertEqual(get_vector_tile(self.layer, 1, 1, 0), b'')
+        self.assertEqual(querying_vector_tile.call_count, 2)
+
+    def test_version_invalidates_tile(self, querying_vector_tile):
+        """Test tile is rendered again when the layer changed."""
+        querying_vector_tile.return_value = [b'old']
+        self.assertEqual(get_vector_tile(self.layer, 1, 0, 0), b'old')
+
+        querying_vector_tile.return_value = [b'new']
+        self.layer.increase_version()
+        self.assertEqual(get_vector_tile(self.layer, 1, 0, 0), b'new')
+
+    def test_attributes_keep_version(self, querying_vector_tile):
+        """Test attribute rows do not increase the version one by one."""
+        for name in ['name', 'type']:
+            LayerAttributes.objects.create(
+                layer=self.layer, attribute_name=name, attribute_type='str'
+            )
+        self.layer.refresh_from_db()
+        self.assertEqual(self.layer.version, 0)
@@ -0,0 +1,100 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import uuid
+from types import SimpleNamespace
+
+from django.test import TestCase, override_settings
+
+from cloud_native_gis.utils.tile_coverage import (
+    TileCoverage, build_tile_coverage, extend_tile_coverage,
+    get_tile_coverage
+)
+from cloud_native_gis.utils.tile_cache import tile_cache
+from cloud_native_gis.utils.vector_tile import tile_range
+
+
+class TestTileCoverage(TestCase):
+    """Test class for tile coverage."""
+
+    def test_is_empty(self):
+        """Test only the tiles of the marked bbox are not empty."""
+        coverage = TileCoverage(6, 1)
+        coverage.mark([10, 10, 11, 11])
+        xmin, ymin, xmax, ymax = tile_range(6, [10, 10, 11, 11])
+
+        # Coverage zoom
+        self.assertFalse(coverage.is_empty(6, xmin, ymin))
+        self.assertTrue(coverage.is_empty(6, xmin + 4, ymin))
+        self.assertTrue(coverage.is_empty(6, xmin, ymin - 4))
+
+        # Above the coverage zoom
+        self.assertFalse(coverage.is_empty(0, 0, 0))
+        self.assertFalse(coverage.is_empty(1, 1, 0))
+        self.assertTrue(coverage.is_empty(1, 0, 0))
+        self.assertTrue(coverage.is_empty(1, 1, 1))
+
+        # Below the coverage zoom
+        self.assertFalse(coverage.is_empty(8, xmin * 4 + 1, ymin * 4 + 2))
+        self.assertTrue(coverage.is_empty(8, 0, 0))
+
+        # Outside the grid
+        self.assertTrue(coverage.is_empty(1, 2, 0))
+
+    def test_dumps(self):
+        """Test coverage is loaded from the dumps."""
+        coverage = TileCoverage(4, 3)
+        coverage.mark([-20, -20, -10, -10])
+        loaded = TileCoverage.loads(coverage.dumps())
+        self.assertEqual(loaded.zoom, 4)
+        self.assertEqual(loaded.version, 3)
+        self.assertEqual(loaded.bits, coverage.bits)
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cloud-native-gis-test-coverage'
+        }
+    },
+    CLOUD_NATIVE_GIS_TILE_COVERAGE_ZOOM=4
+)
+class TestTileCoverageCache(TestCase):
+    """Test class for tile coverage in cache."""
+
+    def setUp(self):
+        """To setup test."""
+        self.layer = SimpleNamespace(unique_id=uuid.uuid4(), version=1)
+
+    def tearDown(self):
+        """Clear the cache."""
+        tile_cache().clear()
+
+    def test_coverage_of_version(self):
+        """Test coverage is only used for its layer version."""
+        self.assertIsNone(get_tile_coverage(self.layer))
+
+        build_tile_coverage(self.layer, [[10, 10, 11, 11]])
+        coverage = get_tile_coverage(self.layer)
+        self.assertEqual(coverage.zoom, 4)
+        self.assertTrue(coverage.is_empty(1, 0, 0))
+
+        self.layer.version = 3
+        self.assertIsNone(get_tile_coverage(self.layer))
+
+    def test_extend_coverage(self):
+        """Test coverage is carried to the next version by the change."""
+        build_tile_coverage(self.layer, [[10, 10, 11, 11]])
+        self.layer.version = 2
+        extend_tile_coverage(self.layer, [[-20, -20, -10, -10]])
+        coverage = get_tile_coverage(self.layer)
+        self.assertFalse(coverage.is_empty(1, 0, 1))
+        self.assertFalse(coverage.is_empty(1, 1, 0))
+
+        # A missed change leaves the coverage outdated
+        self.layer.version = 4
+        extend_tile_coverage(self.layer, [[-20, -20, -10, -10]])
+        self.assertIsNone(get_tile_coverage(self.layer))
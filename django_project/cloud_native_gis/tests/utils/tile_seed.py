@@ -0,0 +1,70 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from cloud_native_gis.utils.tile_seed import seed_tiles
+from cloud_native_gis.utils.vector_tile import tile_range
+
+
+@patch('cloud_native_gis.utils.tile_seed.get_vector_tile')
+@patch('cloud_native_gis.utils.tile_seed.tile_has_features')
+class TestTileSeed(TestCase):
+    """Test class for seeding the tile cache."""
+
+    def setUp(self):
+        """To setup test."""
+        self.layer = SimpleNamespace(
+            query_table_name='test.table',
+            extent=[10, 10, 20, 20],
+            pmtile=None,
+            pmtile_version=None,
+            version=1
+        )
+
+    def test_seed_tiles(self, tile_has_features, get_vector_tile):
+        """Test only the tiles with features and their children are seeded."""
+        # Only the tiles of the point 15, 15 have features
+        tile_has_features.side_effect = (
+            lambda table_name, z, x, y, srid:
+            tile_range(z, [15, 15, 15, 15])[:2] == [x, y]
+        )
+        for workers in (1, 3):
+            get_vector_tile.reset_mock()
+            progress = []
+            stats = seed_tiles(
+                self.layer, ['name'], 4326, min_zoom=0, max_zoom=3,
+                workers=workers, progress=progress.append
+            )
+            rendered = sorted(
+                (call.kwargs['z'], call.kwargs['x'], call.kwargs['y'])
+                for call in get_vector_tile.call_args_list
+            )
+            self.assertEqual(
+                rendered, [(0, 0, 0), (1, 1, 0), (2, 2, 1), (3, 4, 3)]
+            )
+            self.assertEqual(stats['rendered'], 4)
+            self.assertEqual(stats['empty'], 3 * 3)
+            self.assertEqual(progress[-1]['zoom'], 3)
+            self.assertEqual(progress[-1]['rendered'], 4)
+
+    @patch('cloud_native_gis.utils.tile_seed.tile_source')
+    def test_seed_skips_pmtiles_zoom(
+            self, tile_source, tile_has_features, get_vector_tile
+    ):
+        """Test zoom levels served from the PMTiles are only walked."""
+        tile_has_features.return_value = True
+        tile_source.side_effect = (
+            lambda layer, z: 'pmtiles' if z < 2 else 'dynamic'
+        )
+        stats = seed_tiles(
+            self.layer, ['name'], 4326, min_zoom=1, max_zoom=2, workers=1
+        )
+        self.assertEqual(stats['pmtiles'], 1)
+        self.assertEqual(stats['rendered'], 4)
+        self.assertEqual(get_vector_tile.call_count, 4)
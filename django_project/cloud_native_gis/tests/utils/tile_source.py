@@ -0,0 +1,145 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from cloud_native_gis.utils.pmtiles import (
+    Compression, PMTilesWriter, TileType, compress, zxy_to_tileid
+)
+from cloud_native_gis.utils.tile_coverage import TileCoverage
+from cloud_native_gis.utils.tile_source import (
+    TileSource, archive_encoding, read_tile, tile_source
+)
+
+
+class TestTileSource(TestCase):
+    """Test class for source of vector tiles."""
+
+    def setUp(self):
+        """To setup test."""
+        self.folder = tempfile.mkdtemp()
+        path = os.path.join(self.folder, 'test.pmtiles')
+        writer = PMTilesWriter(path)
+        writer.write_tile(
+            zxy_to_tileid(1, 0, 0), compress(b'tile', Compression.GZIP)
+        )
+        writer.finalize(
+            {
+                'tile_compression': Compression.GZIP,
+                'tile_type': TileType.MVT,
+                'min_zoom': 0,
+                'max_zoom': 2,
+                'min_lon_e7': 0,
+                'min_lat_e7': 0,
+                'max_lon_e7': 0,
+                'max_lat_e7': 0,
+                'center_zoom': 0,
+                'center_lon_e7': 0,
+                'center_lat_e7': 0
+            },
+            {}
+        )
+        self.layer = SimpleNamespace(
+            pmtile=SimpleNamespace(path=path),
+            pmtile_version=1,
+            version=1
+        )
+
+    def tearDown(self):
+        """To clean up test."""
+        shutil.rmtree(self.folder)
+
+    def test_source(self):
+        """Test tile is read from the current archive of the zoom."""
+        self.assertEqual(tile_source(self.layer, 0), TileSource.PMTILES)
+        self.assertEqual(tile_source(self.layer, 2), TileSource.PMTILES)
+
+        # Over zoom
+        self.assertEqual(tile_source(self.layer, 3), TileSource.DYNAMIC)
+
+        # Outdated archive
+        self.layer.version = 2
+        self.assertEqual(tile_source(self.layer, 1), TileSource.DYNAMIC)
+        self.layer.pmtile_version = None
+        self.assertEqual(tile_source(self.layer, 1), TileSource.DYNAMIC)
+
+    @patch('cloud_native_gis.utils.tile_source.get_tile_coverage')
+    def test_source_empty(self, get_tile_coverage):
+        """Test tile outside the coverage is empty without rendering."""
+        coverage = TileCoverage(4, 1)
+        coverage.mark([10, 10, 11, 11])
+        get_tile_coverage.return_value = coverage
+        self.assertEqual(
+            tile_source(self.layer, 3, 0, 0), TileSource.EMPTY
+        )
+        self.assertEqual(
+            tile_source(self.layer, 3, 4, 3), TileSource.DYNAMIC
+        )
+        self.assertEqual(
+            read_tile(self.layer, 3, 0, 0, TileSource.EMPTY), (b'', None)
+        )
+
+        # The archive is read for the zoom that it covers
+        self.assertEqual(
+            tile_source(self.layer, 1, 0, 0), TileSource.PMTILES
+        )
+
+        get_tile_coverage.return_value = None
+        self.assertEqual(
+            tile_source(self.layer, 3, 0, 0), TileSource.DYNAMIC
+        )
+
+    @override_settings(CLOUD_NATIVE_GIS_TILE_FROM_PMTILES=False)
+    def test_source_disabled(self):
+        """Test tile is rendered when reading archive is disabled."""
+        self.assertEqual(tile_source(self.layer, 1), TileSource.DYNAMIC)
+
+    def test_source_without_archive(self):
+        """Test tile is rendered when the archive is missing or invalid."""
+        with open(self.layer.pmtile.path, 'wb') as _file:
+            _file.write(b'not a pmtiles archive')
+        self.assertEqual(tile_source(self.layer, 1), TileSource.DYNAMIC)
+
+        os.remove(self.layer.pmtile.path)
+        self.assertEqual(tile_source(self.layer, 1), TileSource.DYNAMIC)
+
+    @patch('cloud_native_gis.utils.tile_source.get_vector_tile')
+    def test_read_tile(self, get_vector_tile):
+        """Test tile of the source."""
+        self.assertEqual(
+            read_tile(self.layer, 1, 0, 0, TileSource.PMTILES, 'gzip'),
+            (compress(b'tile', Compression.GZIP), 'gzip')
+        )
+        self.assertEqual(
+            read_tile(self.layer, 1, 0, 0, TileSource.PMTILES),
+            (b'tile', None)
+        )
+
+        # Tile that is not in the archive is empty
+        self.assertEqual(
+            read_tile(self.layer, 1, 1, 0, TileSource.PMTILES, 'gzip'),
+            (b'', None)
+        )
+        get_vector_tile.assert_not_called()
+
+        get_vector_tile.return_value = b'dynamic'
+        self.assertEqual(
+            read_tile(self.layer, 3, 0, 0, TileSource.DYNAMIC, 'gzip'),
+            (b'dynamic', None)
+        )
+
+    def test_archive_encoding(self):
+        """Test encoding of the archive tiles follows Accept-Encoding."""
+        self.assertEqual(archive_encoding(self.layer, 'gzip, br'), 'gzip')
+        self.assertIsNone(archive_encoding(self.layer, ''))
+
+        os.remove(self.layer.pmtile.path)
+        self.assertIsNone(archive_encoding(self.layer, 'gzip'))
@@ -0,0 +1,107 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import shutil
+import uuid
+
+from django.test import TestCase, override_settings
+
+from cloud_native_gis.models import Layer, LayerUpload
+from cloud_native_gis.tests.model_factories import create_user
+from cloud_native_gis.utils.main import ABS_PATH
+from cloud_native_gis.utils.vector_tile import (
+    WEB_MERCATOR_MAX, TileMode, find_srid, querying_vector_tile, tile_bounds
+)
+
+
+class TestVectorTile(TestCase):
+    """Test class for vector tile utility functions."""
+
+    def setUp(self):
+        """To setup test."""
+        self.user = create_user()
+
+    def _create_imported_layer(self):
+        """Create a layer with imported data."""
+        filepath = ABS_PATH(
+            'cloud_native_gis', 'tests', '_fixtures',
+            'capital_cities.zip'
+        )
+        layer = Layer.objects.create(
+            unique_id=uuid.uuid4(),
+            name='Test Layer',
+            created_by=self.user
+        )
+        layer_upload = LayerUpload.objects.create(
+            layer=layer,
+            created_by=self.user
+        )
+        layer_upload.emptying_folder()
+        shutil.copy(filepath, layer_upload.folder)
+        layer_upload.import_data()
+        layer.refresh_from_db()
+        return layer
+
+    def test_tile_bounds(self):
+        """Test tile bounds are clamped to the world extent."""
+        self.assertEqual(
+            tile_bounds(0, 0, 0),
+            [
+                -WEB_MERCATOR_MAX, -WEB_MERCATOR_MAX,
+                WEB_MERCATOR_MAX, WEB_MERCATOR_MAX
+            ]
+        )
+        self.assertEqual(
+            tile_bounds(0, 0, 0, margin=0.5),
+            tile_bounds(0, 0, 0)
+        )
+        xmin, ymin, xmax, ymax = tile_bounds(1, 1, 1, margin=0.25)
+        self.assertEqual(xmin, -WEB_MERCATOR_MAX / 4)
+        self.assertEqual(ymax, WEB_MERCATOR_MAX / 4)
+        self.assertEqual(xmax, WEB_MERCATOR_MAX)
+        self.assertEqual(ymin, -WEB_MERCATOR_MAX)
+
+    def test_querying_vector_tile(self):
+        """Test tile only contains the features inside the tile."""
+        layer = self._create_imported_layer()
+        self.assertEqual(find_srid(layer.query_table_name), 4326)
+
+        tiles = querying_vector_tile(
+            layer.query_table_name, layer.attribute_names, 0, 0, 0
+        )
+        self.assertGreater(len(tiles[0]), 0)
+
+        # Tile in the middle of the Pacific ocean
+        tiles = querying_vector_tile(
+            layer.query_table_name, layer.attribute_names, 10, 0, 512,
+            srid=4326
+        )
+        self.assertEqual(tiles[0], b'')
+        layer.delete()
+
+    def test_querying_adaptive_vector_tile(self):
+        """Test adaptive tile is limited by features and byte budget."""
+        layer = self._create_imported_layer()
+        with override_settings(CLOUD_NATIVE_GIS_TILE_MODE=TileMode.ADAPTIVE):
+            full_tile = querying_vector_tile(
+                layer.query_table_name, layer.attribute_names, 0, 0, 0
+            )[0]
+            self.assertGreater(len(full_tile), 0)
+
+            with override_settings(CLOUD_NATIVE_GIS_TILE_MAX_FEATURES=1):
+                tile = querying_vector_tile(
+                    layer.query_table_name, layer.attribute_names, 0, 0, 0
+                )[0]
+                self.assertGreater(len(tile), 0)
+                self.assertLess(len(tile), len(full_tile))
+
+            with override_settings(
+                    CLOUD_NATIVE_GIS_TILE_MAX_BYTES=len(full_tile) - 1
+            ):
+                tile = querying_vector_tile(
+                    layer.query_table_name, layer.attribute_names, 0, 0, 0
+                )[0]
+                self.assertLess(len(tile), len(full_tile))
+        layer.delete()
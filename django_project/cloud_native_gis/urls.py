@@ -20,7 +20,7 @@ from cloud_native_gis.api.layer import (
     LayerAttributesViewSet, DataPreviewAPI
 )
 from cloud_native_gis.api.layer_download import DownloadFileAPI
-from cloud_native_gis.api.pmtile import serve_pmtiles
+from cloud_native_gis.api.pmtile import serve_pmtiles, serve_pmtiles_tile
 from cloud_native_gis.api.raster import serve_cog
 from cloud_native_gis.api.vector_tile import (VectorTileLayer)
 
@@ -88,6 +88,8 @@ urlpatterns = [
          name='schema-redoc-ui'),
     path('api/serve-pmtile/<uuid:layer_uuid>/',
          serve_pmtiles, name='serve-pmtiles'),
+    path('api/serve-pmtile/<uuid:layer_uuid>/<int:z>/<int:x>/<int:y>/',
+         serve_pmtiles_tile, name='serve-pmtiles-tile'),
     path('api/serve-cog/<uuid:layer_uuid>/',
          serve_cog, name='serve-cog'),
     path('api/download/<uuid:unique_id>/',
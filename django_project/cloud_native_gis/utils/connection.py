@@ -3,8 +3,40 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 
-from django.db import connection
-from django.db.utils import ProgrammingError
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.utils import IntegrityError, ProgrammingError
+
+# Default number of rows that are fetched at once by the server side cursor.
+STREAM_FETCH_SIZE = 10000
+
+
+class WorkerConnections:
+    """Database connections of the worker threads of a pool.
+
+    Use share as the initializer of the pool, so the connections that the
+    workers open can be closed by close after the pool is shut down.
+    """
+
+    def __init__(self):
+        """Initialize connections."""
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def share(self):
+        """Share the connection of worker thread, to close it later."""
+        worker_connection = connections[DEFAULT_DB_ALIAS]
+        worker_connection.inc_thread_sharing()
+        with self._lock:
+            self._connections.append(worker_connection)
+
+    def close(self):
+        """Close the connections of the worker threads."""
+        for worker_connection in self._connections:
+            worker_connection.close()
+            worker_connection.dec_thread_sharing()
+        self._connections = []
 
 
 class Field:
@@ -32,6 +64,88 @@ def delete_table(schema_name, table_name):
         )
 
 
+def set_table_logged(schema_name, table_name):
+    """Make an UNLOGGED table LOGGED, so it survives a crash."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {schema_name}.{table_name} SET LOGGED')
+
+
+def swap_table(schema_name, source_table_name, table_name):
+    """Replace table with the source table in one transaction.
+
+    The indexes and id sequence of the source table are renamed
+    to follow the new table name.
+    """
+    with connection.cursor() as cursor:
+        with transaction.atomic():
+            cursor.execute(
+                'SELECT indexname FROM pg_indexes '
+                'WHERE schemaname = %s AND tablename = %s',
+                [schema_name, source_table_name]
+            )
+            indexes = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                f'DROP TABLE IF EXISTS {schema_name}.{table_name}'
+            )
+            cursor.execute(
+                f'ALTER TABLE {schema_name}.{source_table_name} '
+                f'RENAME TO {table_name}'
+            )
+            for index in indexes:
+                if source_table_name in index:
+                    renamed = index.replace(source_table_name, table_name)
+                    cursor.execute(
+                        f'DROP INDEX IF EXISTS {schema_name}.{renamed}'
+                    )
+                    cursor.execute(
+                        f'ALTER INDEX {schema_name}.{index} '
+                        f'RENAME TO {renamed}'
+                    )
+            source_sequence = f'{schema_name}.{source_table_name}_id_seq'
+            cursor.execute('SELECT to_regclass(%s)', [source_sequence])
+            if cursor.fetchone()[0]:
+                cursor.execute(
+                    f'DROP SEQUENCE IF EXISTS '
+                    f'{schema_name}.{table_name}_id_seq'
+                )
+                cursor.execute(
+                    f'ALTER SEQUENCE {source_sequence} '
+                    f'RENAME TO {table_name}_id_seq'
+                )
+
+
+def optimize_table(schema_name, table_name, cluster=False):
+    """Build the indexes of layer table and refresh its statistics.
+
+    Creates a GiST index on ``geometry`` and a unique btree index on
+    ``id``. When ``id`` has duplicated values, a non unique index is
+    created instead. When cluster is True, the table is physically
+    reordered following the spatial index.
+    """
+    qualified = f'{schema_name}.{table_name}'
+    geometry_index = f'idx_{table_name}_geometry'
+    id_index = f'idx_{table_name}_id'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {geometry_index} '
+            f'ON {qualified} USING GIST (geometry)'
+        )
+        try:
+            with transaction.atomic():
+                cursor.execute(
+                    f'CREATE UNIQUE INDEX IF NOT EXISTS {id_index} '
+                    f'ON {qualified} (id)'
+                )
+        except IntegrityError:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {id_index} '
+                f'ON {qualified} (id)'
+            )
+        if cluster:
+            cursor.execute(f'CLUSTER {qualified} USING {geometry_index}')
+        cursor.execute(f'ANALYZE {qualified}')
+
+
 def fields(schema_name, table_name):
     """Return field names of table."""
     _fields = []
@@ -47,13 +161,13 @@ def fields(schema_name, table_name):
     return _fields
 
 
-def count_features(schema_name, table_name):
-    """Return count of features of table."""
+def count_features(schema_name, table_name, where=''):
+    """Return count of features of table, matching the where clause."""
     count = 0
     with connection.cursor() as cursor:
         try:
             cursor.execute(
-                f"SELECT count(*) FROM {schema_name}.{table_name}"
+                f"SELECT count(*) FROM {schema_name}.{table_name} {where}"
             )
             rows = cursor.fetchall()
             for row in rows:
@@ -90,3 +204,87 @@ def get_json_features(schema_name, table_name):
             ]
         except ProgrammingError:
             return []
+
+
+def iterate_geojson_features(
+        schema_name, table_name, field_names, fetch_size=STREAM_FETCH_SIZE
+):
+    """Yield features of table as GeoJSON Feature strings in EPSG:4326.
+
+    The rows are read from a server side cursor in batches of fetch size,
+    so the memory is bounded by the batch instead of the table size. The
+    cursor is opened in a transaction, so it is not declared WITH HOLD.
+    """
+    columns = ''.join([f'"{name}", ' for name in field_names])
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(
+            f"SELECT ST_AsGeoJSON(feature.*, 'geometry') FROM ("
+            f"SELECT {columns}ST_Transform(geometry, 4326) AS geometry "
+            f"FROM {schema_name}.{table_name} "
+            f"WHERE geometry IS NOT NULL"
+            f") feature"
+        )
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0]
+
+
+def iterate_geojson_page(
+        schema_name, table_name, id_field, where='', offset=0, limit=None,
+        fetch_size=STREAM_FETCH_SIZE
+):
+    """Yield page of features of table as GeoJSON Feature strings.
+
+    The features are built by PostGIS in EPSG:4326, with the id field as the
+    feature id and the other columns as properties. They are ordered by the
+    id field and read from a server side cursor in batches of fetch size.
+
+    The cursor is opened in a transaction that the generator holds, so it is
+    not declared WITH HOLD (which would build the whole page on DECLARE)
+    and the first features are sent before the page is read.
+    """
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(
+            f"SELECT json_build_object("
+            f"'type', 'Feature', "
+            f"'id', feature.\"{id_field}\", "
+            f"'geometry', "
+            f"ST_AsGeoJSON(ST_Transform(feature.geometry, 4326))::json, "
+            f"'properties', to_jsonb(feature) - %s - 'geometry'"
+            f")::text "
+            f"FROM {schema_name}.{table_name} feature {where} "
+            f"ORDER BY feature.\"{id_field}\" OFFSET %s LIMIT %s",
+            [id_field, offset, limit]
+        )
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0]
+
+
+def iterate_feature_bboxes(
+        schema_name, table_name, fetch_size=STREAM_FETCH_SIZE
+):
+    """Yield EPSG:4326 bbox [xmin, ymin, xmax, ymax] of every feature.
+
+    The rows are read from a server side cursor in batches of fetch size.
+    The cursor is opened in a transaction, so it is not declared WITH HOLD.
+    """
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(
+            f"SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e) "
+            f"FROM (SELECT Box2D(ST_Transform(geometry, 4326)) AS e "
+            f"FROM {schema_name}.{table_name} "
+            f"WHERE geometry IS NOT NULL AND NOT ST_IsEmpty(geometry)) sub"
+        )
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield list(row)
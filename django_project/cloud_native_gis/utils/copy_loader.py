@@ -0,0 +1,249 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import io
+import json
+from typing import Callable
+
+import fiona
+import shapely
+from django.conf import settings
+from django.db import connection
+from shapely.geometry import shape
+
+from cloud_native_gis.utils.connection import create_schema
+from cloud_native_gis.utils.fiona import list_layers
+
+# Default number of features that are read and copied at once.
+IMPORT_CHUNK_SIZE = 10000
+
+# Column type of fiona field type.
+FIELD_TYPES = {
+    'str': 'text',
+    'int': 'bigint',
+    'int16': 'bigint',
+    'int32': 'bigint',
+    'int64': 'bigint',
+    'float': 'double precision',
+    'bool': 'boolean',
+    'date': 'date',
+    'time': 'time',
+    'datetime': 'timestamp',
+    'bytes': 'bytea',
+}
+
+
+class ImportEngine:
+    """Engine that saves the collection to postgis."""
+
+    # Stream the features in chunks with COPY FROM STDIN.
+    COPY = 'copy'
+
+    # Read the whole file to GeoDataFrame and save it with to_postgis.
+    GEOPANDAS = 'geopandas'
+
+
+def _field_type(fiona_type: str) -> str:
+    """Return column type of fiona field type, e.g. str:80."""
+    return FIELD_TYPES.get(fiona_type.split(':')[0], 'text')
+
+
+def _copy_value(value) -> str:
+    """Return value in COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        value = 'true' if value else 'false'
+    elif isinstance(value, bytes):
+        value = '\\x' + value.hex()
+    elif isinstance(value, (list, dict)):
+        value = json.dumps(value)
+    else:
+        value = str(value)
+    return (
+        value.replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+def _open_collection(filepath: str) -> fiona.Collection:
+    """Open first layer of the file.
+
+    Note:
+        For multilayer GPKG and KML, this will only read the first layer.
+    """
+    if filepath.endswith('.gpkg') or filepath.endswith('.kml'):
+        layers = list_layers(filepath)
+        if not layers:
+            raise ValueError('Collection does not have layer!')
+        return fiona.open(filepath, layer=layers[0])
+    if filepath.endswith('.zip'):
+        return fiona.open(f'zip://{filepath}')
+    return fiona.open(filepath)
+
+
+def _collection_columns(collection: fiona.Collection):
+    """Return properties, is 3d and srid of collection."""
+    properties = collection.schema['properties']
+    if 'id' in properties and _field_type(properties['id']) != 'bigint':
+        raise ValueError(
+            f"Column 'id' must be integer or bigint, "
+            f"got '{properties['id']}'. "
+            f"Please rename or remove the 'id' column from your data."
+        )
+    is_3d = collection.schema['geometry'].startswith('3D')
+    srid = collection.crs.to_epsg() if collection.crs else None
+    return properties, is_3d, srid or 0
+
+
+def count_collection_features(filepath: str) -> int:
+    """Return feature count of the file."""
+    with _open_collection(filepath) as collection:
+        return len(collection)
+
+
+def create_collection_table(
+        filepath: str, table_name: str, schema_name: str,
+        unlogged: bool = False
+):
+    """Create the table for the features of the file.
+
+    The existing table is replaced.
+
+    :param unlogged: Create an UNLOGGED table, for staging.
+    """
+    create_schema(schema_name)
+    with _open_collection(filepath) as collection:
+        properties, is_3d, srid = _collection_columns(collection)
+
+    qualified = f'{schema_name}."{table_name}"'
+    column_definitions = [
+        f'"{name}" {_field_type(fiona_type)}'
+        for name, fiona_type in properties.items()
+    ] + [
+        f'geometry geometry(Geometry{"Z" if is_3d else ""}, {srid})'
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {qualified}')
+        cursor.execute(
+            f'CREATE {"UNLOGGED " if unlogged else ""}TABLE {qualified} '
+            f'({", ".join(column_definitions)})'
+        )
+
+
+def copy_collection_range(
+        filepath: str, table_name: str, schema_name: str,
+        start: int = 0, stop: int = None,
+        progress: Callable[[int, int], None] = None
+) -> dict:
+    """Copy the features of the file to the table with COPY.
+
+    The features in [start, stop) are read in chunks of
+    CLOUD_NATIVE_GIS_IMPORT_CHUNK_SIZE and streamed with COPY FROM STDIN
+    as hex EWKB, so memory is bounded by the chunk size instead of the
+    file size. Every chunk is committed separately, so the progress that
+    is saved on the callback is visible while the import runs.
+
+    :param progress: Called with (copied features, total features)
+        after every chunk.
+
+    Return metadata
+    """
+    chunk_size = getattr(
+        settings, 'CLOUD_NATIVE_GIS_IMPORT_CHUNK_SIZE', IMPORT_CHUNK_SIZE
+    )
+    with _open_collection(filepath) as collection:
+        properties, is_3d, srid = _collection_columns(collection)
+        count = len(collection)
+        stop = count if stop is None else min(stop, count)
+        total = max(stop - start, 0)
+
+        metadata = {
+            'FEATURE COUNT': 0,
+            'GEOMETRY SRS': collection.crs.to_string()
+        }
+        names = list(properties.keys())
+        columns = [f'"{name}"' for name in names] + ['geometry']
+        copy_sql = (
+            f'COPY {schema_name}."{table_name}" '
+            f'({", ".join(columns)}) FROM STDIN'
+        )
+
+        with connection.cursor() as cursor:
+            chunk = []
+            for feature in collection.filter(start, stop):
+                chunk.append(feature)
+                if len(chunk) >= chunk_size:
+                    _copy_chunk(
+                        cursor, copy_sql, chunk, names, srid, is_3d,
+                        metadata
+                    )
+                    chunk = []
+                    if progress:
+                        progress(metadata['FEATURE COUNT'], total)
+            if chunk:
+                _copy_chunk(
+                    cursor, copy_sql, chunk, names, srid, is_3d, metadata
+                )
+                if progress:
+                    progress(metadata['FEATURE COUNT'], total)
+    return metadata
+
+
+def merge_metadata(metadata_list: list) -> dict:
+    """Merge metadata of the copied ranges, in the order of ranges."""
+    metadata = {'FEATURE COUNT': 0}
+    for range_metadata in metadata_list:
+        metadata['FEATURE COUNT'] += range_metadata['FEATURE COUNT']
+        for key in ['GEOMETRY SRS', 'GEOMETRY TYPE']:
+            if key not in metadata and key in range_metadata:
+                metadata[key] = range_metadata[key]
+    return metadata
+
+
+def copy_collection_to_postgis(
+        filepath: str, table_name: str, schema_name: str,
+        progress: Callable[[int, int], None] = None
+) -> dict:
+    """Save shapefile/GPKG/Geojson/KML data to postgis with COPY.
+
+    Return metadata
+    """
+    create_collection_table(filepath, table_name, schema_name)
+    return copy_collection_range(
+        filepath, table_name, schema_name, progress=progress
+    )
+
+
+def _copy_chunk(
+        cursor, copy_sql: str, features: list, names: list, srid: int,
+        is_3d: bool, metadata: dict
+):
+    """Copy chunk of features to the table."""
+    geometries = shapely.set_srid(
+        [
+            shape(feature.geometry) if feature.geometry else None
+            for feature in features
+        ],
+        srid
+    )
+    wkbs = shapely.to_wkb(
+        geometries, hex=True, include_srid=True,
+        output_dimension=3 if is_3d else 2
+    )
+    if 'GEOMETRY TYPE' not in metadata:
+        for geometry in geometries:
+            if geometry is not None:
+                metadata['GEOMETRY TYPE'] = geometry.geom_type
+                break
+
+    buffer = io.StringIO()
+    for feature, wkb in zip(features, wkbs):
+        values = [feature.properties.get(name) for name in names] + [wkb]
+        buffer.write('\t'.join([_copy_value(value) for value in values]))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(copy_sql, buffer)
+    metadata['FEATURE COUNT'] += len(features)
@@ -0,0 +1,64 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Streaming of GeoJSON FeatureCollection documents."""
+
+import json
+import zlib
+
+# Size of the chunks that the features are sent in, before compression.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Compression level of the streamed gzip.
+STREAM_GZIP_LEVEL = 6
+
+
+def iterate_feature_collection(
+        features, tail, chunk_size: int = STREAM_CHUNK_SIZE
+):
+    """Yield a GeoJSON FeatureCollection as encoded chunks.
+
+    The head of the document is yielded before the first feature is
+    fetched, then the features are joined into chunks of about chunk size,
+    so only one chunk is kept in memory.
+
+    :param features: Iterable of GeoJSON Feature strings.
+    :param tail: Callable that receives the number of returned features
+        and returns the members that follow the features, e.g.
+        numberMatched and links.
+    """
+    yield b'{"type":"FeatureCollection","features":['
+
+    buffer = []
+    size = 0
+    returned = 0
+    for feature in features:
+        if returned:
+            buffer.append(',')
+        buffer.append(feature)
+        returned += 1
+        size += len(feature) + 1
+        if size >= chunk_size:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+
+    buffer.append(']')
+    for key, value in tail(returned).items():
+        buffer.append(f',{json.dumps(key)}:{json.dumps(value)}')
+    buffer.append('}')
+    yield ''.join(buffer).encode()
+
+
+def gzip_chunks(chunks, level: int = STREAM_GZIP_LEVEL):
+    """Yield chunks compressed as one gzip stream.
+
+    Every chunk is flushed, so the client can decode the data that
+    was sent without waiting for the end of the stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
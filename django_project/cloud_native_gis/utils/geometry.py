@@ -6,7 +6,9 @@
 import re
 
 from django.contrib.gis.geos import Point
-from django.db import connection
+from django.db import DatabaseError, connection
+
+from cloud_native_gis.utils.vector_tile import INDEXABLE_SRIDS, find_srid
 
 
 def parse_coord(x: str, y: str, srid: str = '4326') -> Point:
@@ -88,10 +90,21 @@ def query_features(
         field_names: list,
         coordinates: list,
         tolerance: float,
-        srid: int = 4326):
+        srid: int = 4326,
+        storage_srid: int = None):
     """
     Return raw feature data for multiple (x, y) coordinates within a radius.
 
+    All coordinates are queried in one statement: the points are unnested
+    from arrays and each is joined laterally to its nearest feature
+    (KNN ``<->``) within the tolerance, in input order.
+
+    When the storage srid is the query srid, the geometry column is queried
+    without transformation. Otherwise, when both srids are in
+    INDEXABLE_SRIDS, the rows are prefiltered by the point buffer box
+    transformed once to the storage srid, so only the candidates are
+    transformed.
+
     Args:
         table_name (str): The name of the database table
             containing the features.
@@ -101,6 +114,8 @@ def query_features(
         tolerance (float): The radius tolerance for the spatial query.
         srid (int, optional): Spatial Reference System Identifier.
             Defaults to 4326.
+        storage_srid (int, optional): SRID of the geometry column.
+            When empty, it is looked up from the table.
 
     Returns:
         list: A list of dictionaries representing the feature data.
@@ -109,50 +124,83 @@ def query_features(
 
     status_message = ''
 
-    for x, y in coordinates:
-        point_geometry = f"ST_SetSRID(ST_MakePoint({x}, {y}), {srid})"
-
-        sql = f"""
-            SELECT {', '.join([f'"{field}"' for field in field_names])},
-                   ST_AsGeoJSON(ST_Transform(geometry, {srid})) AS geometry
+    srid = int(srid)
+    if not storage_srid:
+        try:
+            storage_srid = find_srid(table_name)
+        except DatabaseError:
+            # The query below reports the error of the table
+            storage_srid = None
+    if storage_srid == srid:
+        geometry = 'geometry'
+    else:
+        geometry = f'ST_Transform(geometry, {srid})'
+
+    point_geometry = 'ST_SetSRID(ST_MakePoint(pts.x, pts.y), %(srid)s)'
+    if storage_srid == srid:
+        prefilter = ''
+    elif storage_srid in INDEXABLE_SRIDS and srid in INDEXABLE_SRIDS:
+        prefilter = (
+            'geometry && ST_Transform('
+            f'ST_Expand({point_geometry}, %(tolerance)s), {storage_srid}'
+            ') AND '
+        )
+    else:
+        prefilter = ''
+
+    fields = ''.join([f'"{field}", ' for field in field_names])
+    sql = f"""
+        SELECT feature.*
+        FROM unnest(%(x)s::float8[], %(y)s::float8[])
+            WITH ORDINALITY AS pts(x, y, idx)
+        LEFT JOIN LATERAL (
+            SELECT {fields}
+                   ST_AsGeoJSON({geometry}) AS geometry,
+                   true AS found
             FROM {table_name}
-            WHERE ST_DWithin(
-                ST_Transform(geometry, {srid}),
+            WHERE {prefilter}ST_DWithin(
+                {geometry},
                 {point_geometry},
-                {tolerance}
-            )
-            ORDER BY ST_Distance(
-                ST_Transform(geometry, {srid}),
-                {point_geometry}
+                %(tolerance)s
             )
-            LIMIT 1;
-        """
+            ORDER BY {geometry} <-> {point_geometry}
+            LIMIT 1
+        ) feature ON true
+        ORDER BY pts.idx;
+    """
 
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute(sql)
-                row = cursor.fetchone()
-                if row:
-                    feature = {
-                        field: row[i] for i, field in enumerate(field_names)
-                    }
-                    data.append({'coordinates': (x, y),
-                                 'feature': feature})
-                else:
-                    data.append({'coordinates': (x, y),
-                                 'feature': {
-                                     field: '' for field in field_names}
-                                 })
-        except Exception as e:
-            error_message = str(e)
-            if "does not exist" in error_message:
-                missing_column = error_message.split('"')[1]
-                status_message = (
-                    f"Column '{missing_column}' does not exist."
-                )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, {
+                    'x': [x for x, _ in coordinates],
+                    'y': [y for _, y in coordinates],
+                    'srid': srid,
+                    'tolerance': tolerance
+                }
+            )
+            rows = cursor.fetchall()
+        for (x, y), row in zip(coordinates, rows):
+            if row[-1]:
+                feature = {
+                    field: row[i] for i, field in enumerate(field_names)
+                }
+                data.append({'coordinates': (x, y),
+                             'feature': feature})
             else:
-                status_message = f"An error occurred: {error_message}"
-            break
+                data.append({'coordinates': (x, y),
+                             'feature': {
+                                 field: '' for field in field_names}
+                             })
+    except Exception as e:
+        error_message = str(e)
+        if "does not exist" in error_message:
+            missing_column = error_message.split('"')[1]
+            status_message = (
+                f"Column '{missing_column}' does not exist."
+            )
+        else:
+            status_message = f"An error occurred: {error_message}"
 
     return {
         'status_message': status_message,
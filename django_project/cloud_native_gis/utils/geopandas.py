@@ -4,8 +4,8 @@
 """Cloud Native GIS."""
 
 import geopandas as gpd
-from django.db import connection
-from sqlalchemy import create_engine, text
+from django.db import connection, transaction
+from sqlalchemy import create_engine
 
 from cloud_native_gis.utils.connection import create_schema
 from cloud_native_gis.utils.fiona import list_layers
@@ -79,41 +79,40 @@ def geojson_to_geopanda(
 
 
 def create_id_field(schema_name, table_name):
-    """Add id column and sequence to table."""
+    """Add id column and sequence to table.
+
+    It runs on the Django connection, so a table that is created in the
+    current transaction (e.g. the staging table of an import) is visible.
+    """
     qualified = f'{schema_name}."{table_name}"'
     seq_name = f'{schema_name}.{table_name}_id_seq'
 
-    con = 'postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{NAME}'.format(
-        **connection.settings_dict
-    )
-    engine = create_engine(con)
-    with engine.begin() as conn:
-        conn.execute(text(
-            f'ALTER TABLE {qualified} ADD COLUMN IF NOT EXISTS id BIGINT'
-        ))
-        conn.execute(text(
-            f"ALTER TABLE {qualified} ALTER COLUMN id TYPE BIGINT "
-            f"USING id::bigint"
-        ))
-        conn.execute(text(
-            f'UPDATE {qualified} t '
-            f'SET id = sub.rn '
-            f'FROM (SELECT ctid, ROW_NUMBER() OVER () AS rn '
-            f'FROM {qualified}) sub '
-            f'WHERE t.ctid = sub.ctid AND t.id IS NULL'
-        ))
-        conn.execute(text(f'CREATE SEQUENCE IF NOT EXISTS {seq_name}'))
-        max_id = conn.execute(
-            text(f'SELECT COALESCE(MAX(id), 0) FROM {qualified}')
-        ).scalar()
-        conn.execute(text(
-            f'ALTER SEQUENCE {seq_name} RESTART WITH {max_id + 1}'
-        ))
-        conn.execute(text(
-            f'ALTER TABLE {qualified} '
-            f"ALTER COLUMN id SET DEFAULT nextval('{seq_name}')"
-        ))
-    engine.dispose()
+    with connection.cursor() as cursor:
+        with transaction.atomic():
+            cursor.execute(
+                f'ALTER TABLE {qualified} ADD COLUMN IF NOT EXISTS id BIGINT'
+            )
+            cursor.execute(
+                f"ALTER TABLE {qualified} ALTER COLUMN id TYPE BIGINT "
+                f"USING id::bigint"
+            )
+            cursor.execute(
+                f'UPDATE {qualified} t '
+                f'SET id = sub.rn '
+                f'FROM (SELECT ctid, ROW_NUMBER() OVER () AS rn '
+                f'FROM {qualified}) sub '
+                f'WHERE t.ctid = sub.ctid AND t.id IS NULL'
+            )
+            cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {seq_name}')
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {qualified}')
+            max_id = cursor.fetchone()[0]
+            cursor.execute(
+                f'ALTER SEQUENCE {seq_name} RESTART WITH {max_id + 1}'
+            )
+            cursor.execute(
+                f'ALTER TABLE {qualified} '
+                f"ALTER COLUMN id SET DEFAULT nextval('{seq_name}')"
+            )
 
 
 def collection_to_postgis(filepath, table_name, schema_name) -> dict:
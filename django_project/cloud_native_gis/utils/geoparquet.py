@@ -0,0 +1,133 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Export of features to GeoParquet."""
+
+import json
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db import connection, transaction
+
+# Number of rows that are written as one row group.
+GEOPARQUET_CHUNK_SIZE = 50000
+
+# Arrow types of the PostgreSQL column types (by type oid),
+# other types are written as strings.
+_ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(),
+    21: pa.int64(),
+    23: pa.int64(),
+    700: pa.float64(),
+    701: pa.float64(),
+    1700: pa.float64(),
+    1082: pa.date32(),
+    1114: pa.timestamp('us'),
+    1184: pa.timestamp('us', tz='UTC'),
+}
+
+# Name of the WKB geometry column of the exported query.
+_GEOMETRY_COLUMN = '__geometry'
+
+
+class GeoParquetError(Exception):
+    """Error of writing the GeoParquet file."""
+
+
+def _convert(value, arrow_type):
+    """Return value that fits the arrow type."""
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return float(value)
+    if arrow_type == pa.string() and isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if arrow_type == pa.string() and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def geoparquet_metadata() -> dict:
+    """Return GeoParquet metadata of the WKB geometry in EPSG:4326.
+
+    A column without crs is OGC:CRS84 (longitude, latitude) by the
+    GeoParquet specification.
+    """
+    return {
+        'version': '1.0.0',
+        'primary_column': 'geometry',
+        'columns': {
+            'geometry': {'encoding': 'WKB', 'geometry_types': []}
+        }
+    }
+
+
+def export_geoparquet(
+        query: str, filepath: str, chunk_size: int = GEOPARQUET_CHUNK_SIZE
+):
+    """Write features of query to GeoParquet file.
+
+    The geometry column of the query is written as WKB in EPSG:4326 and
+    the other columns with the arrow type of their PostgreSQL type.
+    The rows are read from a server side cursor and written by row groups
+    of chunk size, so the memory does not grow with the features.
+
+    :raises GeoParquetError: When the rows can not be written.
+    """
+    try:
+        _write_geoparquet(query, filepath, chunk_size)
+    except pa.ArrowException as e:
+        raise GeoParquetError(str(e)) from e
+
+
+def _write_geoparquet(query: str, filepath: str, chunk_size: int):
+    """Write features of query to GeoParquet file."""
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(
+            f'SELECT feature.*, '
+            f'ST_AsBinary(ST_Transform(feature.geometry, 4326)) '
+            f'AS "{_GEOMETRY_COLUMN}" '
+            f'FROM ({query}) feature'
+        )
+        rows = cursor.fetchmany(chunk_size)
+
+        # The description is known after the first fetch of a named cursor
+        indexes = []
+        fields = []
+        for index, column in enumerate(cursor.description):
+            if column.name == 'geometry':
+                continue
+            if column.name == _GEOMETRY_COLUMN:
+                fields.append(pa.field('geometry', pa.binary()))
+            else:
+                fields.append(
+                    pa.field(
+                        column.name,
+                        _ARROW_TYPES.get(column.type_code, pa.string())
+                    )
+                )
+            indexes.append(index)
+        schema = pa.schema(fields).with_metadata(
+            {'geo': json.dumps(geoparquet_metadata())}
+        )
+
+        with pq.ParquetWriter(filepath, schema) as writer:
+            while rows:
+                writer.write_table(
+                    pa.Table.from_arrays(
+                        [
+                            pa.array(
+                                [
+                                    _convert(row[index], field.type)
+                                    for row in rows
+                                ],
+                                type=field.type
+                            )
+                            for index, field in zip(indexes, fields)
+                        ],
+                        schema=schema
+                    )
+                )
+                rows = cursor.fetchmany(chunk_size)
@@ -5,7 +5,9 @@
 
 import os
 import random
+import shutil
 import string
+from functools import lru_cache
 
 # Absolute filesystem path to the Django project directory:
 DJANGO_ROOT = os.path.dirname(
@@ -22,3 +24,9 @@ def ABS_PATH(*args):
 def id_generator(size=12, chars=string.ascii_uppercase + string.digits):
     """Return a random string of specified size."""
     return ''.join(random.choice(chars) for _ in range(size))
+
+
+@lru_cache
+def command_installed(command):
+    """Return whether the command is installed, checked once per process."""
+    return shutil.which(command) is not None
@@ -0,0 +1,544 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""PMTiles v3 archive reader and writer.
+
+See https://github.com/protomaps/PMTiles/blob/main/spec/v3/spec.md
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterator, NamedTuple
+
+HEADER_SIZE = 127
+HEADER_FORMAT = '<7sBQQQQQQQQQQQBBBBBBiiiiBii'
+MAGIC = b'PMTiles'
+
+# The header and root directory should be in the first 16 KiB.
+ROOT_DIRECTORY_MAX_SIZE = 16384 - HEADER_SIZE
+
+# Number of entries in a leaf directory, doubled until the root fits.
+LEAF_DIRECTORY_SIZE = 4096
+
+# Leaf directories are nested at most this deep.
+MAX_DIRECTORY_DEPTH = 4
+
+# Number of parsed leaf directories that are kept by a reader.
+LEAF_CACHE_SIZE = 64
+
+HEADER_FIELDS = (
+    'root_offset', 'root_length',
+    'metadata_offset', 'metadata_length',
+    'leaf_directory_offset', 'leaf_directory_length',
+    'tile_data_offset', 'tile_data_length',
+    'addressed_tiles_count', 'tile_entries_count', 'tile_contents_count',
+    'clustered', 'internal_compression', 'tile_compression', 'tile_type',
+    'min_zoom', 'max_zoom',
+    'min_lon_e7', 'min_lat_e7', 'max_lon_e7', 'max_lat_e7',
+    'center_zoom', 'center_lon_e7', 'center_lat_e7'
+)
+
+
+class Compression:
+    """Compression of directories and tiles."""
+
+    UNKNOWN = 0
+    NONE = 1
+    GZIP = 2
+    BROTLI = 3
+    ZSTD = 4
+
+
+class TileType:
+    """Type of tiles."""
+
+    UNKNOWN = 0
+    MVT = 1
+    PNG = 2
+    JPEG = 3
+    WEBP = 4
+    AVIF = 5
+
+
+# HTTP Content-Type of tile type.
+TILE_CONTENT_TYPES = {
+    TileType.MVT: 'application/x-protobuf',
+    TileType.PNG: 'image/png',
+    TileType.JPEG: 'image/jpeg',
+    TileType.WEBP: 'image/webp',
+    TileType.AVIF: 'image/avif',
+}
+
+# HTTP Content-Encoding of tile compression.
+CONTENT_ENCODINGS = {
+    Compression.GZIP: 'gzip',
+    Compression.BROTLI: 'br',
+    Compression.ZSTD: 'zstd',
+}
+
+
+class Entry(NamedTuple):
+    """Directory entry.
+
+    Run length 0 means the entry points to a leaf directory.
+    """
+
+    tile_id: int
+    offset: int
+    length: int
+    run_length: int
+
+
+def _rotate(n: int, x: int, y: int, rx: int, ry: int):
+    """Rotate quadrant of hilbert curve."""
+    if ry == 0:
+        if rx == 1:
+            x = n - 1 - x
+            y = n - 1 - y
+        return y, x
+    return x, y
+
+
+def zxy_to_tileid(z: int, x: int, y: int) -> int:
+    """Return tile id of tile, on the hilbert curve of the zoom."""
+    if z > 31:
+        raise OverflowError('Tile zoom exceeds 64-bit limit.')
+    if x >= 1 << z or y >= 1 << z:
+        raise ValueError('Tile x/y outside zoom level bounds.')
+    tile_id = ((1 << (z * 2)) - 1) // 3
+    s = 1 << z >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        tile_id += s * s * ((3 * rx) ^ ry)
+        x, y = _rotate(s, x, y, rx, ry)
+        s >>= 1
+    return tile_id
+
+
+def tileid_to_zxy(tile_id: int):
+    """Return (z, x, y) of tile id."""
+    z = ((3 * tile_id + 1).bit_length() - 1) // 2
+    if z > 31:
+        raise OverflowError('Tile zoom exceeds 64-bit limit.')
+    position = tile_id - ((1 << (z * 2)) - 1) // 3
+    x = y = 0
+    s = 1
+    while s < 1 << z:
+        rx = 1 & (position // 2)
+        ry = 1 & (position ^ rx)
+        x, y = _rotate(s, x, y, rx, ry)
+        x += s * rx
+        y += s * ry
+        position //= 4
+        s <<= 1
+    return z, x, y
+
+
+def compress(data: bytes, compression: int) -> bytes:
+    """Compress data."""
+    if compression == Compression.GZIP:
+        return gzip.compress(data, mtime=0)
+    if compression in (Compression.NONE, Compression.UNKNOWN):
+        return data
+    raise ValueError(f'Compression {compression} is not supported.')
+
+
+def decompress(data: bytes, compression: int) -> bytes:
+    """Decompress data."""
+    if compression == Compression.GZIP:
+        return gzip.decompress(data)
+    if compression in (Compression.NONE, Compression.UNKNOWN):
+        return data
+    raise ValueError(f'Compression {compression} is not supported.')
+
+
+def _write_varint(buffer: bytearray, value: int):
+    """Write unsigned varint to buffer."""
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, position: int):
+    """Read unsigned varint from data, return (value, next position)."""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def serialize_directory(entries: list) -> bytes:
+    """Serialize directory entries, uncompressed."""
+    buffer = bytearray()
+    _write_varint(buffer, len(entries))
+    last_id = 0
+    for entry in entries:
+        _write_varint(buffer, entry.tile_id - last_id)
+        last_id = entry.tile_id
+    for entry in entries:
+        _write_varint(buffer, entry.run_length)
+    for entry in entries:
+        _write_varint(buffer, entry.length)
+    for idx, entry in enumerate(entries):
+        previous = entries[idx - 1] if idx else None
+        if previous and entry.offset == previous.offset + previous.length:
+            _write_varint(buffer, 0)
+        else:
+            _write_varint(buffer, entry.offset + 1)
+    return bytes(buffer)
+
+
+def deserialize_directory(data: bytes) -> list:
+    """Deserialize uncompressed directory to entries."""
+    count, position = _read_varint(data, 0)
+    tile_ids = []
+    last_id = 0
+    for _ in range(count):
+        delta, position = _read_varint(data, position)
+        last_id += delta
+        tile_ids.append(last_id)
+    run_lengths = []
+    for _ in range(count):
+        value, position = _read_varint(data, position)
+        run_lengths.append(value)
+    lengths = []
+    for _ in range(count):
+        value, position = _read_varint(data, position)
+        lengths.append(value)
+    entries = []
+    for idx in range(count):
+        value, position = _read_varint(data, position)
+        if value == 0 and idx > 0:
+            previous = entries[idx - 1]
+            offset = previous.offset + previous.length
+        else:
+            offset = value - 1
+        entries.append(
+            Entry(tile_ids[idx], offset, lengths[idx], run_lengths[idx])
+        )
+    return entries
+
+
+def serialize_header(header: dict) -> bytes:
+    """Serialize header dictionary."""
+    return struct.pack(
+        HEADER_FORMAT, MAGIC, 3,
+        *[header[field] for field in HEADER_FIELDS]
+    )
+
+
+def deserialize_header(data: bytes) -> dict:
+    """Deserialize header to dictionary."""
+    if len(data) < HEADER_SIZE:
+        raise ValueError('File is not a PMTiles v3 archive.')
+    values = struct.unpack(HEADER_FORMAT, data[:HEADER_SIZE])
+    if values[0] != MAGIC or values[1] != 3:
+        raise ValueError('File is not a PMTiles v3 archive.')
+    return dict(zip(HEADER_FIELDS, values[2:]))
+
+
+class PMTilesReader:
+    """Read tiles of PMTiles archive.
+
+    The root directory is parsed once and the recently used leaf
+    directories are kept, so the reader can be reused for many tiles
+    (also from several threads).
+
+    :param get_bytes: Callable that returns bytes of (offset, length)
+        of the archive.
+    """
+
+    def __init__(self, get_bytes: Callable[[int, int], bytes]):
+        """Read the header and root directory."""
+        self.get_bytes = get_bytes
+        self.header = deserialize_header(get_bytes(0, HEADER_SIZE))
+        self.root = self._directory(
+            self.header['root_offset'], self.header['root_length']
+        )
+        self._leaves = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _directory(self, offset: int, length: int) -> list:
+        """Return entries of directory."""
+        return deserialize_directory(
+            decompress(
+                self.get_bytes(offset, length),
+                self.header['internal_compression']
+            )
+        )
+
+    def _leaf(self, entry: Entry) -> list:
+        """Return entries of leaf directory of entry."""
+        with self._lock:
+            leaf = self._leaves.get(entry.offset)
+            if leaf is not None:
+                self._leaves.move_to_end(entry.offset)
+                return leaf
+        leaf = self._directory(
+            self.header['leaf_directory_offset'] + entry.offset, entry.length
+        )
+        with self._lock:
+            self._leaves[entry.offset] = leaf
+            while len(self._leaves) > LEAF_CACHE_SIZE:
+                self._leaves.popitem(last=False)
+        return leaf
+
+    def metadata(self) -> dict:
+        """Return json metadata."""
+        if not self.header['metadata_length']:
+            return {}
+        return json.loads(
+            decompress(
+                self.get_bytes(
+                    self.header['metadata_offset'],
+                    self.header['metadata_length']
+                ),
+                self.header['internal_compression']
+            )
+        )
+
+    def find_entry(self, tile_id: int):
+        """Return entry of tile id, or None when it is not in archive."""
+        entries = self.root
+        for _ in range(MAX_DIRECTORY_DEPTH):
+            low, high = 0, len(entries) - 1
+            found = None
+            while low <= high:
+                middle = (low + high) // 2
+                if entries[middle].tile_id <= tile_id:
+                    found = entries[middle]
+                    low = middle + 1
+                else:
+                    high = middle - 1
+            if found is None:
+                return None
+            if found.run_length == 0:
+                entries = self._leaf(found)
+                continue
+            if tile_id < found.tile_id + found.run_length:
+                return found
+            return None
+        return None
+
+    def get_tile(self, z: int, x: int, y: int):
+        """Return bytes of tile (as stored), or None when not exist."""
+        entry = self.find_entry(zxy_to_tileid(z, x, y))
+        if entry is None:
+            return None
+        return self.tile_data(entry)
+
+    def tile_data(self, entry: Entry) -> bytes:
+        """Return bytes of tile entry (as stored)."""
+        return self.get_bytes(
+            self.header['tile_data_offset'] + entry.offset, entry.length
+        )
+
+    def entries(self, entries: list = None, depth: int = 0) -> Iterator:
+        """Return tile entries in tile id order, leaves are expanded."""
+        if depth >= MAX_DIRECTORY_DEPTH:
+            raise ValueError('PMTiles directories are nested too deep.')
+        for entry in self.root if entries is None else entries:
+            if entry.run_length == 0:
+                yield from self.entries(self._leaf(entry), depth + 1)
+            else:
+                yield entry
+
+
+class PMTilesWriter:
+    """Write PMTiles archive.
+
+    The tiles should be written in tile id order. Tiles with the same
+    content are stored once, and consecutive ones are run-length encoded.
+    """
+
+    def __init__(self, path: str):
+        """Open the temporary file of tile data, next to the path."""
+        self.path = path
+        self._tile_file = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path) or None, delete=False
+        )
+        self._entries = []
+        self._contents = {}
+        self._offset = 0
+        self.addressed_tiles_count = 0
+
+    def write_tile(self, tile_id: int, data: bytes, run_length: int = 1):
+        """Write tile data (as stored, e.g. already compressed).
+
+        :param run_length: Number of consecutive tile ids, from tile id,
+            that have this data.
+        """
+        last = self._entries[-1] if self._entries else None
+        if last and tile_id < last.tile_id + last.run_length:
+            raise ValueError('Tiles should be written in tile id order.')
+        digest = hashlib.sha256(data).digest()
+        if digest in self._contents:
+            offset, length = self._contents[digest]
+            if (
+                    last and last.offset == offset and
+                    last.tile_id + last.run_length == tile_id
+            ):
+                self._entries[-1] = last._replace(
+                    run_length=last.run_length + run_length
+                )
+            else:
+                self._entries.append(
+                    Entry(tile_id, offset, length, run_length)
+                )
+        else:
+            self._tile_file.write(data)
+            self._contents[digest] = (self._offset, len(data))
+            self._entries.append(
+                Entry(tile_id, self._offset, len(data), run_length)
+            )
+            self._offset += len(data)
+        self.addressed_tiles_count += run_length
+
+    def discard(self):
+        """Remove the written tile data without writing the archive."""
+        self._tile_file.close()
+        os.remove(self._tile_file.name)
+
+    def _directories(self, compression: int):
+        """Return (root, leaves) directories bytes."""
+        root = compress(serialize_directory(self._entries), compression)
+        if len(root) <= ROOT_DIRECTORY_MAX_SIZE:
+            return root, b''
+
+        leaf_size = LEAF_DIRECTORY_SIZE
+        while True:
+            leaves = bytearray()
+            root_entries = []
+            for idx in range(0, len(self._entries), leaf_size):
+                leaf = compress(
+                    serialize_directory(self._entries[idx:idx + leaf_size]),
+                    compression
+                )
+                root_entries.append(
+                    Entry(
+                        self._entries[idx].tile_id, len(leaves), len(leaf), 0
+                    )
+                )
+                leaves += leaf
+            root = compress(serialize_directory(root_entries), compression)
+            if len(root) <= ROOT_DIRECTORY_MAX_SIZE:
+                return root, bytes(leaves)
+            leaf_size *= 2
+
+    def finalize(self, header: dict, metadata: dict):
+        """Write the archive to the path.
+
+        :param header: Header values of the archive, e.g. zooms, bounds
+            and compressions. Offsets and counts are calculated.
+        """
+        self._tile_file.close()
+        try:
+            compression = header.get(
+                'internal_compression', Compression.GZIP
+            )
+            root, leaves = self._directories(compression)
+            metadata = compress(
+                json.dumps(metadata).encode('utf-8'), compression
+            )
+            header = dict(header)
+            header.update({
+                'internal_compression': compression,
+                'root_offset': HEADER_SIZE,
+                'root_length': len(root),
+                'metadata_offset': HEADER_SIZE + len(root),
+                'metadata_length': len(metadata),
+                'leaf_directory_offset': (
+                    HEADER_SIZE + len(root) + len(metadata)
+                ),
+                'leaf_directory_length': len(leaves),
+                'tile_data_offset': (
+                    HEADER_SIZE + len(root) + len(metadata) + len(leaves)
+                ),
+                'tile_data_length': self._offset,
+                'addressed_tiles_count': self.addressed_tiles_count,
+                'tile_entries_count': len(self._entries),
+                'tile_contents_count': len(self._contents),
+                'clustered': 1
+            })
+            with open(self.path, 'wb') as _file:
+                _file.write(serialize_header(header))
+                _file.write(root)
+                _file.write(metadata)
+                _file.write(leaves)
+                with open(self._tile_file.name, 'rb') as tile_file:
+                    shutil.copyfileobj(tile_file, _file)
+        finally:
+            os.remove(self._tile_file.name)
+
+
+def update_archive(
+        reader: PMTilesReader, path: str, tiles: dict, bbox: list = None
+):
+    """Write archive of reader with replaced tiles to path.
+
+    Tiles that are not replaced are copied as their stored bytes.
+
+    :param tiles: Tile id to new data (as stored), None to remove the tile.
+    :param bbox: EPSG:4326 bbox to add to the bounds of the archive.
+    """
+    header = dict(reader.header)
+    if bbox:
+        header['min_lon_e7'] = min(
+            header['min_lon_e7'], int(max(bbox[0], -180) * 1e7)
+        )
+        header['min_lat_e7'] = min(
+            header['min_lat_e7'], int(max(bbox[1], -90) * 1e7)
+        )
+        header['max_lon_e7'] = max(
+            header['max_lon_e7'], int(min(bbox[2], 180) * 1e7)
+        )
+        header['max_lat_e7'] = max(
+            header['max_lat_e7'], int(min(bbox[3], 90) * 1e7)
+        )
+
+    writer = PMTilesWriter(path)
+    replaced = sorted(tiles.items())
+    idx = 0
+
+    def _write_replaced(until: int):
+        """Write replaced tiles with tile id below until."""
+        nonlocal idx
+        while idx < len(replaced) and replaced[idx][0] < until:
+            tile_id, data = replaced[idx]
+            if data is not None:
+                writer.write_tile(tile_id, data)
+            idx += 1
+
+    for entry in reader.entries():
+        start = entry.tile_id
+        end = entry.tile_id + entry.run_length
+        data = None
+        while start < end:
+            _write_replaced(start)
+            if idx < len(replaced) and replaced[idx][0] == start:
+                # The tile is replaced
+                start += 1
+                continue
+            # Copy the run until the next replaced tile
+            stop = end
+            if idx < len(replaced):
+                stop = min(stop, replaced[idx][0])
+            if data is None:
+                data = reader.tile_data(entry)
+            writer.write_tile(start, data, run_length=stop - start)
+            start = stop
+    _write_replaced(float('inf'))
+    writer.finalize(header, reader.metadata())
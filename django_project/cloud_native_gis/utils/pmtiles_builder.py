@@ -0,0 +1,176 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Build PMTiles archive from a PostGIS table with ST_AsMVT."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from cloud_native_gis.utils.connection import WorkerConnections
+from cloud_native_gis.utils.pmtiles import (
+    Compression, PMTilesWriter, TileType, compress, tileid_to_zxy,
+    zxy_to_tileid
+)
+from cloud_native_gis.utils.vector_tile import (
+    querying_vector_tile, tile_has_features, tile_range
+)
+
+
+class PMTilesEngine:
+    """Engine that generates the PMTiles of layer."""
+
+    # Render the tiles with ST_AsMVT in process.
+    NATIVE = 'native'
+
+    # Stream the features to the tippecanoe command.
+    TIPPECANOE = 'tippecanoe'
+
+
+# Default zoom range of the built archive, as the seeded tiles.
+# Every zoom has up to four times the tiles of the previous one, so
+# the deeper zooms are rendered on request instead.
+PMTILES_MIN_ZOOM = 0
+PMTILES_MAX_ZOOM = 10
+
+# Default number of threads that render the tiles.
+PMTILES_WORKERS = 4
+
+# Number of tiles that are rendered per worker before they are written,
+# which bounds the tiles kept in memory.
+TILE_BATCH_SIZE = 64
+
+# Vector layer field type of postgres data type.
+NUMBER_TYPES = (
+    'smallint', 'integer', 'bigint', 'real', 'double precision', 'numeric'
+)
+
+
+def vector_layer_fields(attributes: dict) -> dict:
+    """Return vector_layers fields of {name: postgres data type}."""
+    fields = {}
+    for name, data_type in attributes.items():
+        if data_type in NUMBER_TYPES:
+            fields[name] = 'Number'
+        elif data_type == 'boolean':
+            fields[name] = 'Boolean'
+        else:
+            fields[name] = 'String'
+    return fields
+
+
+class _TileRenderer:
+    """Render tiles of table, on the calling thread connection."""
+
+    def __init__(self, table_name: str, field_names: list, srid: int):
+        """Initialize renderer."""
+        self.table_name = table_name
+        self.field_names = field_names
+        self.srid = srid
+        self.connections = WorkerConnections()
+
+    def __call__(self, tile_id: int):
+        """Return (tile id, gzipped tile or None, has features)."""
+        z, x, y = tileid_to_zxy(tile_id)
+        tile = b''.join(
+            querying_vector_tile(
+                self.table_name, self.field_names, z=z, x=x, y=y,
+                srid=self.srid
+            )
+        )
+        if tile:
+            return tile_id, compress(tile, Compression.GZIP), True
+        return tile_id, None, tile_has_features(
+            self.table_name, z, x, y, self.srid
+        )
+
+
+def build_pmtiles(
+        path: str, table_name: str, attributes: dict, srid: int,
+        bbox: list, min_zoom: int = PMTILES_MIN_ZOOM,
+        max_zoom: int = PMTILES_MAX_ZOOM, workers: int = PMTILES_WORKERS
+) -> int:
+    """Build PMTiles archive of table to path.
+
+    The zoom levels are walked from min zoom as a quadtree: only the
+    children of tiles that have features are rendered on the next zoom.
+    Every zoom is rendered in tile id (hilbert) order in batches on a
+    pool of worker threads, and written in that order, so the archive is
+    the same for the same data whatever the worker count.
+
+    :param attributes: {name: postgres data type} of the tile fields.
+    :param srid: Storage srid of the geometry column.
+    :param bbox: EPSG:4326 bbox of the table.
+    :param workers: Number of threads that render the tiles,
+        1 renders on the calling thread.
+
+    Return number of written tiles.
+    """
+    field_names = list(attributes.keys())
+    renderer = _TileRenderer(table_name, field_names, srid)
+    writer = PMTilesWriter(path)
+
+    xmin, ymin, xmax, ymax = tile_range(min_zoom, bbox)
+    tile_ids = sorted([
+        zxy_to_tileid(min_zoom, x, y)
+        for x in range(xmin, xmax + 1) for y in range(ymin, ymax + 1)
+    ])
+
+    executor = None
+    if workers > 1:
+        executor = ThreadPoolExecutor(
+            max_workers=workers, initializer=renderer.connections.share
+        )
+    try:
+        batch_size = max(workers, 1) * TILE_BATCH_SIZE
+        for z in range(min_zoom, max_zoom + 1):
+            children = []
+            for idx in range(0, len(tile_ids), batch_size):
+                batch = tile_ids[idx:idx + batch_size]
+                results = (
+                    executor.map(renderer, batch) if executor else
+                    map(renderer, batch)
+                )
+                for tile_id, tile, has_features in results:
+                    if tile:
+                        writer.write_tile(tile_id, tile)
+                    if has_features and z < max_zoom:
+                        _, x, y = tileid_to_zxy(tile_id)
+                        children += [
+                            zxy_to_tileid(z + 1, x * 2 + dx, y * 2 + dy)
+                            for dx in (0, 1) for dy in (0, 1)
+                        ]
+            tile_ids = sorted(children)
+    except Exception:
+        writer.discard()
+        raise
+    finally:
+        if executor:
+            executor.shutdown()
+            renderer.connections.close()
+
+    writer.finalize(
+        {
+            'internal_compression': Compression.GZIP,
+            'tile_compression': Compression.GZIP,
+            'tile_type': TileType.MVT,
+            'min_zoom': min_zoom,
+            'max_zoom': max_zoom,
+            'min_lon_e7': int(max(bbox[0], -180) * 1e7),
+            'min_lat_e7': int(max(bbox[1], -90) * 1e7),
+            'max_lon_e7': int(min(bbox[2], 180) * 1e7),
+            'max_lat_e7': int(min(bbox[3], 90) * 1e7),
+            'center_zoom': min_zoom,
+            'center_lon_e7': int((bbox[0] + bbox[2]) / 2 * 1e7),
+            'center_lat_e7': int((bbox[1] + bbox[3]) / 2 * 1e7)
+        },
+        {
+            'vector_layers': [
+                {
+                    'id': 'default',
+                    'fields': vector_layer_fields(attributes),
+                    'minzoom': min_zoom,
+                    'maxzoom': max_zoom
+                }
+            ]
+        }
+    )
+    return writer.addressed_tiles_count
@@ -5,6 +5,12 @@
 
 import copy
 import logging
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +41,27 @@ def _detect_id_field(layer):
     return col_names[0] if col_names else 'id'
 
 
+def _provider_data(layer, db_settings):
+    """
+    Build the ``data`` connection dict of the PostgreSQL provider of a layer.
+
+    :param layer: Layer instance whose table is served by the provider
+    :type layer: cloud_native_gis.models.layer.Layer
+    :param db_settings: Django database settings dict
+    :type db_settings: dict
+    :returns: pygeoapi PostgreSQL provider ``data`` dict
+    :rtype: dict
+    """
+    return {
+        'host': db_settings['HOST'] or 'localhost',
+        'port': int(db_settings.get('PORT') or 5432),
+        'dbname': db_settings['NAME'],
+        'user': db_settings['USER'],
+        'password': db_settings['PASSWORD'],
+        'search_path': [layer.schema_name],
+    }
+
+
 def _layer_to_resource(layer, db_settings):
     """
     Build a pygeoapi collection resource dict from a Layer instance.
@@ -69,14 +96,7 @@ def _layer_to_resource(layer, db_settings):
         'providers': [{
             'type': 'feature',
             'name': 'PostgreSQL',
-            'data': {
-                'host': db_settings['HOST'] or 'localhost',
-                'port': int(db_settings.get('PORT') or 5432),
-                'dbname': db_settings['NAME'],
-                'user': db_settings['USER'],
-                'password': db_settings['PASSWORD'],
-                'search_path': [layer.schema_name],
-            },
+            'data': _provider_data(layer, db_settings),
             'id_field': _detect_id_field(layer),
             'table': layer.table_name,
             'geom_field': 'geometry',
@@ -89,6 +109,227 @@ def _layer_to_resource(layer, db_settings):
     }
 
 
+# Layer fields that the resource is built from, saving other fields
+# does not change the resource.
+RESOURCE_FIELDS = frozenset({'name', 'abstract', 'unique_id'})
+
+# Number of reflected pygeoapi table models kept per process.
+TABLE_MODEL_CACHE_SIZE = 512
+
+
+def resource_values(layer) -> dict:
+    """Return the loaded values of ``RESOURCE_FIELDS`` of layer.
+
+    Deferred fields are not returned, so they are not loaded.
+    """
+    return {
+        field: layer.__dict__[field] for field in RESOURCE_FIELDS
+        if field in layer.__dict__
+    }
+
+
+class ResourceRegistry:
+    """
+    Registry of the pygeoapi resources of the layers.
+
+    A resource is built once, kept in the worker and in the shared cache
+    (``CLOUD_NATIVE_GIS_PYGEOAPI_CACHE``), so an OGC request does not
+    inspect the table of every layer. The resources are invalidated by the
+    Layer and LayerAttributes signals, see :func:`invalidate_resource`.
+
+    Every resource has its own version in the shared cache, which is
+    changed when it is invalidated, so the workers only drop the copies
+    of the changed layers.
+
+    The database connection is not stored in the shared cache, it is added
+    when the resources are returned.
+    """
+
+    def __init__(self):
+        """Initialize registry."""
+        self._lock = threading.Lock()
+        self._resources = {}
+        self._versions = {}
+        self._local_versions = {}
+
+    @staticmethod
+    def cache():
+        """Return the shared cache of the resources."""
+        return caches[
+            getattr(settings, 'CLOUD_NATIVE_GIS_PYGEOAPI_CACHE', 'default')
+        ]
+
+    @staticmethod
+    def table_key(schema_name: str, table_name: str) -> str:
+        """Return shared cache key of the resource of layer table."""
+        return f'cloud-native-gis:pygeoapi:resource:{schema_name}:{table_name}'
+
+    @classmethod
+    def cache_key(cls, layer) -> str:
+        """Return shared cache key of the resource of layer."""
+        return cls.table_key(layer.schema_name, layer.table_name)
+
+    @staticmethod
+    def _version_key(key: str) -> str:
+        """Return shared cache key of the version of resource key."""
+        return f'{key}:version'
+
+    def table_version(self, schema_name: str, table_name: str) -> tuple:
+        """Return version of the resource that the worker has for table.
+
+        It changes when the resource is invalidated in any worker (once the
+        worker returned the resource again), so the objects that are built
+        from the table can be cached by it.
+        """
+        key = self.table_key(schema_name, table_name)
+        return self._versions.get(key), self._local_versions.get(key, 0)
+
+    def get_resources(self, layers, db_settings) -> tuple:
+        """
+        Return the resources of the layers.
+
+        :param layers: iterable of Layer instances
+        :param db_settings: Django database settings dict
+        :type db_settings: dict
+        :returns: mapping of collection ID to a copy of the resource,
+            and mapping of collection ID to the version of the resource
+        :rtype: tuple
+        """
+        layers = {self.cache_key(layer): layer for layer in layers}
+        shared_versions = self.cache().get_many(
+            [self._version_key(key) for key in layers]
+        )
+        with self._lock:
+            versions = {}
+            resources = {}
+            for key in layers:
+                version = shared_versions.get(self._version_key(key))
+                self._versions[key] = version
+                versions[key] = version, self._local_versions.get(key, 0)
+                entry = self._resources.get(key)
+                if entry is not None and entry[0] == version:
+                    resources[key] = entry[1]
+        missing = [key for key in layers if key not in resources]
+        if missing:
+            cached = self.cache().get_many(missing)
+            built = {}
+            for key in missing:
+                entry = cached.get(key)
+                if entry is not None and entry[0] == versions[key][0]:
+                    resources[key] = entry[1]
+                    continue
+                resource = _layer_to_resource(layers[key], db_settings)
+                resource['providers'][0].pop('data')
+                resources[key] = resource
+                # Resources built while they were invalidated are stored
+                # with the previous version, so they are never used.
+                built[key] = (versions[key][0], resource)
+            if built:
+                self.cache().set_many(built, None)
+            with self._lock:
+                for key in missing:
+                    self._resources[key] = (versions[key][0], resources[key])
+
+        result = {}
+        result_versions = {}
+        for key, layer in layers.items():
+            resource = copy.deepcopy(resources[key])
+            resource['providers'][0]['data'] = _provider_data(
+                layer, db_settings
+            )
+            result[str(layer.unique_id)] = resource
+            result_versions[str(layer.unique_id)] = versions[key]
+        return result, result_versions
+
+    def invalidate(self, layer):
+        """Invalidate the resource of layer in every worker."""
+        key = self.cache_key(layer)
+        cache = self.cache()
+        cache.delete(key)
+        cache.set(self._version_key(key), uuid.uuid4().hex, None)
+        with self._lock:
+            self._resources.pop(key, None)
+            self._local_versions[key] = self._local_versions.get(key, 0) + 1
+
+
+resource_registry = ResourceRegistry()
+
+
+class PygeoapiConfig(dict):
+    """
+    pygeoapi config dict with the version of its content.
+
+    Configs of the same version are equal, so objects that are built from
+    the config (e.g. the pygeoapi API) can be reused for the version.
+    ``None`` version is never reused.
+    """
+
+    version = None
+
+
+_table_models = OrderedDict()
+_table_models_lock = threading.Lock()
+
+
+def cached_table_model(
+        reflect, table_name, id_field, db_search_path, engine
+):
+    """
+    Return the reflected pygeoapi table model, cached per process.
+
+    Reflecting the table takes several catalogue queries, so the model is
+    kept until the resource of the table is invalidated (e.g. the layer
+    attributes changed), see :meth:`ResourceRegistry.table_version`.
+
+    :param reflect: function that reflects the table, with the signature
+        of ``pygeoapi.provider.sql.get_table_model``
+    :returns: SQLAlchemy model of the table
+    """
+    key = (table_name, id_field, tuple(db_search_path), engine)
+    version = resource_registry.table_version(
+        db_search_path[0] if db_search_path else None, table_name
+    )
+    with _table_models_lock:
+        entry = _table_models.get(key)
+        if entry is not None and entry[0] == version:
+            _table_models.move_to_end(key)
+            return entry[1]
+
+    model = reflect(table_name, id_field, db_search_path, engine)
+    with _table_models_lock:
+        _table_models[key] = (version, model)
+        _table_models.move_to_end(key)
+        while len(_table_models) > getattr(
+                settings, 'CLOUD_NATIVE_GIS_TABLE_MODEL_CACHE_SIZE',
+                TABLE_MODEL_CACHE_SIZE
+        ):
+            _table_models.popitem(last=False)
+    return model
+
+
+def invalidate_resource(layer, update_fields=None):
+    """
+    Invalidate the pygeoapi resource of layer.
+
+    :param layer: Layer instance that was changed
+    :type layer: cloud_native_gis.models.layer.Layer
+    :param update_fields: fields that were saved, the resource is kept
+        when none of the saved ``RESOURCE_FIELDS`` changed from the values
+        that the layer was loaded with
+    :type update_fields: iterable or None
+    """
+    original = getattr(layer, '_resource_values', {})
+    if update_fields is not None and not [
+        field for field in RESOURCE_FIELDS.intersection(update_fields)
+        if field not in original or original[field] != getattr(layer, field)
+    ]:
+        return
+    try:
+        resource_registry.invalidate(layer)
+    except Exception as exc:
+        logger.warning('Could not invalidate pygeoapi resource: %s', exc)
+
+
 def refresh_pygeoapi_config():
     """Rebuild settings.PYGEOAPI_CONFIG resources from all ready Layer objects.
 
@@ -101,7 +342,6 @@ def refresh_pygeoapi_config():
 
     :returns: None
     """
-    from django.conf import settings
     from django.db import connection
 
     try:
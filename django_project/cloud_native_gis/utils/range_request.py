@@ -3,10 +3,93 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 import mmap
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from cloud_native_gis.utils.pmtiles import PMTilesReader
+
+# Default number of readers that are kept open per process.
+READER_POOL_SIZE = 32
+
+# Ranges that are closer than this many bytes are served as one range,
+# which is cheaper than the headers of another multipart part.
+RANGE_COALESCE_GAP = 80
+
+# More ranges than this (after coalescing) are ignored,
+# and the whole file is served.
+MAX_RANGES = 100
+
+
+def parse_range_header(range_header, file_size):
+    """Return satisfiable ranges of RFC 7233 bytes Range header.
+
+    Supports first-last, first- and -suffix ranges. The ranges are
+    sorted and the overlapping or close ones are coalesced.
+
+    :raises ValueError: When the header is malformed.
+    :return: List of (start, end) inclusive, empty when no range is
+        satisfiable. None when the header should be ignored,
+        i.e. it is not a bytes range or it has too many ranges.
+    """
+    unit, _, specs = range_header.partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
+
+    ranges = []
+    for spec in specs.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        first, separator, last = spec.partition('-')
+        if not separator:
+            raise ValueError(f'Invalid range {spec}')
+        first, last = first.strip(), last.strip()
+        if not first:
+            # Suffix range, the last bytes of file
+            suffix = int(last)
+            if suffix < 0:
+                raise ValueError(f'Invalid range {spec}')
+            if suffix > 0 and file_size > 0:
+                ranges.append((max(file_size - suffix, 0), file_size - 1))
+            continue
+        start = int(first)
+        end = int(last) if last else max(file_size - 1, start)
+        if start < 0 or end < start:
+            raise ValueError(f'Invalid range {spec}')
+        if start < file_size:
+            ranges.append((start, min(end, file_size - 1)))
+
+    if not specs.strip():
+        raise ValueError('Range header has no range')
+
+    coalesced = []
+    for start, end in sorted(ranges):
+        if coalesced and start <= coalesced[-1][1] + RANGE_COALESCE_GAP:
+            coalesced[-1] = (
+                coalesced[-1][0], max(coalesced[-1][1], end)
+            )
+        else:
+            coalesced.append((start, end))
+    if len(coalesced) > MAX_RANGES:
+        return None
+    return coalesced
+
+
+def file_signature(stat_result: os.stat_result):
+    """Return (inode, mtime, size) of stat, that changes on file replace."""
+    return stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size
 
 
 class RangeRequestReader:
-    """Read file using mmap."""
+    """Read file using mmap.
+
+    The reader can be shared across threads: the ranges are sliced from
+    the map without seeking, and it is only closed after every user that
+    acquired it closed it.
+    """
 
     def __init__(self, filepath):
         """Initialize RangeRequestReader."""
@@ -19,9 +102,30 @@ class RangeRequestReader:
         except Exception as e:
             self.file.close()
             raise OSError(f"Failed to create memory map: {e}")
+        self.signature = file_signature(os.fstat(self.file.fileno()))
+        self._users = 1
+        self._lock = threading.Lock()
+        self._pmtiles = None
 
-    def read_range(self, offset, length):
-        """Read range bytes."""
+    def acquire(self):
+        """Add a user of the reader, that should close it after use."""
+        with self._lock:
+            self._users += 1
+        return self
+
+    def pmtiles(self) -> PMTilesReader:
+        """Return PMTiles reader of the file.
+
+        The header and directories are parsed once per reader, so they
+        are kept as long as the reader is pooled and the file unchanged.
+        """
+        with self._lock:
+            if self._pmtiles is None:
+                self._pmtiles = PMTilesReader(self.read_range)
+            return self._pmtiles
+
+    def _check_range(self, offset, length):
+        """Return length of range, adjusted to the file size."""
         if offset < 0:
             raise ValueError("Offset cannot be negative")
         file_size = len(self.mmap)
@@ -29,19 +133,126 @@ class RangeRequestReader:
             raise ValueError("Offset exceeds file size")
 
         # Adjust length if it would exceed file size
-        length = min(length, file_size - offset)
+        return min(length, file_size - offset)
 
-        self.mmap.seek(offset)
-        return self.mmap.read(length)
+    def read_range(self, offset, length):
+        """Read range bytes."""
+        length = self._check_range(offset, length)
+        return self.mmap[offset:offset + length]
+
+    def chunks(self, offset, length, chunk_size):
+        """Yield range in memoryview chunks of the mapped file.
+
+        The chunks are slices of the map, so the range is never copied
+        as a whole.
+        """
+        end = offset + self._check_range(offset, length)
+        with memoryview(self.mmap) as view:
+            for position in range(offset, end, chunk_size):
+                with view[position:min(position + chunk_size, end)] as (
+                        chunk
+                ):
+                    yield chunk
+
+    def iter_range(self, offset, length, chunk_size):
+        """Yield range in memoryview chunks of the mapped file.
+
+        The reader is closed when the iteration finishes
+        or the generator is closed.
+        """
+        try:
+            yield from self.chunks(offset, length, chunk_size)
+        finally:
+            self.close()
 
     def read_all(self):
         """Read all bytes."""
-        self.mmap.seek(0)
-        return self.mmap.read()
+        return self.mmap[:]
 
     def close(self):
-        """Close resources."""
+        """Close resources, when no other user holds the reader."""
+        if hasattr(self, '_lock'):
+            with self._lock:
+                self._users -= 1
+                if self._users != 0:
+                    return
         if hasattr(self, 'mmap') and self.mmap:
             self.mmap.close()
         if hasattr(self, 'file') and self.file:
             self.file.close()
+
+
+class RangeRequestReaderPool:
+    """Least recently used pool of open readers, keyed by path.
+
+    A reader is reopened when the inode, mtime or size of its path
+    changed, so replaced files are never served from the old map.
+    """
+
+    def __init__(self, size):
+        """Initialize RangeRequestReaderPool."""
+        self.size = size
+        self._readers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filepath) -> RangeRequestReader:
+        """Return reader of the file, to be closed after use."""
+        try:
+            signature = file_signature(os.stat(filepath))
+        except OSError:
+            self.discard(filepath)
+            raise
+        with self._lock:
+            reader = self._readers.get(filepath)
+            if reader is not None and reader.signature == signature:
+                self._readers.move_to_end(filepath)
+                return reader.acquire()
+
+            if reader is not None:
+                del self._readers[filepath]
+                reader.close()
+            reader = RangeRequestReader(filepath)
+            if self.size > 0:
+                self._readers[filepath] = reader.acquire()
+            while len(self._readers) > self.size:
+                _, evicted = self._readers.popitem(last=False)
+                evicted.close()
+            return reader
+
+    def discard(self, filepath):
+        """Close the pooled reader of the file."""
+        with self._lock:
+            reader = self._readers.pop(filepath, None)
+        if reader is not None:
+            reader.close()
+
+    def clear(self):
+        """Close all pooled readers."""
+        with self._lock:
+            readers = list(self._readers.values())
+            self._readers.clear()
+        for reader in readers:
+            reader.close()
+
+
+_reader_pool = None
+_reader_pool_lock = threading.Lock()
+
+
+def get_reader(filepath) -> RangeRequestReader:
+    """Return reader of file from the pool of the process.
+
+    The pool size is configured by CLOUD_NATIVE_GIS_READER_POOL_SIZE,
+    0 opens a new reader for every call. The reader should be closed
+    after use.
+    """
+    global _reader_pool
+    with _reader_pool_lock:
+        if _reader_pool is None:
+            _reader_pool = RangeRequestReaderPool(
+                getattr(
+                    settings, 'CLOUD_NATIVE_GIS_READER_POOL_SIZE',
+                    READER_POOL_SIZE
+                )
+            )
+    return _reader_pool.get(filepath)
@@ -0,0 +1,67 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+from django.conf import settings
+from django.core.cache import caches
+
+from cloud_native_gis.utils.vector_tile import querying_vector_tile
+
+# Default time in seconds that a rendered tile is kept in the cache.
+TILE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def tile_cache():
+    """Return the cache that stores the rendered vector tiles.
+
+    The alias is configured by CLOUD_NATIVE_GIS_TILE_CACHE, so the storage
+    (redis, disk or local memory) and its size limit are configured through
+    Django CACHES.
+    """
+    return caches[getattr(settings, 'CLOUD_NATIVE_GIS_TILE_CACHE', 'default')]
+
+
+def tile_cache_key(layer, z: int, x: int, y: int) -> str:
+    """Return cache key of a tile.
+
+    The key contains the layer version, so tiles of the previous version
+    are never read again after the data changed and expire by themselves.
+    """
+    return (
+        f'cloud-native-gis:tile:{layer.unique_id}:{layer.version}:'
+        f'{z}:{x}:{y}'
+    )
+
+
+def get_vector_tile(
+        layer, z: int, x: int, y: int, field_names: list = None
+) -> bytes:
+    """Return vector tile of layer, rendered from the cache when exists.
+
+    :param field_names: Attribute names of the tile.
+        When empty, they are read from the layer.
+    """
+    cache = tile_cache()
+    key = tile_cache_key(layer, z, x, y)
+    tile = cache.get(key)
+    if tile is None:
+        tile = b''.join(
+            querying_vector_tile(
+                layer.query_table_name,
+                field_names=(
+                    layer.attribute_names if field_names is None else
+                    field_names
+                ),
+                z=z, x=x, y=y,
+                srid=layer.srid
+            )
+        )
+        cache.set(
+            key, tile,
+            getattr(
+                settings, 'CLOUD_NATIVE_GIS_TILE_CACHE_TIMEOUT',
+                TILE_CACHE_TIMEOUT
+            )
+        )
+    return tile
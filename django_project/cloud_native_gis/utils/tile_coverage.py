@@ -0,0 +1,193 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Coverage of layer features on the tile grid."""
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+
+from cloud_native_gis.utils.tile_cache import tile_cache
+from cloud_native_gis.utils.vector_tile import (
+    TILE_BUFFER, TILE_EXTENT, tile_range
+)
+
+# Default zoom of the coverage grid, 0 disables the coverage.
+# The bitmap of zoom 9 is 32 KiB before compression.
+TILE_COVERAGE_ZOOM = 9
+
+# Number of coverages kept in memory per process.
+TILE_COVERAGE_POOL_SIZE = 256
+
+# Seconds before a layer that has no coverage is looked up again
+# in the shared cache.
+TILE_COVERAGE_RECHECK = 60
+
+
+class TileCoverage:
+    """Bitmap of the tiles of a zoom that have features.
+
+    A tile is marked when a feature bbox (with the MVT buffer) touches it,
+    so a tile that is not marked is certainly empty, while a marked tile
+    may still be empty.
+
+    :param zoom: Zoom of the grid.
+    :param version: Layer version that the coverage is of.
+    :param bits: Bitmap of 2^zoom * 2^zoom tiles, row (y) by row.
+    """
+
+    def __init__(self, zoom: int, version: int, bits: bytearray = None):
+        """Initialize coverage."""
+        self.zoom = zoom
+        self.version = version
+        self.size = 2 ** zoom
+        if bits is None:
+            bits = bytearray((self.size * self.size + 7) // 8)
+        self.bits = bits
+
+    def mark(self, bbox: list):
+        """Mark the tiles of EPSG:4326 bbox."""
+        xmin, ymin, xmax, ymax = tile_range(
+            self.zoom, bbox, margin=TILE_BUFFER / TILE_EXTENT
+        )
+        for y in range(ymin, ymax + 1):
+            for x in range(xmin, xmax + 1):
+                index = y * self.size + x
+                self.bits[index >> 3] |= 1 << (index & 7)
+
+    def _any(self, start: int, stop: int) -> bool:
+        """Return whether any bit in [start, stop] is marked."""
+        first, last = start >> 3, stop >> 3
+        first_mask = (0xFF << (start & 7)) & 0xFF
+        last_mask = 0xFF >> (7 - (stop & 7))
+        if first == last:
+            return bool(self.bits[first] & first_mask & last_mask)
+        return bool(
+            self.bits[first] & first_mask or
+            self.bits[last] & last_mask or
+            any(self.bits[first + 1:last])
+        )
+
+    def is_empty(self, z: int, x: int, y: int) -> bool:
+        """Return whether tile z/x/y certainly has no features.
+
+        A tile above the coverage zoom is empty when none of the tiles it
+        contains is marked, a tile below is empty when its parent on the
+        coverage zoom is not marked. Tiles outside the grid are empty.
+        """
+        if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return True
+        if z >= self.zoom:
+            shift = z - self.zoom
+            index = (y >> shift) * self.size + (x >> shift)
+            return not self.bits[index >> 3] & 1 << (index & 7)
+        shift = self.zoom - z
+        xmin, xmax = x << shift, ((x + 1) << shift) - 1
+        for row in range(y << shift, (y + 1) << shift):
+            if self._any(row * self.size + xmin, row * self.size + xmax):
+                return False
+        return True
+
+    def dumps(self) -> tuple:
+        """Return coverage as (zoom, version, compressed bits)."""
+        return self.zoom, self.version, zlib.compress(bytes(self.bits))
+
+    @classmethod
+    def loads(cls, data: tuple) -> 'TileCoverage':
+        """Return coverage of dumps data."""
+        zoom, version, bits = data
+        return cls(zoom, version, bytearray(zlib.decompress(bits)))
+
+
+def tile_coverage_key(layer) -> str:
+    """Return cache key of the coverage of layer."""
+    return f'cloud-native-gis:coverage:{layer.unique_id}'
+
+
+_coverage_pool = OrderedDict()
+_coverage_pool_lock = threading.Lock()
+
+
+def save_tile_coverage(layer, coverage: TileCoverage):
+    """Save the coverage of layer to the shared cache."""
+    tile_cache().set(tile_coverage_key(layer), coverage.dumps(), None)
+    with _coverage_pool_lock:
+        _coverage_pool.pop(layer.unique_id, None)
+
+
+def get_tile_coverage(layer):
+    """Return coverage of the current version of layer, or None.
+
+    The coverage is read from the shared cache once and kept in memory,
+    so the next lookups do not leave the process.
+    """
+    pool_size = getattr(
+        settings, 'CLOUD_NATIVE_GIS_TILE_COVERAGE_POOL_SIZE',
+        TILE_COVERAGE_POOL_SIZE
+    )
+    with _coverage_pool_lock:
+        entry = _coverage_pool.get(layer.unique_id)
+        if entry is not None:
+            coverage, checked_at = entry
+            if coverage is not None and coverage.version == layer.version:
+                _coverage_pool.move_to_end(layer.unique_id)
+                return coverage
+            if (
+                    coverage is None and
+                    time.monotonic() - checked_at < TILE_COVERAGE_RECHECK
+            ):
+                return None
+
+    data = tile_cache().get(tile_coverage_key(layer))
+    coverage = TileCoverage.loads(data) if data else None
+    if coverage is not None and coverage.version != layer.version:
+        coverage = None
+    if pool_size:
+        with _coverage_pool_lock:
+            _coverage_pool[layer.unique_id] = (coverage, time.monotonic())
+            _coverage_pool.move_to_end(layer.unique_id)
+            while len(_coverage_pool) > pool_size:
+                _coverage_pool.popitem(last=False)
+    return coverage
+
+
+def build_tile_coverage(layer, bboxes) -> TileCoverage:
+    """Build and save the coverage of layer from the feature bboxes.
+
+    The zoom is configured by CLOUD_NATIVE_GIS_TILE_COVERAGE_ZOOM,
+    0 does not build the coverage.
+
+    :param bboxes: Iterable of EPSG:4326 bboxes of the features.
+    """
+    zoom = getattr(
+        settings, 'CLOUD_NATIVE_GIS_TILE_COVERAGE_ZOOM', TILE_COVERAGE_ZOOM
+    )
+    if not zoom:
+        return None
+    coverage = TileCoverage(zoom, layer.version)
+    for bbox in bboxes:
+        coverage.mark(bbox)
+    save_tile_coverage(layer, coverage)
+    return coverage
+
+
+def extend_tile_coverage(layer, bboxes: list):
+    """Mark bboxes changed by the current layer version on the coverage.
+
+    The coverage is only carried to the current version when it is of the
+    previous one, otherwise a change would be missed and the coverage is
+    left outdated, so it is not used.
+    """
+    data = tile_cache().get(tile_coverage_key(layer))
+    if not data:
+        return
+    coverage = TileCoverage.loads(data)
+    if coverage.version != layer.version - 1:
+        return
+    for bbox in bboxes:
+        coverage.mark(bbox)
+    coverage.version = layer.version
+    save_tile_coverage(layer, coverage)
@@ -0,0 +1,132 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Seed the vector tile cache of a layer."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from cloud_native_gis.utils.connection import WorkerConnections
+from cloud_native_gis.utils.pmtiles import tileid_to_zxy, zxy_to_tileid
+from cloud_native_gis.utils.tile_cache import get_vector_tile
+from cloud_native_gis.utils.tile_source import TileSource, tile_source
+from cloud_native_gis.utils.vector_tile import tile_has_features, tile_range
+
+# Default zoom range that is seeded.
+SEED_MIN_ZOOM = 0
+SEED_MAX_ZOOM = 10
+
+# Default number of threads that render the tiles.
+SEED_WORKERS = 4
+
+# Number of tiles that are seeded per worker between the progress reports.
+SEED_BATCH_SIZE = 64
+
+
+class _TileSeeder:
+    """Seed tiles of layer, on the calling thread connection."""
+
+    def __init__(self, layer, field_names: list, srid: int):
+        """Initialize seeder."""
+        self.layer = layer
+        self.field_names = field_names
+        self.srid = srid
+        self.connections = WorkerConnections()
+
+    def __call__(self, tile_id: int, render: bool = True):
+        """Return (tile id, has features), render the tile to the cache."""
+        z, x, y = tileid_to_zxy(tile_id)
+        if not tile_has_features(
+                self.layer.query_table_name, z, x, y, self.srid
+        ):
+            return tile_id, False
+        if render:
+            get_vector_tile(
+                self.layer, z=z, x=x, y=y, field_names=self.field_names
+            )
+        return tile_id, True
+
+
+def seed_tiles(
+        layer, field_names: list, srid: int,
+        min_zoom: int = SEED_MIN_ZOOM, max_zoom: int = SEED_MAX_ZOOM,
+        workers: int = SEED_WORKERS,
+        progress: Callable[[dict], None] = None
+) -> dict:
+    """Render the tiles of layer extent to the tile cache.
+
+    The zoom levels are walked from min zoom as a quadtree. A tile
+    without features is found with the spatial index and is not rendered,
+    nor are its children. Zoom levels that are served from the PMTiles
+    archive (see tile_source) are only walked.
+
+    :param field_names: Attribute names of the tiles.
+    :param srid: Storage srid of the geometry column.
+    :param workers: Number of threads that render the tiles,
+        1 renders on the calling thread.
+    :param progress: Called with the statistics after every batch.
+
+    Return statistics: zoom, rendered, empty and pmtiles tile counts,
+    seconds and rendered tiles per second.
+    """
+    seeder = _TileSeeder(layer, field_names, srid)
+    stats = {
+        'zoom': min_zoom,
+        'rendered': 0,
+        'empty': 0,
+        'pmtiles': 0,
+        'seconds': 0,
+        'tiles_per_second': 0
+    }
+    started = time.monotonic()
+
+    xmin, ymin, xmax, ymax = tile_range(min_zoom, layer.extent)
+    tile_ids = sorted([
+        zxy_to_tileid(min_zoom, x, y)
+        for x in range(xmin, xmax + 1) for y in range(ymin, ymax + 1)
+    ])
+
+    executor = None
+    if workers > 1:
+        executor = ThreadPoolExecutor(
+            max_workers=workers, initializer=seeder.connections.share
+        )
+    try:
+        batch_size = max(workers, 1) * SEED_BATCH_SIZE
+        for z in range(min_zoom, max_zoom + 1):
+            stats['zoom'] = z
+            render = tile_source(layer, z) == TileSource.DYNAMIC
+            children = []
+            for idx in range(0, len(tile_ids), batch_size):
+                batch = tile_ids[idx:idx + batch_size]
+                renders = [render] * len(batch)
+                results = (
+                    executor.map(seeder, batch, renders) if executor else
+                    map(seeder, batch, renders)
+                )
+                for tile_id, has_features in results:
+                    if not has_features:
+                        stats['empty'] += 1
+                        continue
+                    stats['rendered' if render else 'pmtiles'] += 1
+                    if z < max_zoom:
+                        _, x, y = tileid_to_zxy(tile_id)
+                        children += [
+                            zxy_to_tileid(z + 1, x * 2 + dx, y * 2 + dy)
+                            for dx in (0, 1) for dy in (0, 1)
+                        ]
+
+                stats['seconds'] = time.monotonic() - started
+                stats['tiles_per_second'] = (
+                    stats['rendered'] / stats['seconds']
+                    if stats['seconds'] else 0
+                )
+                if progress:
+                    progress(dict(stats))
+            tile_ids = sorted(children)
+    finally:
+        if executor:
+            executor.shutdown()
+            seeder.connections.close()
+    return stats
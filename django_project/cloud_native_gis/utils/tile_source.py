@@ -0,0 +1,126 @@
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Kartoza <info@kartoza.com>
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Cloud Native GIS."""
+
+import os
+
+from django.conf import settings
+
+from cloud_native_gis.utils.pmtiles import (
+    CONTENT_ENCODINGS, TileType, decompress
+)
+from cloud_native_gis.utils.range_request import get_reader
+from cloud_native_gis.utils.tile_cache import get_vector_tile
+from cloud_native_gis.utils.tile_coverage import get_tile_coverage
+
+
+class TileSource:
+    """Source that a vector tile is served from."""
+
+    # Read from the prebuilt PMTiles archive of the layer.
+    PMTILES = 'pmtiles'
+
+    # Rendered from the layer table with ST_AsMVT.
+    DYNAMIC = 'dynamic'
+
+    # Empty by the tile coverage of the layer, without any query.
+    EMPTY = 'empty'
+
+
+def _archive_header(layer):
+    """Return header of the layer PMTiles, or None when not readable."""
+    if not layer.pmtile or not os.path.isfile(layer.pmtile.path):
+        return None
+    reader = get_reader(layer.pmtile.path)
+    try:
+        return reader.pmtiles().header
+    except ValueError:
+        return None
+    finally:
+        reader.close()
+
+
+def tile_source(layer, z: int, x: int = None, y: int = None) -> str:
+    """Return source that serves tile of zoom z of layer.
+
+    The tile is read from the PMTiles archive when
+    CLOUD_NATIVE_GIS_TILE_FROM_PMTILES is enabled, the archive is
+    generated from the current layer version and it contains MVT tiles of
+    the zoom. Otherwise, e.g. for over zoom or outdated archive,
+    the tile is rendered from the layer table, unless the tile coverage of
+    the layer tells that tile x/y is empty.
+    """
+    if _pmtiles_source(layer, z):
+        return TileSource.PMTILES
+    if x is not None and y is not None:
+        coverage = get_tile_coverage(layer)
+        if coverage is not None and coverage.is_empty(z, x, y):
+            return TileSource.EMPTY
+    return TileSource.DYNAMIC
+
+
+def _pmtiles_source(layer, z: int) -> bool:
+    """Return whether tile of zoom z can be read from the archive."""
+    if not getattr(settings, 'CLOUD_NATIVE_GIS_TILE_FROM_PMTILES', True):
+        return False
+    if layer.pmtile_version is None or layer.pmtile_version != layer.version:
+        return False
+
+    header = _archive_header(layer)
+    return (
+        header is not None and
+        header['tile_type'] == TileType.MVT and
+        header['min_zoom'] <= z <= header['max_zoom']
+    )
+
+
+def archive_encoding(layer, accept_encoding: str = ''):
+    """Return content encoding that the archive tiles are returned with.
+
+    :param accept_encoding: Accept-Encoding header of the request.
+    :return: The archive tile compression when it is in accept_encoding,
+        None when the tiles are decompressed, see read_tile.
+    """
+    header = _archive_header(layer)
+    if header is None:
+        return None
+    encoding = CONTENT_ENCODINGS.get(header['tile_compression'])
+    if encoding and encoding in accept_encoding:
+        return encoding
+    return None
+
+
+def read_tile(
+        layer, z: int, x: int, y: int, source: str,
+        accept_encoding: str = ''
+):
+    """Return tile of layer from the source.
+
+    Tiles of the archive are returned as stored when the compression is
+    in accept_encoding, otherwise they are decompressed. A tile that is
+    not in the archive is empty, as the archive skips the empty tiles.
+    Tiles of the EMPTY source are empty.
+
+    :param accept_encoding: Accept-Encoding header of the request.
+    :return: Tile bytes and the content encoding, or None when the tile
+        is not compressed.
+    """
+    if source == TileSource.EMPTY:
+        return b'', None
+    if source == TileSource.PMTILES:
+        reader = get_reader(layer.pmtile.path)
+        try:
+            archive = reader.pmtiles()
+            tile = archive.get_tile(z, x, y)
+            compression = archive.header['tile_compression']
+        finally:
+            reader.close()
+
+        if tile is None:
+            return b'', None
+        encoding = CONTENT_ENCODINGS.get(compression)
+        if encoding and encoding not in accept_encoding:
+            return decompress(tile, compression), None
+        return tile, encoding
+    return get_vector_tile(layer, z=z, x=x, y=y), None
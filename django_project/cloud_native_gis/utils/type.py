@@ -12,10 +12,16 @@ class FileType:
     SHAPEFILE = 'shapefile'
     GEOPACKAGE = 'geopackage'
     KML = 'kml'
+    FLATGEOBUF = 'flatgeobuf'
+    GEOPARQUET = 'geoparquet'
 
     @staticmethod
     def guess_type(filename: str):
-        """Guess file type based on filename."""
+        """Guess file type based on filename.
+
+        Only the types that can be imported are guessed, FLATGEOBUF and
+        GEOPARQUET are export types.
+        """
         if filename.endswith('.geojson') or filename.endswith('.json'):
             return FileType.GEOJSON
         elif filename.endswith('.zip') or filename.endswith('.shp'):
@@ -38,4 +44,25 @@ class FileType:
             return '.gpkg'
         elif type == FileType.KML:
             return '.kml'
+        elif type == FileType.FLATGEOBUF:
+            return '.fgb'
+        elif type == FileType.GEOPARQUET:
+            return '.parquet'
         return ''
+
+    @staticmethod
+    def to_content_type(type: str):
+        """Convert FileType to content type."""
+        if type == FileType.GEOJSON:
+            return 'application/geo+json'
+        elif type == FileType.SHAPEFILE:
+            return 'application/zip'
+        elif type == FileType.GEOPACKAGE:
+            return 'application/geopackage+sqlite3'
+        elif type == FileType.KML:
+            return 'application/vnd.google-earth.kml+xml'
+        elif type == FileType.FLATGEOBUF:
+            return 'application/flatgeobuf'
+        elif type == FileType.GEOPARQUET:
+            return 'application/vnd.apache.parquet'
+        return 'application/octet-stream'
@@ -3,14 +3,144 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Cloud Native GIS."""
 
+from django.conf import settings
 from django.db import connection
 import math
 
+# MVT extent and buffer (in tile pixels) used by ST_AsMVTGeom.
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
 
-def querying_vector_tile(
-        table_name: str, field_names: list, z: int, x: int, y: int
-):
-    """Return vector tile from table name."""
+# Half of the EPSG:3857 world width.
+WEB_MERCATOR_MAX = 20037508.342789244
+MERCATOR_MAX_LATITUDE = 85.0511287798066
+
+# Storage srids that the tile envelope can be safely transformed to,
+# so the bounding box filter can use the spatial index.
+INDEXABLE_SRIDS = (3857, 4326)
+
+
+class TileMode:
+    """Mode of building the vector tile geometries."""
+
+    # Simplify with a fixed tolerance on the low zoom levels.
+    FIXED = 'fixed'
+
+    # Simplify with the tile resolution and thin out the features,
+    # so the tile stays under a size budget.
+    ADAPTIVE = 'adaptive'
+
+
+# Defaults of the adaptive mode, in tile units (TILE_EXTENT per tile).
+TILE_TOLERANCE = 4
+TILE_POINT_GRID = 16
+TILE_MAX_FEATURES = 10000
+TILE_MAX_BYTES = 500 * 1024
+
+# How many times the adaptive tile is rebuilt coarser
+# when it is bigger than the byte budget.
+TILE_BUDGET_ATTEMPTS = 4
+
+
+def tile_bounds(z: int, x: int, y: int, margin: float = 0):
+    """Return EPSG:3857 bounds of tile, clamped to the world extent.
+
+    :param margin: Margin to add to each side, as a fraction of tile size.
+    :return: [xmin, ymin, xmax, ymax]
+    """
+    size = 2 * WEB_MERCATOR_MAX / (2 ** z)
+    buffer = size * margin
+    xmin = -WEB_MERCATOR_MAX + x * size
+    ymax = WEB_MERCATOR_MAX - y * size
+    return [
+        max(xmin - buffer, -WEB_MERCATOR_MAX),
+        max(ymax - size - buffer, -WEB_MERCATOR_MAX),
+        min(xmin + size + buffer, WEB_MERCATOR_MAX),
+        min(ymax + buffer, WEB_MERCATOR_MAX)
+    ]
+
+
+def tile_range(z: int, bbox: list, margin: float = 0):
+    """Return range of tiles that cover EPSG:4326 bbox.
+
+    :param margin: Margin to add to each side, as a fraction of tile size.
+    :return: [xmin, ymin, xmax, ymax] of tile x and y, inclusive.
+    """
+    n = 2 ** z
+    size = 2 * WEB_MERCATOR_MAX / n
+    buffer = size * margin
+
+    def _mercator(lon, lat):
+        lat = max(min(lat, MERCATOR_MAX_LATITUDE), -MERCATOR_MAX_LATITUDE)
+        return (
+            lon * WEB_MERCATOR_MAX / 180,
+            math.log(math.tan((90 + lat) * math.pi / 360)) *
+            WEB_MERCATOR_MAX / math.pi
+        )
+
+    xmin, ymin = _mercator(bbox[0], bbox[1])
+    xmax, ymax = _mercator(bbox[2], bbox[3])
+
+    def _index(value):
+        return max(min(math.floor(value / size), n - 1), 0)
+
+    return [
+        _index(xmin - buffer + WEB_MERCATOR_MAX),
+        _index(WEB_MERCATOR_MAX - ymax - buffer),
+        _index(xmax + buffer + WEB_MERCATOR_MAX),
+        _index(WEB_MERCATOR_MAX - ymin + buffer)
+    ]
+
+
+def find_srid(table_name: str) -> int:
+    """Return srid of the geometry column of table name."""
+    schema_name, name = table_name.split('.')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT Find_SRID(%s, %s, 'geometry')", [schema_name, name]
+        )
+        return cursor.fetchone()[0]
+
+
+def _tile_filter(srid: int, z: int, x: int, y: int) -> str:
+    """Return where clause that selects the rows touching the tile."""
+    tile_envelope = 'ST_MakeEnvelope({}, {}, {}, {}, 3857)'.format(
+        *tile_bounds(z, x, y, margin=TILE_BUFFER / TILE_EXTENT)
+    )
+    if srid in INDEXABLE_SRIDS:
+        return f'geometry && ST_Transform({tile_envelope}, {srid})'
+    return f'ST_Transform(geometry, 3857) && {tile_envelope}'
+
+
+def bbox_filter(bbox: list, srid: int) -> str:
+    """Return where clause that selects the rows touching EPSG:4326 bbox."""
+    xmin, ymin, xmax, ymax = [float(value) for value in bbox]
+    if srid == 3857:
+        ymin = max(ymin, -MERCATOR_MAX_LATITUDE)
+        ymax = min(ymax, MERCATOR_MAX_LATITUDE)
+    envelope = f'ST_MakeEnvelope({xmin}, {ymin}, {xmax}, {ymax}, 4326)'
+    if srid in INDEXABLE_SRIDS:
+        return f'geometry && ST_Transform({envelope}, {srid})'
+    return f'ST_Transform(geometry, 4326) && {envelope}'
+
+
+def tile_has_features(
+        table_name: str, z: int, x: int, y: int, srid: int
+) -> bool:
+    """Return whether any row touches the tile (including the buffer)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {table_name} '
+            f'WHERE {_tile_filter(srid, z, x, y)})'
+        )
+        return cursor.fetchone()[0]
+
+
+def _fixed_tile_sql(
+        table_name: str, field_names: list, z: int, x: int, y: int,
+        srid: int
+) -> str:
+    """Return query of tile with fixed simplification on low zoom."""
     # Define the zoom level at which to start simplifying geometries
     simplify_zoom_threshold = 5
 
@@ -25,27 +155,157 @@ def querying_vector_tile(
         if simplify_tolerance > 0 else "ST_Transform(geometry, 3857)"
     )
 
-    sql = f"""
+    return f"""
         WITH mvtgeom AS
         (
             SELECT {','.join([f'"{f}"' for f in field_names])} ,
                 ST_AsMVTGeom(
                     {geometry_transform},
                     ST_TileEnvelope({z}, {x}, {y}),
-                    extent => 4096, buffer => 64
+                    extent => {TILE_EXTENT}, buffer => {TILE_BUFFER}
                 ) as geom
                 FROM {table_name}
+                WHERE {_tile_filter(srid, z, x, y)}
+        )
+        SELECT ST_AsMVT(mvtgeom.*)
+        FROM mvtgeom;
+    """
+
+
+def _adaptive_tile_sql(
+        table_name: str, field_names: list, z: int, x: int, y: int,
+        srid: int, tolerance: float, point_grid: float, max_features: int
+) -> str:
+    """Return query of tile that is simplified by the tile resolution.
+
+    Geometries are snapped to the tile pixel grid and simplified with
+    the tolerance, polygons and lines smaller than the tolerance are
+    dropped, points are thinned to one per point grid cell and only the
+    biggest max_features features are kept.
+
+    :param tolerance: Simplify tolerance in tile units.
+    :param point_grid: Point thinning cell size in tile units,
+        0 to keep all points.
+    """
+    unit = 2 * WEB_MERCATOR_MAX / (2 ** z) / TILE_EXTENT
+    tolerance = tolerance * unit
+    fields = ''.join([f'"{f}", ' for f in field_names])
+    if point_grid:
+        # Points are ranked only against the points of their cell, the
+        # rank of the other features is not used.
+        point_cell = (
+            'row_number() OVER (PARTITION BY ST_Dimension(geom) = 0, '
+            f'ST_SnapToGrid(ST_Centroid(geom), {-WEB_MERCATOR_MAX}, '
+            f'{-WEB_MERCATOR_MAX}, {point_grid * unit}, {point_grid * unit}))'
+        )
+    else:
+        point_cell = '1'
+
+    return f"""
+        WITH features AS
+        (
+            SELECT {fields}ST_Transform(geometry, 3857) AS geom
+                FROM {table_name}
+                WHERE {_tile_filter(srid, z, x, y)}
+        ),
+        ranked AS
+        (
+            SELECT {fields}geom,
+                CASE ST_Dimension(geom)
+                    WHEN 2 THEN ST_Area(geom)
+                    WHEN 1 THEN ST_Length(geom)
+                    ELSE 0
+                END AS feature_size,
+                {point_cell} AS point_rank
+                FROM features
+        ),
+        mvtgeom AS
+        (
+            SELECT {fields}
+                ST_AsMVTGeom(
+                    ST_Simplify(
+                        ST_SnapToGrid(
+                            geom, {-WEB_MERCATOR_MAX}, {-WEB_MERCATOR_MAX},
+                            {unit}, {unit}
+                        ),
+                        {tolerance}
+                    ),
+                    ST_TileEnvelope({z}, {x}, {y}),
+                    extent => {TILE_EXTENT}, buffer => {TILE_BUFFER}
+                ) as geom
+                FROM ranked
+                WHERE CASE ST_Dimension(geom)
+                    WHEN 2 THEN feature_size >= {tolerance ** 2}
+                    WHEN 1 THEN feature_size >= {tolerance}
+                    ELSE point_rank = 1
+                END
+                ORDER BY feature_size DESC
+                LIMIT {max_features}
         )
         SELECT ST_AsMVT(mvtgeom.*)
         FROM mvtgeom;
     """
 
-    tiles = []
 
-    # Raw query it
+def querying_vector_tile(
+        table_name: str, field_names: list, z: int, x: int, y: int,
+        srid: int = None
+):
+    """Return vector tile from table name.
+
+    Rows are filtered with the bounding box operator against the tile
+    envelope (including the MVT buffer), so only the features of the tile
+    are transformed and clipped. For storage srid in INDEXABLE_SRIDS,
+    the envelope is transformed once to the storage srid so the filter
+    uses the GiST index on ``geometry``.
+
+    The geometries are built by CLOUD_NATIVE_GIS_TILE_MODE.
+    In adaptive mode, when the tile is bigger than
+    CLOUD_NATIVE_GIS_TILE_MAX_BYTES, it is rebuilt with doubled tolerance
+    and point grid and halved feature limit.
+
+    :param srid: Storage srid of the geometry column.
+        When empty, it is looked up from the table.
+    """
+    if not srid:
+        srid = find_srid(table_name)
+
+    mode = getattr(settings, 'CLOUD_NATIVE_GIS_TILE_MODE', TileMode.FIXED)
+    if mode != TileMode.ADAPTIVE:
+        sql = _fixed_tile_sql(table_name, field_names, z, x, y, srid)
+        tiles = []
+
+        # Raw query it
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            rows = cursor.fetchall()
+            for row in rows:
+                tiles.append(bytes(row[0]))
+        return tiles
+
+    tolerance = getattr(
+        settings, 'CLOUD_NATIVE_GIS_TILE_TOLERANCE', TILE_TOLERANCE
+    )
+    point_grid = getattr(
+        settings, 'CLOUD_NATIVE_GIS_TILE_POINT_GRID', TILE_POINT_GRID
+    )
+    max_features = getattr(
+        settings, 'CLOUD_NATIVE_GIS_TILE_MAX_FEATURES', TILE_MAX_FEATURES
+    )
+    max_bytes = getattr(
+        settings, 'CLOUD_NATIVE_GIS_TILE_MAX_BYTES', TILE_MAX_BYTES
+    )
     with connection.cursor() as cursor:
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        for row in rows:
-            tiles.append(bytes(row[0]))
-    return tiles
+        for attempt in range(TILE_BUDGET_ATTEMPTS):
+            cursor.execute(
+                _adaptive_tile_sql(
+                    table_name, field_names, z, x, y, srid,
+                    tolerance=tolerance * 2 ** attempt,
+                    point_grid=point_grid * 2 ** attempt,
+                    max_features=max(max_features // 2 ** attempt, 1)
+                )
+            )
+            tile = bytes(cursor.fetchone()[0])
+            if not max_bytes or len(tile) <= max_bytes:
+                break
+    return [tile]
@@ -0,0 +1 @@
+SECRET_KEY = '$(#ni-_3d*gj_nxr^nd=w7@9g46^^uc0eyu1o=@rld02wp!j=t'